@@ -0,0 +1,56 @@
+"""
+Times a number of ``get_after`` calls with different cutoffs on a large
+messages log, the way several rules asking for the lines after a point in
+time query the same parser.  Run it against another checkout with
+``PYTHONPATH`` to compare.
+
+    python benchmarks/log_get_after.py [lines] [queries]
+"""
+import datetime
+import random
+import sys
+import timeit
+
+from insights.core import Syslog
+from insights.tests import context_wrap
+
+random.seed(0)
+
+SERVICES = ["kernel", "systemd", "sshd", "crond", "NetworkManager", "rsyslogd"]
+MESSAGES = [
+    "Started Session %d of user root.",
+    "Accepted publickey for root from 10.0.%d.1 port 22 ssh2",
+    "e1000e: eth%d NIC Link is Up 1000 Mbps Full Duplex",
+    "Out of memory: Killed process %d (java)",
+]
+START = datetime.datetime(2020, 12, 20)
+
+
+def make_lines(count):
+    lines = []
+    for i in range(count):
+        stamp = START + datetime.timedelta(seconds=i * 5)
+        message = random.choice(MESSAGES) % random.randint(0, 99)
+        lines.append("%s host %s[%d]: %s" % (stamp.strftime("%b %d %H:%M:%S"), random.choice(SERVICES), i, message))
+        if random.random() < 0.05:
+            lines.append("    continuation of %d" % i)
+    return lines
+
+
+def main(lines=100000, queries=20):
+    log = Syslog(context_wrap(make_lines(lines)))
+    end = START + datetime.timedelta(seconds=lines * 5)
+    cutoffs = [end - datetime.timedelta(hours=random.randint(1, 48)) for _ in range(queries)]
+
+    def run(s=None):
+        return sum(len(list(log.get_after(cutoff, s))) for cutoff in cutoffs)
+
+    print("%d lines, %d queries" % (len(log.lines), queries))
+    for s in (None, "Out of memory"):
+        first = timeit.timeit(lambda: run(s), number=1)
+        again = min(timeit.repeat(lambda: run(s), number=1, repeat=3))
+        print("s=%-15r first %.3fs, then %.3fs (%d lines found)" % (s, first, again, run(s)))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,76 @@
+"""
+Compares the memory held by a large log loaded as a list of lines, into a
+LineBuffer, and mapped with a MappedLineBuffer, and the time a
+LogFileOutput with a few scanners takes to parse it each way.
+
+    python benchmarks/log_memory.py [lines]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from insights.core import LogFileOutput
+from insights.core.context import HostArchiveContext
+from insights.core.spec_factory import TextFileProvider
+
+random.seed(0)
+
+SERVICES = ["kernel", "systemd", "sshd", "crond", "NetworkManager", "rsyslogd"]
+MESSAGES = [
+    "Started Session %d of user root.",
+    "Accepted publickey for root from 10.0.%d.1 port 22 ssh2",
+    "e1000e: eth%d NIC Link is Up 1000 Mbps Full Duplex",
+]
+# what the scanners look for is rare
+PROBLEMS = [
+    "Out of memory: Killed process %d (java)",
+    "e1000e: eth%d NIC Link is Down",
+]
+
+
+class Messages(LogFileOutput):
+    pass
+
+
+Messages.token_scan("oom", "Out of memory")
+Messages.keep_scan("link_down", "NIC Link is Down")
+Messages.last_scan("last_oom", "Out of memory")
+
+
+def write_log(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            message = random.choice(PROBLEMS if random.random() < 0.01 else MESSAGES) % random.randint(0, 99)
+            f.write("Mar 27 03:%02d:%02d host %s[%d]: %s\n" % (i // 60 % 60, i % 60, random.choice(SERVICES), i, message))
+
+
+def parse(root, name, buffered, mapped):
+    ctx = HostArchiveContext()
+    ctx.buffered_lines = buffered
+    ctx.mapped_files = mapped
+    return Messages(TextFileProvider(name, root=root, ctx=ctx))
+
+
+def main(lines=1000000):
+    root = tempfile.mkdtemp()
+    try:
+        write_log(os.path.join(root, "messages"), lines)
+        print("%d lines, %.1f MiB" % (lines, os.path.getsize(os.path.join(root, "messages")) / 2.0 ** 20))
+        for mode, buffered, mapped in [("list", False, False), ("buffer", True, False), ("mapped", True, True)]:
+            seconds = min(timeit.repeat(lambda: parse(root, "messages", buffered, mapped), number=1, repeat=3))
+            tracemalloc.start()
+            log = parse(root, "messages", buffered, mapped)
+            held, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del log
+            print("%-6s %7.3fs  %7.1f MiB held  %7.1f MiB peak" % (mode, seconds, held / 2.0 ** 20, peak / 2.0 ** 20))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
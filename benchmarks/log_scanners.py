@@ -0,0 +1,76 @@
+"""
+Compares evaluating the token scanners of a LogFileOutput class in one pass
+over the lines against running each scanner over all the lines on its own,
+which is what calling the scanners one by one does.
+
+    python benchmarks/log_scanners.py [lines] [scanners]
+"""
+import random
+import sys
+import timeit
+
+from insights.core import LogFileOutput
+from insights.tests import context_wrap
+
+random.seed(0)
+
+SERVICES = ["kernel", "systemd", "sshd", "crond", "NetworkManager", "rsyslogd", "dbus-daemon", "chronyd"]
+MESSAGES = [
+    "Started Session %d of user root.",
+    "Accepted publickey for root from 10.0.%d.1 port 22 ssh2",
+    "e1000e: eth%d NIC Link is Up 1000 Mbps Full Duplex",
+    "imuxsock lost %d messages from pid 1 due to rate-limiting",
+]
+# what the scanners look for is rare
+PROBLEMS = [
+    "Out of memory: Killed process %d (java)",
+    "XFS (dm-%d): Metadata corruption detected",
+    "INFO: task kworker/%d blocked for more than 120 seconds.",
+]
+
+
+def make_lines(count):
+    lines = []
+    for i in range(count):
+        service = random.choice(SERVICES)
+        message = random.choice(PROBLEMS if random.random() < 0.02 else MESSAGES) % random.randint(0, 99)
+        lines.append("Mar 27 03:%02d:%02d host %s[%d]: %s" % (i // 3600 % 60, i // 60 % 60, service, i, message))
+    return lines
+
+
+def make_class(scanners):
+    class Messages(LogFileOutput):
+        pass
+
+    tokens = ["Out of memory", "Metadata corruption", "NIC Link is Down", "segfault at", "blocked for more than",
+              "Call Trace", "nfs: server", "I/O error", "Buffer I/O", "soft lockup"]
+    for i in range(scanners):
+        token = tokens[i % len(tokens)]
+        kind = i % 3
+        if kind == 0:
+            Messages.token_scan("token_%d" % i, token)
+        elif kind == 1:
+            Messages.keep_scan("keep_%d" % i, [token, "host"])
+        else:
+            Messages.last_scan("last_%d" % i, token)
+    return Messages
+
+
+def main(lines=500000, scanners=20):
+    ctx = context_wrap(make_lines(lines))
+    cls = make_class(scanners)
+    log = cls(ctx)
+
+    def separately():
+        for scanner in cls.scanners:
+            scanner(log)
+
+    single = min(timeit.repeat(lambda: cls(ctx), number=1, repeat=3))
+    each = min(timeit.repeat(separately, number=1, repeat=3))
+    print("%d lines, %d scanners" % (lines, scanners))
+    print("one pass:           %.3fs" % single)
+    print("a pass per scanner: %.3fs" % each)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
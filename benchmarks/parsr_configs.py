@@ -0,0 +1,131 @@
+"""
+Times parsing large httpd and nginx configurations with the parsr grammars of
+their combiners and reports the peak memory allocated while parsing. Each
+grammar is run normally, in packrat mode, and compiled, when the installed
+parsr supports them. Run it against another checkout with ``PYTHONPATH`` to
+compare.
+
+    python benchmarks/parsr_configs.py [vhosts]
+"""
+import sys
+import timeit
+import tracemalloc
+
+from insights.combiners.httpd_conf import DocParser
+from insights.combiners.nginx_conf import _NginxConf
+from insights.tests import context_wrap
+
+HTTPD_VHOST = """
+# virtual host {n}
+<VirtualHost *:{port}>
+    ServerName www{n}.example.com
+    ServerAlias example{n}.com *.example{n}.com
+    DocumentRoot "/var/www/site{n}/html"
+    ErrorLog "logs/site{n}-error_log"
+    CustomLog "logs/site{n}-access_log" "%h %l %u %t \\"%r\\" %>s %b"
+    LogLevel warn
+    RewriteEngine On
+    RewriteCond %{{HTTPS}} off
+    RewriteRule ^/?(.*) https://%{{SERVER_NAME}}/$1 [R,L]
+    <Directory "/var/www/site{n}/html">
+        Options Indexes FollowSymLinks
+        AllowOverride None
+        Require all granted
+        <IfModule mod_dir.c>
+            DirectoryIndex index.html index.php
+        </IfModule>
+    </Directory>
+    <Location /status>
+        SetHandler server-status
+        Require ip 10.{a}.{b}.0/24
+    </Location>
+</VirtualHost>
+"""
+
+NGINX_SERVER = """
+    # server {n}
+    upstream backend{n} {{
+        server 10.{a}.{b}.1:8080 weight=5;
+        server 10.{a}.{b}.2:8080 max_fails=3 fail_timeout=30s;
+    }}
+    server {{
+        listen {port};
+        server_name www{n}.example.com example{n}.com;
+        root /usr/share/nginx/site{n};
+        access_log /var/log/nginx/site{n}.access.log main;
+        location / {{
+            try_files $uri $uri/ /index.html;
+        }}
+        location ~ \\.php$ {{
+            fastcgi_pass 127.0.0.1:9000;
+            fastcgi_param SCRIPT_FILENAME $document_root$fastcgi_script_name;
+            include fastcgi_params;
+        }}
+        location /api/ {{
+            proxy_pass http://backend{n};
+            proxy_set_header Host $host;
+            proxy_set_header X-Real-IP $remote_addr;
+        }}
+    }}
+"""
+
+
+def make_httpd(vhosts):
+    parts = ['ServerRoot "/etc/httpd"', "Listen 80", "Include conf.modules.d/*.conf"]
+    for n in range(vhosts):
+        parts.append(HTTPD_VHOST.format(n=n, port=80 + n % 3, a=n % 250, b=n // 250))
+    return "\n".join(parts)
+
+
+def make_nginx(vhosts):
+    parts = ["user nginx;", "worker_processes auto;", "http {",
+             "    log_format main '$remote_addr - $remote_user [$time_local] \"$request\"';"]
+    for n in range(vhosts):
+        parts.append(NGINX_SERVER.format(n=n, port=80 + n % 3, a=n % 250, b=n // 250))
+    parts.append("}")
+    return "\n".join(parts)
+
+
+def nginx_top():
+    return _NginxConf(context_wrap("user nginx;")).Top
+
+
+def packrat_supported(top):
+    try:
+        top("", packrat=True)
+    except TypeError:
+        return False
+    except Exception:
+        pass
+    return True
+
+
+def measure(top, content, **kwargs):
+    seconds = min(timeit.repeat(lambda: top(content, **kwargs), number=1, repeat=3))
+    tracemalloc.start()
+    top(content, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(vhosts=500):
+    grammars = [
+        ("httpd", DocParser(None).Top, make_httpd(vhosts)),
+        ("nginx", nginx_top(), make_nginx(vhosts)),
+    ]
+    for name, top, content in grammars:
+        # the combiners may already hold compiled grammars
+        grammar = getattr(top, "grammar", top)
+        modes = [("plain", grammar, {})]
+        if packrat_supported(grammar):
+            modes.append(("packrat", grammar, {"packrat": True}))
+        if grammar is not top:
+            modes.append(("compiled", top, {}))
+        for mode, parser, kwargs in modes:
+            seconds, peak = measure(parser, content, **kwargs)
+            print("%-6s %-8s %8d bytes %8.3fs %10.1f MiB peak" % (name, mode, len(content), seconds, peak / 2.0 ** 20))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,63 @@
+"""
+Compares finding the newest and oldest installed packages with cached rpm
+version keys against comparing versions with ``rpm_version_compare``, which
+walks both version strings on every comparison.
+
+    python benchmarks/rpm_compare.py [rounds]
+"""
+import random
+import sys
+import timeit
+from functools import cmp_to_key
+
+from insights.parsers.installed_rpms import InstalledRpm, InstalledRpms
+from insights.parsers.rpm_vercmp import rpm_version_compare
+from insights.tests import context_wrap
+
+random.seed(0)
+
+
+def make_content(names=2000, versions=3):
+    lines = []
+    for n in range(names):
+        for _ in range(versions):
+            version = "%d.%d.%d" % (random.randint(0, 5), random.randint(0, 30), random.randint(0, 300))
+            release = "%d.el8_%d" % (random.randint(1, 40), random.randint(0, 9))
+            lines.append("package%d-%s-%s.x86_64" % (n, version, release))
+    return lines
+
+
+def compare_newest(rpms):
+    key = cmp_to_key(rpm_version_compare)
+    for pkgs in rpms.packages.values():
+        max(pkgs, key=key)
+        min(pkgs, key=key)
+
+
+def keyed_newest(rpms):
+    # each round finds the bounds again, like a freshly parsed InstalledRpms
+    rpms.__dict__.pop("_bounds_cache", None)
+    for name in rpms.packages:
+        rpms.newest(name)
+        rpms.oldest(name)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rpms = InstalledRpms(context_wrap(make_content()))
+    print("%d packages, %d rounds" % (sum(len(p) for p in rpms.packages.values()), rounds))
+
+    t = timeit.timeit(lambda: compare_newest(rpms), number=rounds)
+    print("rpm_version_compare newest/oldest: %.4fs" % t)
+    t = timeit.timeit(lambda: keyed_newest(rpms), number=rounds)
+    print("cached keys newest/oldest:         %.4fs" % t)
+
+    pkgs = [InstalledRpm.from_package(l) for l in make_content(1, 2000)]
+    t = timeit.timeit(lambda: sorted(pkgs, key=cmp_to_key(rpm_version_compare)), number=rounds)
+    print("rpm_version_compare sort of 2000:  %.4fs" % t)
+    t = timeit.timeit(lambda: sorted(pkgs), number=rounds)
+    print("cached keys sort of 2000:          %.4fs" % t)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,11 +30,11 @@ from .core import YAMLParser, JSONParser, XMLParser, CommandParser  # noqa: F401
 from .core import AttributeDict  # noqa: F401
 from .core import Syslog  # noqa: F401
 from .core import taglang
-from .core.archives import COMPRESSION_TYPES, extract, InvalidArchive, InvalidContentType  # noqa: F401
+from .core.archives import COMPRESSION_TYPES, extract, open_archive, InvalidArchive, InvalidContentType  # noqa: F401
 from .core import dr  # noqa: F401
 from .core.context import ClusterArchiveContext, HostContext, HostArchiveContext, SerializedArchiveContext, ExecutionContext  # noqa: F401
 from .core.dr import SkipComponent  # noqa: F401
-from .core.hydration import create_context, initialize_broker  # noqa: F401
+from .core.hydration import create_context, extract_specs, initialize_broker  # noqa: F401
 from .core.plugins import combiner, fact, metadata, parser, rule  # noqa: F401
 from .core.plugins import datasource, condition, incident  # noqa: F401
 from .core.plugins import make_response, make_metadata, make_fingerprint  # noqa: F401
@@ -85,8 +85,21 @@ def add_status(name, nvr, commit=None):
 add_status(package_info["NAME"], get_nvr(), package_info["COMMIT"])
 
 
-def process_dir(broker, root, graph, context, inventory=None):
-    ctx, broker = initialize_broker(root, context=context, broker=broker)
+def prune_graph(graph, targets, broker):
+    """
+    Prunes the components of graph that can't contribute to targets given the
+    contexts in broker and logs how many components and datasources were
+    skipped.
+    """
+    graph, report = dr.prune(graph, targets, broker=broker)
+    num_ds = len(report.get_pruned_of_type(datasource))
+    log.info("Pruned %d of %d components (%d datasources)" % (len(report.pruned), report.total, num_ds))
+    return graph
+
+
+def process_dir(broker, root, graph, context, inventory=None, targets=None, archive=None, extract_spec_files=False,
+                plan=None):
+    ctx, broker = initialize_broker(root, context=context, broker=broker, lazy=True, archive=archive)
     log.debug("Processing %s with %s" % (root, ctx))
 
     if isinstance(ctx, ClusterArchiveContext):
@@ -94,12 +107,19 @@ def process_dir(broker, root, graph, context, inventory=None):
         archives = [f for f in ctx.all_files if f.endswith(COMPRESSION_TYPES)]
         return process_cluster(graph, archives, broker=broker, inventory=inventory)
 
-    graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
+    if plan is not None:
+        graph = plan
+    else:
+        graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
+    if targets is not None:
+        graph = prune_graph(graph, targets, broker)
+    if extract_spec_files:
+        extract_specs(ctx, graph.graph if isinstance(graph, dr.RunPlan) else graph)
     broker = dr.run(graph, broker=broker)
     return broker
 
 
-def _run(broker, graph=None, root=None, context=None, inventory=None):
+def _run(broker, graph=None, root=None, context=None, inventory=None, targets=None, extract_archive=True, plan=None):
     """
     run is a general interface that is meant for stand alone scripts to use
     when executing insights components.
@@ -113,6 +133,17 @@ def _run(broker, graph=None, root=None, context=None, inventory=None):
         component (function or class): The component to execute. Will only execute
             the component and its dependency graph. If None, all components with
             met dependencies will execute.
+        targets (list): If not None, components of the graph that can't
+            contribute to any of the targets are pruned before evaluation.
+        extract_archive (bool or str): If False, an archive passed as root is read with an
+            :class:`insights.core.archives.ArchiveReader` instead of being
+            extracted, so only the files datasources read are decompressed.
+            If "specs", the files the graph's file datasources may read are
+            extracted up front in one pass, and nothing else is.
+        plan (RunPlan): the single components of graph compiled with
+            :func:`insights.core.dr.compile_plan`, to evaluate instead of
+            compiling them again for this run. Cluster archives still use
+            graph.
 
     Returns:
         broker: object containing the result of the evaluation.
@@ -121,14 +152,23 @@ def _run(broker, graph=None, root=None, context=None, inventory=None):
     if not root:
         context = context or HostContext
         broker[context] = context()
-        graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
+        if plan is not None:
+            graph = plan
+        else:
+            graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
+        if targets is not None:
+            graph = prune_graph(graph, targets, broker)
         return dr.run(graph, broker=broker)
 
     if os.path.isdir(root):
-        return process_dir(broker, root, graph, context, inventory=inventory)
+        return process_dir(broker, root, graph, context, inventory=inventory, targets=targets, plan=plan)
+    elif not extract_archive or extract_archive == "specs":
+        with open_archive(root) as arc:
+            return process_dir(broker, arc.tmp_dir, graph, context, inventory=inventory, targets=targets,
+                               archive=arc, extract_spec_files=extract_archive == "specs", plan=plan)
     else:
         with extract(root) as ex:
-            return process_dir(broker, ex.tmp_dir, graph, context, inventory=inventory)
+            return process_dir(broker, ex.tmp_dir, graph, context, inventory=inventory, targets=targets, plan=plan)
 
 
 def load_default_plugins():
@@ -171,7 +211,7 @@ def apply_default_enabled(config):
     for k in dr.ENABLED:
         dr.ENABLED[k] = default_enabled
 
-    enabled = defaultdict(lambda: default_enabled)
+    enabled = dr.EnabledRegistry(lambda: default_enabled)
     enabled.update(dr.ENABLED)
     dr.ENABLED = enabled
 
@@ -239,7 +279,7 @@ def _load_context(path):
 
 
 def run(component=None, root=None, print_summary=False,
-        context=None, inventory=None, print_component=None):
+        context=None, inventory=None, print_component=None, prune=False, extract_archive=True):
 
     load_default_plugins()
 
@@ -265,6 +305,17 @@ def run(component=None, root=None, print_summary=False,
         p.add_argument("--tags", help="Expression to select rules by tag.")
         p.add_argument("-D", "--debug", help="Verbose debug output.", action="store_true")
         p.add_argument("--context", help="Execution Context. Defaults to HostContext if an archive isn't passed.")
+        p.add_argument("--prune", help="Skip components that can't contribute to the requested components.",
+                       action="store_true")
+        p.add_argument("--no-extract", help="Read archive members as they're needed instead of extracting the archive.",
+                       action="store_true")
+        p.add_argument("--extract-specs", help="Extract only the files the loaded file specs may read.",
+                       action="store_true")
+        p.add_argument("--serve", help="Keep running and analyze the archives read from stdin, --spool, or --socket, "
+                       "printing a JSON result per archive.", action="store_true")
+        p.add_argument("--spool", help="With --serve, process archives moved into this directory.")
+        p.add_argument("--socket", help="With --serve, read archive paths from connections to this Unix socket.")
+        p.add_argument("--workers", type=int, help="With --serve, the number of worker processes.")
         p.add_argument("--color", default="auto", choices=["always", "auto", "never"], metavar="[=WHEN]",
                        help="Choose if and how the color encoding is outputted. When is 'always', 'auto', or 'never'.")
 
@@ -302,6 +353,10 @@ def run(component=None, root=None, print_summary=False,
         logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO if args.verbose else logging.ERROR)
         context = _load_context(args.context) or context
         inventory = args.inventory
+        prune = args.prune or prune
+        extract_archive = extract_archive and not args.no_extract
+        if args.extract_specs:
+            extract_archive = "specs"
 
         root = args.archive or root
         if root:
@@ -350,6 +405,22 @@ def run(component=None, root=None, print_summary=False,
     else:
         graph = dr.COMPONENTS[dr.GROUPS.single]
 
+    targets = None
+    if prune:
+        targets = component or list(dr.get_components_of_type(rule) or [])
+
+    if args and args.serve:
+        from .core.batch import serve
+        from .combiners.hostname import Hostname
+        # results report the hostname like the json format does
+        graph = dict(graph)
+        graph.update(dr.get_dependency_graph(Hostname))
+        if targets is not None:
+            targets = list(targets) + [Hostname]
+        serve(graph, context=context, targets=targets, extract_archive=extract_archive,
+              workers=args.workers, spool=args.spool, socket_path=args.socket)
+        return
+
     broker = dr.Broker()
 
     if args and args.bare:
@@ -369,7 +440,8 @@ def run(component=None, root=None, print_summary=False,
             if args and args.bare:
                 broker = dr.run(graph, broker=broker)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, targets=targets,
+                              extract_archive=extract_archive)
 
             for formatter in formatters:
                 formatter.postprocess(broker)
@@ -377,14 +449,16 @@ def run(component=None, root=None, print_summary=False,
             if args and args.bare:
                 broker = dr.run(graph, broker=broker)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, targets=targets,
+                              extract_archive=extract_archive)
 
             broker.print_component(print_component)
         else:
             if args and args.bare:
                 broker = dr.run(graph, broker=broker)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, targets=targets,
+                              extract_archive=extract_archive)
 
         return broker
     except (InvalidContentType, InvalidArchive):
@@ -70,6 +70,11 @@ client:
         args:
             max_workers: null
 
+    # how persisted components are stored. "directory" writes a file per
+    # component beneath meta_data. "packed" writes them all to meta_data.pack.
+    hydration:
+        storage: directory
+
 plugins:
     # disable everything by default
     # defaults to false if not specified.
@@ -365,6 +370,15 @@ def collect(manifest=default_manifest, tmp_path=None, compress=False, rm_conf=No
         # problem parsing the filters
         log.debug("Could not parse filters: %s", str(e))
 
+    try:
+        filters.load_index()
+    except IOError as e:
+        # no prebuilt index, filters are resolved on demand
+        log.debug("No filters index available: %s", str(e))
+    except ValueError as e:
+        # problem parsing the index
+        log.debug("Could not parse filters index: %s", str(e))
+
     try:
         hostname = call("hostname -f", env=SAFE_ENV).strip()
     except CalledProcessError:
@@ -384,9 +398,16 @@ def collect(manifest=default_manifest, tmp_path=None, compress=False, rm_conf=No
     parallel = run_strategy.get("name") == "parallel"
     pool_args = run_strategy.get("args", {})
     with get_pool(parallel, pool_args) as pool:
-        h = Hydration(output_path, pool=pool)
+        storage = client.get("hydration", {}).get("storage", "directory")
+        h = Hydration(output_path, pool=pool, storage=storage)
         broker.add_observer(h.make_persister(to_persist))
-        dr.run_all(broker=broker, pool=pool)
+        try:
+            if pool:
+                dr.run_parallel(broker=broker, executor=pool)
+            else:
+                dr.run_all(broker=broker)
+        finally:
+            h.close()
 
     if compress:
         return create_archive(output_path)
@@ -20,7 +20,7 @@ from insights.core import ConfigCombiner, ConfigParser
 from insights.core.plugins import combiner, parser
 from insights.parsr.query import (Directive, Entry, pred, pred2, Section,
         startswith)
-from insights.parsr import (Char, EOF, EOL, EndTagName, Forward, FS, GT, InSet,
+from insights.parsr import (Char, compile as compile_grammar, EOF, EOL, EndTagName, Forward, FS, GT, InSet,
         Literal, LT, Letters, Lift, LineEnd, Many, Number, OneLineComment,
         PosMarker, QuotedString, skip_none, StartTagName, String, WS, WSChar)
 from insights.parsers.httpd_conf import HttpdConf, dict_deep_merge, ParsedData
@@ -301,7 +301,7 @@ class DocParser(object):
         Complex <= (Lift(self.to_section) * StartTag * Many(Stanza).map(skip_none)) << EndTag
         Doc = Many(Stanza).map(skip_none)
 
-        self.Top = Doc + EOF
+        self.Top = compile_grammar(Doc + EOF)
 
     def typed(self, val):
         try:
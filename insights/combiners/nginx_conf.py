@@ -15,7 +15,7 @@ import string
 from insights import combiner, parser, run
 from insights.core import ConfigCombiner, ConfigParser
 from insights.parsr.query import eq
-from insights.parsr import (Char, EOF, Forward, LeftCurly, Lift, LineEnd,
+from insights.parsr import (Char, compile as compile_grammar, EOF, Forward, LeftCurly, Lift, LineEnd,
         RightCurly, Many, Number, OneLineComment, Parser, PosMarker, SemiColon,
         QuotedString, skip_none, String, WS, WSChar)
 from insights.parsr.query import Directive, Entry, Section
@@ -55,7 +55,7 @@ class _NginxConf(ConfigParser):
         Stanza = (Lift(to_entry) * Name * Attrs * (Block | SemiColon)) | Comment
         Stmt <= WS >> Stanza << WS
         Doc = Many(Stmt).map(skip_none)
-        self.Top = Doc + EOF
+        self.Top = compile_grammar(Doc + EOF)
         super(_NginxConf, self).__init__(*args, **kwargs)
 
     def parse_doc(self, content):
@@ -27,7 +27,6 @@ import sys
 import uuid
 import shutil
 import struct, socket
-import tempfile
 import logging
 import tarfile
 import six
@@ -35,6 +34,76 @@ import hashlib
 
 from insights.util import content_type
 
+IP_PATTERN = r"(((\b25[0-5]|\b2[0-4][0-9]|\b1[0-9][0-9]|\b[1-9][0-9]|\b[1-9]))(\.(\b25[0-5]|\b2[0-4][0-9]|\b1[0-9][0-9]|\b[1-9][0-9]|\b[0-9])){3})"
+
+
+class _Obfuscator(object):
+    '''
+    Substitutes IPs, hostnames in the obfuscated domains, the system hostname
+    and keywords in a single scan of the text, using one regex compiled from
+    the cleaner's databases. Obfuscated values for IPs and hostnames seen for
+    the first time are added to the cleaner's databases in the order they're
+    found, so the same files always get the same values.
+    '''
+    def __init__(self, cleaner):
+        self.cleaner = cleaner
+        self.ips = dict((cleaner._int2ip(v), cleaner._int2ip(k)) for k, v in cleaner.ip_db.items())
+        self.hosts = dict((v, k) for k, v in cleaner.hn_db.items())
+        self.keywords = dict((k, v) for k, v in cleaner.kw_db.items() if k) if cleaner.kw_count > 0 else {}
+        self.domains = list(cleaner.dn_db.items())
+        if cleaner.ip_db:
+            self.next_ip = max(cleaner.ip_db.keys()) + 1
+        else:
+            self.next_ip = cleaner._ip2int(cleaner.start_ip)
+
+        parts = [r"(?P<ip>%s)" % IP_PATTERN.replace("(", "(?:")]
+        if self.domains:
+            domains = "|".join(re.escape(d) for _, d in self.domains)
+            parts.append(r"(?P<fqdn>(?<![a-zA-Z0-9_])(?![\W\-\:\ \.])[a-zA-Z0-9\-\_\.]*\.(?:%s))" % domains)
+        if cleaner.hostname:
+            parts.append(r"(?P<host>%s)" % re.escape(cleaner.hostname))
+        if self.keywords:
+            keywords = sorted(self.keywords, key=len, reverse=True)
+            parts.append(r"(?P<kw>%s)" % "|".join(re.escape(k) for k in keywords))
+        self.regex = re.compile("|".join(parts))
+
+    def _ip(self, ip):
+        new_ip = self.ips.get(ip)
+        if new_ip is None:
+            c = self.cleaner
+            c.ip_db[self.next_ip] = c._ip2int(ip)
+            new_ip = self.ips[ip] = c._int2ip(self.next_ip)
+            self.next_ip += 1
+            c.logger.debug("Obfuscating IP - %s > %s", ip, new_ip)
+        return new_ip
+
+    def _hostname(self, hn):
+        new_hn = self.hosts.get(hn)
+        if new_hn is None:
+            c = self.cleaner
+            c.hostname_count += 1
+            o_domain = c.root_domain
+            for od, d in self.domains:
+                if d in hn:
+                    o_domain = od
+            new_hn = self.hosts[hn] = "host%s.%s" % (c.hostname_count, o_domain)
+            c.hn_db[new_hn] = hn
+            c.logger.debug("Obfuscating FQDN - %s > %s", hn, new_hn)
+        return new_hn
+
+    def _replace(self, m):
+        kind = m.lastgroup
+        if kind == "ip":
+            return self._ip(m.group())
+        if kind == "fqdn":
+            return self._hostname(m.group())
+        if kind == "host":
+            return self._hostname(self.cleaner.fqdn)
+        return self.keywords[m.group()]
+
+    def sub(self, text):
+        return self.regex.sub(self._replace, text)
+
 
 class SOSCleaner:
     '''
@@ -78,6 +147,8 @@ class SOSCleaner:
         self.kw_db = dict() #keyword database
         self.kw_count = 0
 
+        self._obfuscator = None
+
     def _skip_file(self, d, files):
         '''
         The function passed into shutil.copytree to ignore certain patterns and filetypes
@@ -199,8 +270,7 @@ class SOSCleaner:
         It scans a given line and if an IP exists, it obfuscates the IP using _ip2db and returns the altered line
         '''
         try:
-            pattern = r"(((\b25[0-5]|\b2[0-4][0-9]|\b1[0-9][0-9]|\b[1-9][0-9]|\b[1-9]))(\.(\b25[0-5]|\b2[0-4][0-9]|\b1[0-9][0-9]|\b[1-9][0-9]|\b[0-9])){3})"
-            ips = [each[0] for each in re.findall(pattern, line)]
+            ips = [each[0] for each in re.findall(IP_PATTERN, line)]
             if len(ips) > 0:
                 for ip in ips:
                     new_ip = self._ip2db(ip)
@@ -572,50 +642,47 @@ class SOSCleaner:
         self.file_count = len(rtn)  #a count of the files we'll have in the final cleaned sosreport, for reporting
         return rtn
 
+    def _get_obfuscator(self):
+        #builds the combined substitution regex once the databases are set up
+        if self._obfuscator is None:
+            self._obfuscator = _Obfuscator(self)
+        return self._obfuscator
+
     def _clean_line(self, l):
         '''this will return a line with obfuscations for all possible variables, hostname, ip, etc.'''
 
-        new_line = self._sub_ip(l)                  # IP substitution
-        new_line = self._sub_hostname(new_line)     # Hostname substitution
-        new_line = self._sub_keywords(new_line)     # Keyword Substitution
-
-        return new_line
+        return self._get_obfuscator().sub(l)
 
-    def _clean_file(self, f):
-        '''this will take a given file path, scrub it accordingly, and save a new copy of the file
-        in the same location'''
+    def _read_file(self, f):
+        #returns the contents of a file to clean, or None if it should be left alone
         if os.path.exists(f) and not os.path.islink(f):
-            tmp_file = tempfile.TemporaryFile(mode='w+b')
             try:
-                fh = open(f, 'r')
-                data = fh.readlines()
-                fh.close()
-                if len(data) > 0: #if the file isn't empty:
-                    for l in data:
-                        new_l = self._clean_line(l)
-                        if six.PY3:
-                            tmp_file.write(new_l.encode('utf-8'))
-                        else:
-                            tmp_file.write(new_l)
-
-                    tmp_file.seek(0)
-
+                with open(f, 'r') as fh:
+                    return fh.read()
             except Exception as e: # pragma: no cover
                 self.logger.exception(e)
                 raise Exception("CleanFile Error: Cannot Open File For Reading - %s" % f)
 
+    def _clean_file(self, f):
+        '''this will take a given file path, scrub it accordingly, and save a new copy of the file
+        in the same location'''
+        data = self._read_file(f)
+        if data: #if the file isn't empty:
+            new_data = self._get_obfuscator().sub(data)
+            if new_data == data:
+                return
             try:
-                if len(data) > 0:
-                    new_fh = open(f, 'wb')
-                    for line in tmp_file:
-                        new_fh.write(line)
-                    new_fh.close()
+                with open(f, 'wb') as new_fh:
+                    new_fh.write(new_data.encode('utf-8') if six.PY3 else new_data)
             except Exception as e: # pragma: no cover
                 self.logger.exception(e)
                 raise Exception("CleanFile Error: Cannot Write to New File - %s" % f)
 
-            finally:
-                tmp_file.close()
+    def _clean_files(self, files):
+        '''cleans the files one at a time, in order, so obfuscated values are assigned in file order'''
+        for f in files:
+            self.logger.debug("Cleaning %s", f)
+            self._clean_file(f)
 
     def _add_extra_files(self, files):
         '''if extra files are to be analyzed with an sosreport, this will add them to the origin path to be analyzed'''
@@ -706,6 +773,7 @@ class SOSCleaner:
         self.logger.con_out("IP Obfuscation Start Address - %s", self.start_ip)
         self.logger.con_out("*** SOSCleaner Processing ***")
         self.logger.info("Working Directory - %s", self.dir_path)
+        to_clean = []
         for f in files:
             if options.core_collect:
                 # set a relative path of $ARCHIVEROOT/data for core collection
@@ -727,8 +795,8 @@ class SOSCleaner:
             if relative_path in ('etc/machine-id',
                                  'etc/insights-client/machine-id'):
                 continue
-            self.logger.debug("Cleaning %s", f)
-            self._clean_file(f)
+            to_clean.append(f)
+        self._clean_files(to_clean)
         self.logger.con_out("*** SOSCleaner Statistics ***")
         self.logger.con_out("IP Addresses Obfuscated - %s", len(self.ip_db))
         self.logger.con_out("Hostnames Obfuscated - %s" , len(self.hn_db))
@@ -1,3 +1,4 @@
+import bisect
 import datetime
 import io
 import json
@@ -19,6 +20,7 @@ from insights.parsers import ParseException, SkipException
 from insights.core.plugins import ContentException
 from insights.core.serde import deserializer, serializer
 from . import ls_parser
+from insights.core.linebuffer import LineBuffer
 from insights.util import deprecated
 
 try:
@@ -384,8 +386,9 @@ class ConfigCombiner(ConfigComponent):
                 for inc in includes:
                     node.children.extend(inc.doc.children)
 
-        # flatten all content from nested includes into a main doc
-        self.doc = Entry(children=flatten(self.main.doc.children, include_finder))
+        # flatten all content from nested includes into a main doc. It isn't
+        # changed after this, so deep queries can use a name index.
+        self.doc = Entry(children=flatten(self.main.doc.children, include_finder)).enable_index()
 
     def find_matches(self, confs, pattern):
         results = [c for c in confs if fnmatch(c.file_path, pattern)]
@@ -883,6 +886,320 @@ class Scannable(six.with_metaclass(ScanMeta, Parser)):
                 scanner(self, obj)
 
 
+class _TokenScanner(object):
+    """
+    A scanner registered by :meth:`LogFileOutput.token_scan`,
+    :meth:`LogFileOutput.keep_scan` or :meth:`LogFileOutput.last_scan`. Calling
+    it searches the lines of a log on its own, but :class:`LogFileOutput`
+    evaluates the token scanners of a class together in one pass when it can.
+    """
+    def __init__(self, result_key, kind, token, check=all, num=None, reverse=False):
+        self.result_key = result_key
+        self.kind = kind
+        self.token = token
+        self.check = check
+        self.num = num
+        self.reverse = reverse
+        self._search = None
+
+    def __call__(self, log):
+        setattr(log, self.result_key, self.search(log))
+
+    def search(self, log):
+        if self.kind == "token":
+            search_by_expression = log._valid_search(self.token, self.check)
+            return any(search_by_expression(l) for l in log.lines)
+        if self.kind == "keep":
+            return log.get(self.token, check=self.check, num=self.num, reverse=self.reverse)
+        ret = log.get(self.token, check=self.check, num=1, reverse=True)
+        return ret[0] if ret else dict()
+
+    @property
+    def tokens(self):
+        """
+        The list of tokens to search for, or None if the scanner can't be
+        evaluated with the others because its arguments are invalid or its
+        check isn't ``all`` or ``any``.
+        """
+        if self.check not in (all, any):
+            return None
+        if self.num is not None and not isinstance(self.num, six.integer_types):
+            return None
+        if isinstance(self.token, six.string_types):
+            return [self.token]
+        if isinstance(self.token, list) and self.token and all(isinstance(t, six.string_types) for t in self.token):
+            return self.token
+        return None
+
+    @property
+    def keys(self):
+        """
+        Tokens at least one of which is in every line the scanner matches.
+        With ``check=all`` the longest token is enough.
+        """
+        tokens = self.tokens
+        return [max(tokens, key=len)] if self.check is all else tokens
+
+    def select(self, lines, log):
+        """
+        Returns the result of the scanner given the lines of the log that
+        contain at least one of its keys, in order.
+        """
+        if self._search is None:
+            self._search = re.compile("|".join(re.escape(t) for t in self.keys)).search
+        hits = list(filter(self._search, lines))
+        tokens = self.tokens
+        if self.check is all and len(tokens) > 1:
+            hits = [l for l in hits if all(t in l for t in tokens)]
+
+        if self.kind == "token":
+            return bool(hits)
+        if self.kind == "last":
+            return log._parse_line(hits[-1]) if hits else dict()
+        num = self.num
+        if num is not None:
+            if num <= 0:
+                hits = []
+            elif self.reverse:
+                hits = hits[-num:]
+            else:
+                hits = hits[:num]
+        return [log._parse_line(l) for l in hits]
+
+
+class _ScanPlan(object):
+    """
+    Evaluates the token scanners of a :class:`LogFileOutput` class in one
+    pass over its lines. The keys of the scanners are combined into one
+    regular expression that picks out the lines containing any of them, and
+    each scanner then only looks at those lines.
+    """
+    def __init__(self, scanners):
+        self.size = len(scanners)
+        self.batch = [s for s in scanners if isinstance(s, _TokenScanner) and s.tokens is not None]
+        tokens = sorted(set(t for s in self.batch for t in s.keys), key=len, reverse=True)
+        self.regex = re.compile("|".join(re.escape(t) for t in tokens)) if tokens else None
+        self.search = self.regex.search if tokens else None
+        # tokens found in a line buffer at once mustn't span lines
+        self.multiline = any("\n" in t or "\r" in t for t in tokens)
+
+    def run(self, log):
+        if self.search is None:
+            lines = []
+        elif isinstance(log.lines, LineBuffer) and not self.multiline:
+            lines = log.lines.select(self.regex)
+        else:
+            lines = list(filter(self.search, log.lines))
+        results = {}
+        for scanner in self.batch:
+            results[id(scanner)] = scanner.select(lines, log)
+        # set the results in the order the scanners were registered so that
+        # the other scanners see the same attributes they always have.
+        for scanner in log.scanners:
+            key = id(scanner)
+            if key in results:
+                setattr(log, scanner.result_key, results[key])
+            else:
+                scanner(log)
+
+
+def _timestamp_parser(time_format):
+    """
+    Returns a regular expression finding time stamps in the format
+    `time_format`, a function parsing the time stamps it finds into
+    datetimes, and whether the time stamps include the year.  See
+    :attr:`LogFileOutput.time_format`.
+    """
+    # Annoyingly, strptime insists that it get the whole time string and
+    # nothing but the time string.  However, for most logs we only have a
+    # string with the timestamp in it.  We can't just catch the ValueError
+    # because at that point we do not actually have a valid datetime
+    # object.  So we convert the time format string to a regex, use that
+    # to find just the timestamp, and then use strptime on that.  Thanks,
+    # Python.  All these need to cope with different languages and
+    # character sets.  Note that we don't include time zone or other
+    # outputs (e.g. day-of-year) that don't usually occur in time stamps.
+    format_conversion_for = {
+        'a': r'\w{3}', 'A': r'\w+',  # Week day name
+        'w': r'[0123456]',  # Week day number
+        'd': r'([0 ][123456789]|[12]\d|3[01])',  # Day of month
+        'b': r'\w{3}', 'B': r'\w+',  # Month name
+        'm': r'([0 ]\d|1[012])',  # Month number
+        'y': r'\d{2}', 'Y': r'\d{4}',  # Year
+        'H': r'([01 ]\d|2[0123])',  # Hour - 24 hour format
+        'I': r'([0 ]?\d|1[012])',  # Hour - 12 hour format
+        'p': r'\w{2}',  # AM / PM
+        'M': r'([012345]\d)',  # Minutes
+        'S': r'([012345]\d|60)',  # Seconds, including leap second
+        'f': r'\d{1,6}',  # Microseconds
+    }
+
+    # Construct the regex from the time string
+    timefmt_re = re.compile(r'%(\w)')
+
+    def replacer(match):
+        if match.group(1) in format_conversion_for:
+            return format_conversion_for[match.group(1)]
+        else:
+            raise ParseException(
+                "get_after does not understand strptime format '{c}'".format(
+                    c=match.group(0)
+                )
+            )
+
+    # Please do not attempt to be tricky and put a regular expression
+    # inside your time format, as we are going to also use it in
+    # strptime too and that may not work out so well.
+
+    # Check time_format - must be string or list.  Set the 'logs_have_year'
+    # flag and timestamp parser function appropriately.
+    # Grab values of dict as a list first
+    if isinstance(time_format, dict):
+        time_format = list(time_format.values())
+    if isinstance(time_format, six.string_types):
+        logs_have_year = ('%Y' in time_format or '%y' in time_format)
+        time_re = re.compile('(' + timefmt_re.sub(replacer, time_format) + ')')
+
+        # Curry strptime with time_format string.
+        def test_parser(logstamp):
+            return datetime.datetime.strptime(logstamp, time_format)
+        return time_re, test_parser, logs_have_year
+    elif isinstance(time_format, list):
+        logs_have_year = all('%Y' in tf or '%y' in tf for tf in time_format)
+        time_re = re.compile('(' + '|'.join(
+            timefmt_re.sub(replacer, tf) for tf in time_format
+        ) + ')')
+
+        def test_all_parsers(logstamp):
+            # One of these must match, because the regex has selected only
+            # strings that will match.
+            ts = None
+            for tf in time_format:
+                try:
+                    ts = datetime.datetime.strptime(logstamp, tf)
+                except ValueError:
+                    pass
+            if ts is None:
+                raise ValueError("time stamp {0!r} does not match the time formats".format(logstamp))
+            return ts
+        return time_re, test_all_parsers, logs_have_year
+    else:
+        raise ParseException(
+            "get_after does not recognise time formats of type {t}".format(
+                t=type(time_format)
+            )
+        )
+
+
+def _yearless(stamp):
+    return (stamp.month, stamp.day, stamp.hour, stamp.minute, stamp.second, stamp.microsecond)
+
+
+class _TimestampIndex(object):
+    """
+    The time stamps of the lines of a :class:`LogFileOutput`, found once and
+    shared by its :meth:`LogFileOutput.get_after` and
+    :meth:`LogFileOutput.get_between` calls.
+
+    ``positions`` lists the lines with a time stamp and ``keys`` their time
+    stamps.  For logs without years in their time stamps the keys are
+    ``(year offset, month, day, hour, minute, second, microsecond)`` tuples,
+    the offset going up by one where the log rolls over from December to
+    January.  When the keys are in order, as they are in nearly all logs, the
+    lines of a time range are found by binary search.
+    """
+    eleven_months = datetime.timedelta(days=330)
+
+    def __init__(self, lines, time_format):
+        time_re, parse_fn, self.has_year = _timestamp_parser(time_format)
+        self.time_format = time_format
+        self.positions = []
+        self.keys = []
+        search = time_re.search
+        offset, previous = 0, None
+        for pos, line in enumerate(lines):
+            match = search(line)
+            if not match:
+                continue
+            try:
+                stamp = parse_fn(match.group(0))
+            except ValueError:
+                # treated like a line without a time stamp
+                continue
+            if not self.has_year:
+                if previous is not None:
+                    if previous - stamp > self.eleven_months:
+                        offset += 1
+                    elif stamp - previous > self.eleven_months:
+                        offset -= 1
+                previous = stamp
+                stamp = (offset,) + _yearless(stamp)
+            self.positions.append(pos)
+            self.keys.append(stamp)
+        keys = self.keys
+        self.ordered = all(keys[i] <= keys[i + 1] for i in range(len(keys) - 1))
+
+    def query_keys(self, timestamp, *others):
+        """
+        Returns the keys of the given datetimes.  For logs without years, the
+        year of the log is found from `timestamp`: the last time stamp of the
+        log is taken to be in the same year as it unless that puts the two
+        more than eleven months apart, in which case it's moved to the year
+        before or after.
+        """
+        timestamps = (timestamp,) + others
+        if self.has_year:
+            return timestamps
+        base = timestamp.year
+        if self.keys:
+            last = self.keys[-1]
+            logstamp = datetime.datetime(timestamp.year, *last[1:])
+            if logstamp - timestamp > self.eleven_months:
+                base -= 1
+            elif timestamp - logstamp > self.eleven_months:
+                base += 1
+            base -= last[0]
+        return tuple((t.year - base,) + _yearless(t) for t in timestamps)
+
+    def select(self, lines, lower, upper=None, search=None):
+        """
+        Yields the positions of the lines with keys from `lower` up to, but
+        not including, `upper`, together with the lines without time stamps
+        that follow them.  Lines rejected by `search` are skipped, so lines
+        without time stamps follow the last line with one that `search`
+        accepted.
+        """
+        positions, keys = self.positions, self.keys
+        start = bisect.bisect_left(keys, lower) if self.ordered else 0
+        if start == len(keys):
+            return
+        if self.ordered and search is None:
+            stop = len(keys) if upper is None else bisect.bisect_left(keys, upper)
+            end = positions[stop] if stop < len(keys) else len(lines)
+            for pos in range(positions[start], end):
+                yield pos
+            return
+
+        including = False
+        k = start
+        following = positions[k]
+        for pos in range(positions[start], len(lines)):
+            stamped = pos == following
+            if stamped:
+                key = keys[k]
+                k += 1
+                following = positions[k] if k < len(positions) else None
+            if search is not None and not search(lines[pos]):
+                continue
+            if stamped:
+                if self.ordered and upper is not None and key >= upper:
+                    # so is every line after it
+                    return
+                including = lower <= key and (upper is None or key < upper)
+            if including:
+                yield pos
+
+
 class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
     """
     Class for parsing log file content.
@@ -938,7 +1255,10 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         True
 
     Attributes:
-        lines (list): List of the lines from the log file content.
+        lines (list): List of the lines from the log file content.  Lines of
+            files are held in a read-only
+            :class:`insights.core.linebuffer.LineBuffer` instead when the
+            context's ``buffered_lines`` attribute is True.
 
     """
 
@@ -953,14 +1273,38 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
       allows the item keys to provide some form of documentation.
     """
 
+    def _handle_content(self, context):
+        # file datasources can hold the lines in one buffer instead of a list
+        content = getattr(context, "buffered_content", None)
+        self.parse_content(context.content if content is None else content)
+
     def parse_content(self, content):
         """
         Use all the defined scanners to search the log file, setting the
         properties defined in the scanner.
         """
         self.lines = content
-        for scanner in self.scanners:
-            scanner(self)
+        self._run_scanners()
+
+    def _run_scanners(self):
+        """
+        Runs the scanners of the class. Token scanners are evaluated together
+        in one pass over the lines unless the class changes how lines are
+        searched.
+        """
+        cls = type(self)
+        own_get = six.get_unbound_function(cls.get) is not six.get_unbound_function(LogFileOutput.get)
+        own_search = six.get_unbound_function(cls._valid_search) is not six.get_unbound_function(LogFileOutput._valid_search)
+        if own_get or own_search:
+            for scanner in self.scanners:
+                scanner(self)
+            return
+
+        plan = cls.__dict__.get("_scan_plan")
+        if plan is None or plan.size != len(self.scanners):
+            plan = _ScanPlan(self.scanners)
+            cls._scan_plan = plan
+        plan.run(self)
 
     def __contains__(self, s):
         """
@@ -1030,14 +1374,17 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         Raises:
             ValueError: When `result_key` is already a registered scanner key.
         """
-
-        if result_key in cls.scanner_keys:
-            raise ValueError("'%s' is already a registered scanner key" % result_key)
-
         def scanner(self):
             result = func(self)
             setattr(self, result_key, result)
 
+        cls._add_scanner(result_key, scanner)
+
+    @classmethod
+    def _add_scanner(cls, result_key, scanner):
+        if result_key in cls.scanner_keys:
+            raise ValueError("'%s' is already a registered scanner key" % result_key)
+
         cls.scanners.append(scanner)
         cls.scanner_keys.add(result_key)
 
@@ -1056,11 +1403,7 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
             (bool): the property will contain True if a line contained (any
             or all) of the tokens given.
         """
-        def _scan(self):
-            search_by_expression = self._valid_search(token, check)
-            return any(search_by_expression(l) for l in self.lines)
-
-        cls.scan(result_key, _scan)
+        cls._add_scanner(result_key, _TokenScanner(result_key, "token", token, check=check))
 
     @classmethod
     def keep_scan(cls, result_key, token, check=all, num=None, reverse=False):
@@ -1078,10 +1421,8 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         Returns:
             (list): list of dictionaries corresponding to the parsed lines contain the `token`.
         """
-        def _scan(self):
-            return self.get(token, check=check, num=num, reverse=reverse)
-
-        cls.scan(result_key, _scan)
+        scanner = _TokenScanner(result_key, "keep", token, check=check, num=num, reverse=reverse)
+        cls._add_scanner(result_key, scanner)
 
     @classmethod
     def last_scan(cls, result_key, token, check=all):
@@ -1097,11 +1438,7 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         Returns:
             (dict): dictionary corresponding to the last parsed line contains the `token`.
         """
-        def _scan(self):
-            ret = self.get(token, check=check, num=1, reverse=True)
-            return ret[0] if ret else dict()
-
-        cls.scan(result_key, _scan)
+        cls._add_scanner(result_key, _TokenScanner(result_key, "last", token, check=check))
 
     def get_after(self, timestamp, s=None):
         """
@@ -1123,7 +1460,9 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         stamp matching this expression will trigger the decision to include
         or exclude lines. Therefore, if the log for some reason does not
         contain a time stamp that matches this format, no lines will be
-        returned.
+        returned.  The time stamps are found and parsed once, the first time
+        they are needed, and kept for later calls.  When they are in order
+        the lines after `timestamp` are found by binary search.
 
         The time format is given in ``strptime()`` format, in the object's
         ``time_format`` property.  Users of the object should **not** change
@@ -1142,14 +1481,22 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         .. note::
             Some logs - notably /var/log/messages - do not contain a year
             in the timestamp.  This detected by the absence of a '%y' or '%Y' in
-            the time format.  If that year field is absent, the year is assumed
-            to be the year in the given timestamp being sought.  Some attempt is
-            made to handle logs with a rollover from December to January, by
-            finding when the log's timestamp (with current year assumed) is over
-            eleven months (specifically, 330 days) ahead of or behind the
-            timestamp date and shifting that log date by 365 days so that it is
-            more likely to be in the sought range.  This paragraph is sponsored
-            by syslog.
+            the time format.  If that year field is absent, the year of the
+            last line is assumed to be the year in the given timestamp being
+            sought, unless that puts it over eleven months (specifically, 330
+            days) ahead of or behind the timestamp date, in which case it is
+            shifted by a year so that it is more likely to be in the sought
+            range.  Logs with a rollover from December to January are handled
+            by finding where a line's timestamp is over eleven months behind
+            the line before it; the lines before the rollover are taken to be
+            from the year before.  This paragraph is sponsored by syslog.
+
+            The year is decided for the log as a whole, so its lines are
+            never spread across years apart from at rollovers.  Earlier
+            versions shifted each line by a year on its own, which placed
+            the start of a log from January 5 to April 10 in the year after
+            the rest of it when sought from December 20, and returned its
+            January 5 line; now no lines are returned.
 
         Parameters:
             timestamp(datetime.datetime): lines before this time are ignored.
@@ -1168,127 +1515,53 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
                 made to recognise or parse the time zone or other obscure
                 values like day of year or week of year.
         """
-        time_format = self.time_format
-
-        # Annoyingly, strptime insists that it get the whole time string and
-        # nothing but the time string.  However, for most logs we only have a
-        # string with the timestamp in it.  We can't just catch the ValueError
-        # because at that point we do not actually have a valid datetime
-        # object.  So we convert the time format string to a regex, use that
-        # to find just the timestamp, and then use strptime on that.  Thanks,
-        # Python.  All these need to cope with different languages and
-        # character sets.  Note that we don't include time zone or other
-        # outputs (e.g. day-of-year) that don't usually occur in time stamps.
-        format_conversion_for = {
-            'a': r'\w{3}', 'A': r'\w+',  # Week day name
-            'w': r'[0123456]',  # Week day number
-            'd': r'([0 ][123456789]|[12]\d|3[01])',  # Day of month
-            'b': r'\w{3}', 'B': r'\w+',  # Month name
-            'm': r'([0 ]\d|1[012])',  # Month number
-            'y': r'\d{2}', 'Y': r'\d{4}',  # Year
-            'H': r'([01 ]\d|2[0123])',  # Hour - 24 hour format
-            'I': r'([0 ]?\d|1[012])',  # Hour - 12 hour format
-            'p': r'\w{2}',  # AM / PM
-            'M': r'([012345]\d)',  # Minutes
-            'S': r'([012345]\d|60)',  # Seconds, including leap second
-            'f': r'\d{1,6}',  # Microseconds
-        }
+        index = self._get_timestamp_index()
+        lower, = index.query_keys(timestamp)
+        search_by_expression = self._valid_search(s)
+        for pos in index.select(self.lines, lower, search=search_by_expression if s else None):
+            yield self._parse_line(self.lines[pos])
 
-        # Construct the regex from the time string
-        timefmt_re = re.compile(r'%(\w)')
+    def get_between(self, start, end, s=None):
+        """
+        Find all the (available) logs with time stamps from the time stamp
+        `start` up to, but not including, the time stamp `end`.
 
-        def replacer(match):
-            if match.group(1) in format_conversion_for:
-                return format_conversion_for[match.group(1)]
-            else:
-                raise ParseException(
-                    "get_after does not understand strptime format '{c}'".format(
-                        c=match.group(0)
-                    )
-                )
+        This works like :meth:`get_after`, and shares its index of the time
+        stamps of the lines.  Lines without a time stamp follow the last line
+        with one, and the year of logs without years is found from `start`.
 
-        # Please do not attempt to be tricky and put a regular expression
-        # inside your time format, as we are going to also use it in
-        # strptime too and that may not work out so well.
-
-        # Check time_format - must be string or list.  Set the 'logs_have_year'
-        # flag and timestamp parser function appropriately.
-        # Grab values of dict as a list first
-        if isinstance(time_format, dict):
-            time_format = list(time_format.values())
-        if isinstance(time_format, six.string_types):
-            logs_have_year = ('%Y' in time_format or '%y' in time_format)
-            time_re = re.compile('(' + timefmt_re.sub(replacer, time_format) + ')')
-
-            # Curry strptime with time_format string.
-            def test_parser(logstamp):
-                return datetime.datetime.strptime(logstamp, time_format)
-            parse_fn = test_parser
-        elif isinstance(time_format, list):
-            logs_have_year = all('%Y' in tf or '%y' in tf for tf in time_format)
-            time_re = re.compile('(' + '|'.join(
-                timefmt_re.sub(replacer, tf) for tf in time_format
-            ) + ')')
-
-            def test_all_parsers(logstamp):
-                # One of these must match, because the regex has selected only
-                # strings that will match.
-                for tf in time_format:
-                    try:
-                        ts = datetime.datetime.strptime(logstamp, tf)
-                    except ValueError:
-                        pass
-                return ts
-            parse_fn = test_all_parsers
-        else:
-            raise ParseException(
-                "get_after does not recognise time formats of type {t}".format(
-                    t=type(time_format)
-                )
-            )
-
-        # Most logs will appear in string format, but some logs (e.g.
-        # Messages) are available in list-of-dicts format.  So we choose one
-        # of two 'date_compare' functions.  HOWEVER: we still have to check
-        # the string found for a valid date, because log parsing often fails.
-        # Because of generators, we check this per line
+        Parameters:
+            start(datetime.datetime): lines before this time are ignored.
+            end(datetime.datetime): lines from this time on are ignored.
+            s(str or list): one or more strings to search for.
+                If not supplied, all available lines are searched.
 
-        # Now try to find the time stamp in each log line and add lines to
-        # our output if they are currently being included in the log.
+        Yields:
+            dict:
+                The parsed lines with timestamps in the range in the same
+                format they were supplied.  It at least contains the
+                ``raw_message`` as a key.
 
-        eleven_months = datetime.timedelta(days=330)
-        including_lines = False
+        Raises:
+            ParseException: If the format conversion string contains a
+                format that we don't recognise.
+        """
+        index = self._get_timestamp_index()
+        lower, upper = index.query_keys(start, end)
         search_by_expression = self._valid_search(s)
-        for line in self.lines:
-            # If `s` is not None, keywords must be found in the line
-            if s and not search_by_expression(line):
-                continue
-            # Otherwise, search all lines
-            match = time_re.search(line)
-            if match:
-                logstamp = parse_fn(match.group(0))
-                if not logs_have_year:
-                    # Substitute timestamp year for logstamp year
-                    logstamp = logstamp.replace(year=timestamp.year)
-                    if logstamp - timestamp > eleven_months:
-                        # If timestamp in January and log in December, move
-                        # log to previous year
-                        logstamp = logstamp.replace(year=timestamp.year - 1)
-                    elif timestamp - logstamp > eleven_months:
-                        # If timestamp in December and log in January, move
-                        # log to next year
-                        logstamp = logstamp.replace(year=timestamp.year + 1)
-                if logstamp >= timestamp:
-                    # Later - include
-                    including_lines = True
-                    yield self._parse_line(line)
-                else:
-                    # Earlier - start excluding
-                    including_lines = False
-            else:
-                # If we're including lines, add this continuation line
-                if including_lines:
-                    yield self._parse_line(line)
+        for pos in index.select(self.lines, lower, upper, search=search_by_expression if s else None):
+            yield self._parse_line(self.lines[pos])
+
+    def _get_timestamp_index(self):
+        """
+        Returns the index of the time stamps of the lines, building it the
+        first time it's needed or when ``time_format`` has changed.
+        """
+        index = getattr(self, "_timestamp_index", None)
+        if index is None or index.time_format != self.time_format:
+            index = _TimestampIndex(self.lines, self.time_format)
+            self._timestamp_index = index
+        return index
 
 
 class Syslog(LogFileOutput):
@@ -1535,6 +1808,12 @@ class FileListing(Parser):
         ``/etc/yum/repos/d``.  Use caution in checking the paths when
         requesting single directories.
 
+    .. note:: :meth:`listing_of` returns a read-only mapping, not a dict.
+        Its entries are dicts built afresh each time an entry is looked up,
+        so assigning to the mapping raises ``TypeError`` and changes to an
+        entry aren't kept.  Use ``dict(listing_of(directory))`` for a copy
+        that can be modified.
+
     Parses the SELinux information if present in the listing.
     SELinux directory listings contain:
 
@@ -1630,10 +1909,10 @@ class FileListing(Parser):
 
     def listing_of(self, directory):
         """
-        The listing of this directory, in a dictionary by entry name.  All
-        entries contain the original line as is in the 'raw_entry' key.
+        The listing of this directory, in a read-only mapping by entry name.
+        All entries contain the original line as is in the 'raw_entry' key.
         Entries that can be parsed then have fields as described in the class
-        description above.
+        description above.  See :class:`insights.core.ls_parser.Entries`.
         """
         return self.listings[directory]['entries']
 
@@ -1656,16 +1935,10 @@ class FileListing(Parser):
         """
         if path[0] != '/':
             return None
-        path_parts = path.split('/')
-        # Note that here the first element will be '' because it's before the
-        # first separator.  That's OK, the join puts it back together.
-        directory = '/'.join(path_parts[:-1])
-        name = path_parts[-1]
+        directory, _, name = path.rpartition('/')
         if directory not in self.listings:
             return None
-        if name not in self.listings[directory]['entries']:
-            return None
-        return self.listings[directory]['entries'][name]
+        return self.listings[directory]['entries'].get(name)
 
 
 class AttributeDict(dict):
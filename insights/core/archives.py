@@ -2,8 +2,15 @@
 
 import logging
 import os
+import shutil
+import stat
+import tarfile
 import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
 from contextlib import contextmanager
+from insights.core.path_index import IndexedTree, PathIndex, normalize
 from insights.util import fs, subproc, which
 from insights.util.content_type import from_file as content_type_from_file
 
@@ -12,6 +19,12 @@ logger = logging.getLogger(__name__)
 
 COMPRESSION_TYPES = ("zip", "tar", "gz", "bz2", "xz")
 
+MAX_SPILL = 256 * 1024 * 1024
+"""
+Default for the most bytes of members an :class:`ArchiveReader` keeps
+written out after realizing them one at a time.
+"""
+
 
 class InvalidArchive(Exception):
     def __init__(self, msg):
@@ -106,3 +119,261 @@ def extract(path, timeout=None, extract_dir=None, content_type=None):
     finally:
         if extractor.created_tmp_dir:
             fs.remove(extractor.tmp_dir, chmod=True)
+
+
+class ArchiveReader(IndexedTree):
+    """
+    Reads a tar or zip archive without extracting it. The archive's members
+    are listed once into a :class:`insights.core.path_index.PathIndex`, and a
+    member is only decompressed when :meth:`realize` is asked for it.
+
+    The reader presents the archive as if it were extracted into
+    :attr:`tmp_dir`. Its :class:`insights.core.path_index.IndexedTree`
+    methods take and return paths beneath that directory, and
+    :meth:`realize` writes members there, so code that reads realized files
+    needs no changes.
+
+    Members realized one at a time are removed again, oldest first, once
+    they take more than `max_spill` bytes. Members written by
+    :meth:`extract` and :meth:`realize_all`, and members pinned with
+    :meth:`pin` while they're read, are kept.
+
+    Args:
+        path (str): the archive.
+        extract_dir (str): where to create :attr:`tmp_dir`.
+        content_type (str): the archive's content type. Detected if not given.
+        max_spill (int): most bytes of members realized one at a time to
+            keep on disk. Defaults to :data:`MAX_SPILL`.
+    """
+    def __init__(self, path, extract_dir=None, content_type=None, max_spill=MAX_SPILL):
+        self.path = path
+        self.content_type = content_type or content_type_from_file(path)
+        self.index = PathIndex()
+        self.max_spill = max_spill
+        self._members = {}
+        self._lock = threading.Lock()
+        self._realized = set()
+        # members realized one at a time, oldest first, and their sizes
+        self._spilled = OrderedDict()
+        self._spilled_size = 0
+        # how many readers have pinned each member
+        self._pins = {}
+        # where the last member read from a compressed tar ended
+        self._offset = 0
+        self._extracted = False
+
+        if self.content_type == "application/zip":
+            self._archive = zipfile.ZipFile(path)
+            self._index_zip()
+        else:
+            if self.content_type not in TarExtractor.TAR_FLAGS:
+                raise InvalidContentType(self.content_type)
+            try:
+                self._archive = tarfile.open(path)
+            except (tarfile.TarError, EnvironmentError) as ex:
+                raise InvalidArchive("Unable to read %s: %s" % (path, ex))
+            self._index_tar()
+        self.tmp_dir = tempfile.mkdtemp(prefix="insights-", dir=extract_dir)
+        super(ArchiveReader, self).__init__(self.tmp_dir, self.index)
+
+    def _index_tar(self):
+        for m in self._archive:
+            name = m.name
+            if name.endswith("/dev/null"):
+                continue
+            if m.isdir():
+                self.index.add_dir(name)
+            elif m.issym():
+                self.index.add_link(name, m.linkname)
+            elif m.isfile() or m.islnk():
+                self.index.add_file(name)
+                self._members[normalize(name)] = m
+
+    def _index_zip(self):
+        for info in self._archive.infolist():
+            name = info.filename
+            mode = info.external_attr >> 16
+            if name.endswith("/"):
+                self.index.add_dir(name)
+            elif stat.S_ISLNK(mode):
+                self.index.add_link(name, self._archive.read(info).decode("utf-8"))
+            else:
+                self.index.add_file(name)
+                self._members[normalize(name)] = info
+
+    def realize(self, path):
+        """
+        Writes the archive member for path beneath :attr:`tmp_dir` if it
+        hasn't been already. Symbolic links are written as copies of their
+        targets.
+
+        Reading a compressed tar backwards means decompressing it again from
+        the start, so members of one are read in archive order, and the first
+        time a member before the last one read is asked for, the rest of the
+        archive is extracted in a single pass instead.
+
+        Raises:
+            IOError: if path isn't a file in the archive.
+        """
+        rel = self._rel(path)
+        resolved = self.index.resolve(rel) if rel is not None else None
+        member = self._members.get(resolved) if resolved is not None else None
+        if member is None:
+            raise IOError("%s is not a file in %s" % (path, self.path))
+
+        zipped = isinstance(self._archive, zipfile.ZipFile)
+        compressed = not zipped and self.content_type != "application/x-tar"
+        with self._lock:
+            if rel in self._spilled:
+                self._spilled[rel] = self._spilled.pop(rel)
+            if rel in self._realized:
+                return path
+            behind = compressed and member.offset_data < self._offset
+            extract_all = behind and not self._extracted
+            if extract_all:
+                self._extracted = True
+        if extract_all:
+            self.realize_all()
+            if rel in self._realized:
+                return path
+
+        with self._lock:
+            if rel in self._realized:
+                return path
+            fs.ensure_path(os.path.dirname(path))
+            if zipped:
+                src = self._archive.open(member)
+            else:
+                src = self._archive.extractfile(member)
+            try:
+                with open(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            finally:
+                src.close()
+            if compressed:
+                self._offset = member.offset_data + member.size
+            self._realized.add(rel)
+            self._spill(rel, member.file_size if zipped else member.size)
+        return path
+
+    def pin(self, path):
+        """
+        Realizes path like :meth:`realize` and keeps it from being removed to
+        make room for other members until :meth:`unpin` is called for it as
+        many times as it was pinned.
+        """
+        rel = self._rel(path)
+        with self._lock:
+            self._pins[rel] = self._pins.get(rel, 0) + 1
+        try:
+            return self.realize(path)
+        except BaseException:
+            self.unpin(path)
+            raise
+
+    def unpin(self, path):
+        """
+        Releases a pin taken with :meth:`pin`.
+        """
+        rel = self._rel(path)
+        with self._lock:
+            count = self._pins.pop(rel, 0) - 1
+            if count > 0:
+                self._pins[rel] = count
+
+    def _spill(self, rel, size):
+        # the caller holds the lock
+        self._spilled[rel] = size
+        self._spilled_size += size
+        for old in list(self._spilled):
+            if self._spilled_size <= self.max_spill:
+                break
+            if old == rel or old in self._pins:
+                continue
+            old_size = self._spilled.pop(old)
+            self._spilled_size -= old_size
+            self._realized.discard(old)
+            try:
+                os.remove(self._abs(old))
+            except OSError:
+                pass
+
+    def extract(self, paths, timeout=None):
+        """
+        Writes the archive members for paths beneath :attr:`tmp_dir` with a
+        single ``tar`` invocation, which is much faster than realizing them
+        one at a time from a compressed tar. Paths that aren't files in the
+        archive or were already realized are skipped. Symbolic links are
+        written as copies of their targets, as :meth:`realize` does.
+        """
+        wanted = {}
+        for path in paths:
+            rel = self._rel(path)
+            if rel is None or rel in self._realized:
+                continue
+            resolved = self.index.resolve(rel)
+            if resolved in self._members:
+                wanted[rel] = resolved
+        if not wanted:
+            return
+
+        if isinstance(self._archive, zipfile.ZipFile):
+            for rel in wanted:
+                self.realize(self._abs(rel))
+            return
+
+        with self._lock:
+            names = set(r for r in wanted.values() if r not in self._realized and self._members[r].isfile())
+            if names:
+                fd, listing = tempfile.mkstemp(prefix="insights-members-")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        for r in sorted(names):
+                            name = self._members[r].name
+                            if not isinstance(name, bytes):
+                                name = name.encode("utf-8", "surrogateescape")
+                            f.write(name + b"\0")
+                    tar_flag = TarExtractor.TAR_FLAGS[self.content_type]
+                    # -C has to come before the names it applies to
+                    command = "tar --delay-directory-restore %s -x --no-recursion -f %s -C %s --null -T %s" % (
+                        tar_flag, self.path, self.tmp_dir, listing)
+                    logger.debug("Extracting %d members in '%s'", len(names), self.tmp_dir)
+                    subproc.call(command, timeout=timeout)
+                finally:
+                    os.remove(listing)
+                self._realized.update(names)
+
+        # hard links and links to members extracted above
+        for rel, resolved in wanted.items():
+            if resolved not in self._realized:
+                self.realize(self._abs(resolved))
+            if rel != resolved:
+                with self._lock:
+                    if rel not in self._realized:
+                        dst = self._abs(rel)
+                        fs.ensure_path(os.path.dirname(dst))
+                        shutil.copyfile(self._abs(resolved), dst)
+                        self._realized.add(rel)
+
+    def realize_all(self, timeout=None):
+        """
+        Writes every regular file in the archive beneath :attr:`tmp_dir`.
+        """
+        self.extract(self.files(), timeout=timeout)
+
+    def close(self):
+        self._archive.close()
+        fs.remove(self.tmp_dir, chmod=True)
+
+
+@contextmanager
+def open_archive(path, extract_dir=None, content_type=None):
+    """
+    Opens path with an :class:`ArchiveReader` and yields it. Realized members
+    are removed when the block exits.
+    """
+    reader = ArchiveReader(path, extract_dir=extract_dir, content_type=content_type)
+    try:
+        yield reader
+    finally:
+        reader.close()
@@ -0,0 +1,273 @@
+"""
+Long running batch analysis. Components are loaded and the dependency graph is
+built once, then archive paths are read from a source and evaluated by a pool
+of workers. One JSON document is written per archive, on a line of its own,
+holding the same response ``insights-run -f json`` prints plus an ``archive``
+key with the path. Archives that can't be processed get a document with an
+``error`` key instead.
+
+Paths can come from:
+
+- a stream like stdin, one path per line.
+- a spool directory. Files moved into it are claimed by renaming them into
+  its ``.work`` subdirectory and removed once their result is written.
+  Writers should create files under a name starting with ``.`` and rename
+  them when they're complete.
+- a Unix socket. Each connection sends paths one per line and gets a result
+  line back for each.
+
+.. code-block:: shell
+
+    find /uploads -name '*.tar.gz' | insights-run -p my_rules --serve
+    insights-run -p my_rules --serve --spool /var/spool/insights --workers 8
+    insights-run -p my_rules --serve --socket /run/insights.sock
+
+Workers created here are forked from the serving process, so they inherit the
+loaded components instead of importing them again.
+"""
+import json
+import logging
+import os
+import select
+import sys
+import threading
+import time
+import traceback
+
+from six.moves import socketserver
+
+from insights.core import dr
+
+log = logging.getLogger(__name__)
+
+_OPTIONS = {}
+"""
+What workers evaluate: the graph, the plan compiled from it, and the options
+:func:`analyze` passes to :func:`insights._run`. Set before the pool is
+created so forked workers inherit it rather than having components pickled
+and the plan compiled again for every archive.
+"""
+
+
+def analyze(path):
+    """
+    Evaluates the graph in :data:`_OPTIONS` against the archive or directory
+    at path and returns the result as a line of JSON.
+    """
+    from insights import _run
+    from insights.core.evaluators import SingleEvaluator
+    from insights.formats import get_response_of_types
+
+    try:
+        broker = dr.Broker()
+        evaluator = SingleEvaluator(broker)
+        evaluator.preprocess()
+        _run(broker, _OPTIONS["graph"], path,
+             context=_OPTIONS.get("context"),
+             targets=_OPTIONS.get("targets"),
+             extract_archive=_OPTIONS.get("extract_archive", True),
+             plan=_OPTIONS.get("plan"))
+        response = get_response_of_types(evaluator.get_response(), missing=False)
+        response["archive"] = path
+        return json.dumps(response)
+    except Exception as ex:
+        log.debug(traceback.format_exc())
+        return json.dumps({"archive": path, "error": "%s: %s" % (type(ex).__name__, ex)})
+
+
+def read_paths(stream, interval=1.0):
+    """
+    Generates the paths in stream, one per line. If the stream has a file
+    descriptor, None is generated whenever no path arrived for interval
+    seconds, so results can be written while the stream is idle. The
+    descriptor is read directly rather than from a thread, since forking
+    workers while a thread holds the stream's lock would deadlock them.
+    """
+    try:
+        fd = stream.fileno()
+    except (AttributeError, IOError, ValueError):
+        fd = None
+
+    if fd is None:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+        return
+
+    buf = b""
+    while True:
+        ready, _, _ = select.select([fd], [], [], interval)
+        if not ready:
+            yield None
+            continue
+        data = os.read(fd, 65536)
+        if not data:
+            break
+        lines = (buf + data).split(b"\n")
+        buf = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield line.decode("utf-8")
+    if buf.strip():
+        yield buf.strip().decode("utf-8")
+
+
+def watch_spool(spool, interval=1.0):
+    """
+    Generates the paths of files moved into the spool directory forever,
+    after claiming each by renaming it into the ``.work`` subdirectory.
+    None is generated after each scan that finds nothing new.
+    """
+    work = os.path.join(spool, ".work")
+    if not os.path.isdir(work):
+        os.makedirs(work)
+    while True:
+        found = False
+        for name in sorted(os.listdir(spool)):
+            if name.startswith("."):
+                continue
+            src = os.path.join(spool, name)
+            dst = os.path.join(work, name)
+            try:
+                os.rename(src, dst)
+            except OSError:
+                # another server claimed it
+                continue
+            found = True
+            yield dst
+        if not found:
+            yield None
+            time.sleep(interval)
+
+
+class BatchProcessor(object):
+    """
+    Submits archive paths to an executor and writes their results to stream
+    as they complete.
+
+    Args:
+        executor: a ``concurrent.futures`` style executor.
+        stream: where result lines are written.
+        max_pending (int): most archives submitted at once, which bounds the
+            disk used by extractions. Defaults to twice the CPU count. It
+            applies to :meth:`process` and, across all the threads calling
+            it, to :meth:`run`.
+        interval (float): seconds to wait for results before polling an idle
+            source again.
+    """
+    def __init__(self, executor, stream=sys.stdout, max_pending=None, interval=1.0):
+        import multiprocessing
+        self.executor = executor
+        self.stream = stream
+        self.max_pending = max_pending or 2 * multiprocessing.cpu_count()
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def submit(self, path):
+        return self.executor.submit(analyze, path)
+
+    def run(self, path):
+        """
+        Evaluates path and returns its result line, waiting for a slot first
+        if max_pending archives are already in flight.
+        """
+        with self._slots:
+            return self.submit(path).result()
+
+    def emit(self, line):
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def process(self, paths, done=None):
+        """
+        Processes the paths generated by paths, which may generate None to
+        signal it has nothing ready. done is called with each path after its
+        result is written.
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        paths = iter(paths)
+        pending = {}
+        exhausted = False
+        while True:
+            idle = False
+            while not exhausted and len(pending) < self.max_pending:
+                try:
+                    path = next(paths)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if path is None:
+                    idle = True
+                    break
+                pending[self.submit(path)] = path
+            if not pending:
+                if exhausted:
+                    return
+                continue
+            finished, _ = wait(pending, timeout=self.interval if idle else None, return_when=FIRST_COMPLETED)
+            for f in finished:
+                path = pending.pop(f)
+                self.emit(f.result())
+                if done is not None:
+                    done(path)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in iter(self.rfile.readline, b""):
+            path = line.decode("utf-8").strip()
+            if path:
+                result = self.server.processor.run(path)
+                self.wfile.write(result.encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(graph, context=None, targets=None, extract_archive=True, workers=None,
+          spool=None, socket_path=None, stream=sys.stdin, output=sys.stdout, executor=None):
+    """
+    Evaluates graph against archives until the source is exhausted or the
+    server is interrupted. Archives are read from the spool directory, the
+    Unix socket at socket_path, or stream, in that order of preference. A
+    ``ProcessPoolExecutor`` with the given number of workers is created if
+    an executor isn't passed.
+    """
+    if "plan" not in _OPTIONS or _OPTIONS.get("graph") is not graph:
+        single = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
+        _OPTIONS["plan"] = dr.compile_plan(single)
+    _OPTIONS.update(graph=graph, context=context, targets=targets, extract_archive=extract_archive)
+
+    if executor is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        kwargs = {}
+        # mp_context is new in python 3.7
+        if sys.version_info >= (3, 7) and "fork" in multiprocessing.get_all_start_methods():
+            kwargs["mp_context"] = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(workers, **kwargs) as pool:
+            return serve(graph, context=context, targets=targets, extract_archive=extract_archive,
+                         spool=spool, socket_path=socket_path, stream=stream, output=output, executor=pool)
+
+    processor = BatchProcessor(executor, stream=output)
+    if spool:
+        processor.process(watch_spool(spool, processor.interval), done=os.remove)
+    elif socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _Server(socket_path, _Handler)
+        server.processor = processor
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.remove(socket_path)
+    else:
+        processor.process(read_paths(stream, processor.interval))
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
-import itertools
+import multiprocessing
 import os
+import uuid
 from collections import defaultdict
 
 import pandas as pd
@@ -14,9 +15,6 @@ from insights.core.hydration import create_context
 from insights.specs import Specs
 
 
-ID_GENERATOR = itertools.count()
-
-
 class ClusterMeta(dict):
     def __init__(self, num_members, kwargs):
         self.num_members = num_members
@@ -28,7 +26,8 @@ def machine_id(mid, hn):
     ds = mid or hn
     if ds:
         return ds.content[0].strip()
-    return str(next(ID_GENERATOR))
+    # unique across the worker processes evaluating hosts
+    return str(uuid.uuid4())
 
 
 def parse_inventory(path):
@@ -61,16 +60,74 @@ def process_archives(graph, archives):
             yield dr.run(graph, broker=broker)
 
 
+def host_facts(graph, archive):
+    """
+    Extracts archive if it's a file, evaluates the host graph against it, and
+    returns the host's machine id and the results of its ``plugins.fact``
+    components. The broker is discarded, so only the facts leave a worker
+    process.
+    """
+    if os.path.isfile(archive):
+        with extract(archive) as ex:
+            return host_facts(graph, ex.tmp_dir)
+    ctx = create_context(archive)
+    broker = dr.Broker()
+    broker[ctx.__class__] = ctx
+    broker = dr.run(graph, broker=broker)
+    return broker[machine_id], broker.get_by_type(plugins.fact)
+
+
+def add_facts(results, mid, facts):
+    for k, v in facts.items():
+        r = attach_machine_id(v, mid)
+        if isinstance(r, list):
+            results[k].extend(r)
+        else:
+            results[k].append(r)
+    return results
+
+
 def extract_facts(brokers):
     results = defaultdict(list)
     for b in brokers:
-        mid = b[machine_id]
-        for k, v in b.get_by_type(plugins.fact).items():
-            r = attach_machine_id(v, mid)
-            if isinstance(r, list):
-                results[k].extend(r)
-            else:
-                results[k].append(r)
+        add_facts(results, b[machine_id], b.get_by_type(plugins.fact))
+    return results
+
+
+def collect_facts(graph, archives, executor, max_extractions=None):
+    """
+    Evaluates the host graph against each archive with executor and merges
+    the facts of every host. At most ``max_extractions`` archives are
+    submitted at once, which bounds the disk used by extractions, and
+    defaults to the number of CPUs. Facts are merged as soon as the hosts
+    before them in archives are done, so the order of the rows doesn't
+    depend on which host finishes first.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    max_extractions = max_extractions or multiprocessing.cpu_count()
+    results = defaultdict(list)
+    finished = {}
+    pending = {}
+    todo = iter(enumerate(archives))
+    merged = 0
+    try:
+        while True:
+            for i, archive in todo:
+                pending[executor.submit(host_facts, graph, archive)] = i
+                if len(pending) >= max_extractions:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                finished[pending.pop(f)] = f.result()
+            while merged in finished:
+                add_facts(results, *finished.pop(merged))
+                merged += 1
+    finally:
+        for f in pending:
+            f.cancel()
     return results
 
 
@@ -81,15 +138,39 @@ def process_facts(facts, meta, broker, cluster_graph):
     return dr.run(cluster_graph, broker=broker)
 
 
-def process_cluster(graph, archives, broker, inventory=None):
+def process_cluster(graph, archives, broker, inventory=None, executor=None, max_extractions=None):
+    """
+    Evaluates the host components of graph against each archive, then the
+    cluster components against the facts gathered from every host.
+
+    Hosts are processed by executor, a ``concurrent.futures`` style
+    executor. A ``ProcessPoolExecutor`` is created for the call if one isn't
+    provided and there's more than one archive. See :func:`collect_facts`
+    for ``max_extractions``. Archives are processed one after another if
+    ``concurrent.futures`` isn't available.
+    """
+    if executor is None and len(archives) > 1:
+        try:
+            from concurrent.futures import ProcessPoolExecutor
+        except ImportError:
+            pass
+        else:
+            with ProcessPoolExecutor() as pool:
+                return process_cluster(graph, archives, broker, inventory=inventory, executor=pool,
+                                       max_extractions=max_extractions)
+
     host_graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
     host_graph[machine_id] = dr.DELEGATES[machine_id].dependencies
     cluster_graph = dict((k, v) for k, v in graph.items() if k not in host_graph)
 
     inventory = parse_inventory(inventory) if inventory else {}
 
-    brokers = process_archives(host_graph, archives)
-    facts = extract_facts(brokers)
+    if executor is None:
+        facts = defaultdict(list)
+        for archive in archives:
+            add_facts(facts, *host_facts(host_graph, archive))
+    else:
+        facts = collect_facts(host_graph, archives, executor, max_extractions=max_extractions)
     meta = ClusterMeta(len(archives), inventory)
 
     return process_facts(facts, meta, broker, cluster_graph)
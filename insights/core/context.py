@@ -2,6 +2,7 @@ import logging
 import os
 import six
 from contextlib import contextmanager
+from insights.core.path_index import PathIndex
 from insights.util import streams, subproc
 
 log = logging.getLogger(__name__)
@@ -140,16 +141,68 @@ class ExecutionContextMeta(type):
     # Remember that contexts are tried *in reverse order* so that they
     # may be overridden by just loading a plugin.
     @classmethod
-    def identify(cls, files):
+    def identify(cls, files, index=None, root=os.path.sep):
+        """
+        Returns the root and class of the first context that handles files.
+        The files are indexed once for all contexts. Pass a
+        :class:`insights.core.path_index.PathIndex` of them relative to root
+        if one already exists.
+        """
+        if index is None:
+            index = _index_files(files)
+            root = os.path.sep
+        default = ExecutionContext.handles.__func__
         for e in reversed(cls.registry):
-            root, ctx = e.handles(files)
+            if getattr(e.handles, "__func__", None) is default:
+                root_path, ctx = e.handles(files, index=index, root=root)
+            else:
+                root_path, ctx = e.handles(files)
             if ctx is not None:
-                return (root, ctx)
+                return (root_path, ctx)
         return (None, None)
 
 
+def _index_files(files):
+    index = PathIndex()
+    for f in files:
+        index.add_file(f)
+    return index
+
+
 class ExecutionContext(six.with_metaclass(ExecutionContextMeta)):
     marker = None
+    native_filtering = False
+    """
+    Whether filtered text files are filtered in process instead of with a
+    ``grep`` and ``sed`` pipeline. The pipeline is used unless this is set
+    to True on a context class or instance.
+    """
+    buffered_lines = True
+    """
+    Whether text files read by :class:`insights.core.LogFileOutput` parsers
+    are loaded into a :class:`insights.core.linebuffer.LineBuffer`, one buffer
+    with the offsets of the lines, instead of a list of strings.
+    """
+    mapped_files = False
+    """
+    Whether unfiltered files loaded into line buffers are mapped into memory
+    instead of being read. Each mapped file keeps a file descriptor open for
+    as long as its parser is kept, so only set this where the number of
+    mapped logs stays well below the open file limit, and never for the live
+    host, where logs may be truncated while they're mapped.
+    """
+    archive = None
+    """
+    The :class:`insights.core.archives.ArchiveReader` of an archive that's
+    read without being extracted, or None. File datasources look up paths
+    beneath ``root`` in it instead of on disk.
+    """
+    tree = None
+    """
+    The :class:`insights.core.path_index.IndexedTree` built when the files
+    beneath ``root`` were identified, or None. File datasources resolve paths
+    and glob patterns with it instead of the file system.
+    """
 
     def __init__(self, root="/", timeout=None, all_files=None):
         self.root = root
@@ -157,29 +210,24 @@ class ExecutionContext(six.with_metaclass(ExecutionContextMeta)):
         self.all_files = all_files or []
 
     @classmethod
-    def handles(cls, files):
+    def handles(cls, files, index=None, root=os.path.sep):
+        """
+        Returns the directory containing the class's marker and the class,
+        or ``(None, None)`` if no file path contains the marker. ``index``
+        and ``root`` are as for :meth:`ExecutionContextMeta.identify`.
+        """
         if cls.marker is None or not files:
             return (None, None)
 
-        sep = os.path.sep
-        m = sep + cls.marker.lstrip(sep)
-        marker_root = set()
-        for f in files:
-            if m in f:
-                i = f.find(m)
-                if f.endswith(m) or f[i + len(m)] == sep:
-                    root = os.path.dirname(f[:i + 1])
-                    marker_root.add(root)
-        if len(marker_root) == 1:
-            return (marker_root.pop(), cls)
-        if len(marker_root) > 1:
-            # when more marker found, return the one which is closest to root
-            closest_root = marker_root.pop()
-            for left_one in marker_root:
-                if len(left_one) < len(closest_root):
-                    closest_root = left_one
-            return (closest_root, cls)
-        return (None, None)
+        if index is None:
+            index = _index_files(files)
+            root = os.path.sep
+        marker_root = index.find(cls.marker)
+        if not marker_root:
+            return (None, None)
+        # when more marker found, return the one which is closest to root
+        closest_root = min(marker_root, key=len)
+        return (os.path.join(root, closest_root) if closest_root else root, cls)
 
     def check_output(self, cmd, timeout=None, keep_rc=False, env=None, signum=None):
         """ Subclasses can override to provide special
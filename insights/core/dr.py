@@ -56,11 +56,13 @@ import pkgutil
 import re
 import six
 import sys
+import threading
 import time
 import traceback
 
-from collections import defaultdict
+from collections import defaultdict, deque
 from functools import reduce as _reduce
+from six.moves import queue
 
 from insights.contrib import importlib
 from insights.contrib.toposort import toposort_flatten
@@ -83,7 +85,46 @@ COMPONENTS = defaultdict(lambda: defaultdict(set))
 DELEGATES = {}
 HIDDEN = set()
 IGNORE = defaultdict(set)
-ENABLED = defaultdict(lambda: True)
+
+_GENERATION = 0
+
+
+def _invalidate_plans():
+    """
+    Marks every compiled :class:`RunPlan` as stale. Called whenever components
+    are registered, gain dependencies, or are enabled or disabled.
+    """
+    global _GENERATION
+    _GENERATION += 1
+
+
+class EnabledRegistry(defaultdict):
+    """
+    The ``defaultdict`` holding whether components are enabled. Explicitly
+    setting a value invalidates compiled run plans. Looking up a component
+    that hasn't been configured stores the default without invalidating them.
+    """
+    def __missing__(self, key):
+        if self.default_factory is None:
+            raise KeyError(key)
+        value = self.default_factory()
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        super(EnabledRegistry, self).__setitem__(key, value)
+        _invalidate_plans()
+
+    def __delitem__(self, key):
+        super(EnabledRegistry, self).__delitem__(key)
+        _invalidate_plans()
+
+    def update(self, *args, **kwargs):
+        super(EnabledRegistry, self).update(*args, **kwargs)
+        _invalidate_plans()
+
+
+ENABLED = EnabledRegistry(lambda: True)
 
 
 def set_enabled(component, enabled=True):
@@ -497,6 +538,7 @@ def _register_component(delegate):
 
     MODULE_NAMES[component] = get_module_name(component)
     BASE_MODULE_NAMES[component] = get_base_module_name(component)
+    _invalidate_plans()
 
 
 class ComponentType(object):
@@ -668,7 +710,7 @@ class ComponentType(object):
         Gets required and at-least-one dependencies not provided by the broker.
         """
         missing_required = [r for r in self.requires if r not in broker]
-        missing_at_least_one = [d for d in self.at_least_one if not set(d).intersection(broker)]
+        missing_at_least_one = [d for d in self.at_least_one if not any(c in broker for c in d)]
         if missing_required or missing_at_least_one:
             return (missing_required, missing_at_least_one)
 
@@ -695,6 +737,60 @@ class ComponentType(object):
 
         DEPENDENCIES[self.component].add(dep)
         COMPONENTS[group][self.component].add(dep)
+        _invalidate_plans()
+
+
+class _NoProfile(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PROFILE = _NoProfile()
+
+
+class LazyValue(object):
+    """
+    Stands in for a component's instance in a :class:`Broker` until the
+    instance is first accessed. The instance is produced by calling ``load``
+    with no arguments, once, and shared by every broker holding the
+    placeholder. ``load`` should raise :class:`SkipComponent` if there turns
+    out to be no instance.
+    """
+    def __init__(self, load):
+        self._load = load
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+        self._error = None
+
+    def get(self):
+        with self._lock:
+            if not self._loaded:
+                try:
+                    self._value = self._load()
+                except SkipComponent as ex:
+                    self._error = ex
+                self._loaded = True
+                self._load = None
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def __getstate__(self):
+        try:
+            self.get()
+        except SkipComponent:
+            pass
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
 
 class Broker(object):
@@ -727,9 +823,35 @@ class Broker(object):
             :func:`time.time`. For components that produce multiple instances,
             the execution time here is the sum of their individual execution
             times.
+        profiler: an optional object with a ``profile(component)`` method
+            returning a context manager, like
+            :class:`insights.core.profiler.Profiler`. If set, each component's
+            invocation is evaluated within it. Defaults to ``None``.
+        parse_cache: an optional
+            :class:`insights.core.parse_cache.ParseCache` parsers are loaded
+            from and stored to. Defaults to ``None``.
+        parse_cache_stats (dict): counts of parse cache ``hits`` and
+            ``misses`` for this broker.
+
+    Adding instances and exceptions is guarded by a lock, so a broker can be
+    shared by the worker threads of :func:`run_parallel`. Observers, the
+    profiler, and the lock aren't pickled with a broker.
+
+    Instances can be added lazily with :meth:`set_lazy`. The component counts
+    as present in ``instances``, iteration and :meth:`keys`, but its instance
+    is only produced when it's retrieved or checked with ``in``. If that
+    fails, the component is removed.
     """
     def __init__(self, seed_broker=None):
-        self.instances = dict(seed_broker.instances) if seed_broker else {}
+        self._lock = threading.RLock()
+        if seed_broker is not None:
+            with seed_broker._lock:
+                self.instances = dict(seed_broker.instances)
+        else:
+            self.instances = {}
+        self.profiler = seed_broker.profiler if seed_broker is not None else None
+        self.parse_cache = seed_broker.parse_cache if seed_broker is not None else None
+        self.parse_cache_stats = {"hits": 0, "misses": 0}
         self.missing_requirements = {}
         self.exceptions = defaultdict(list)
         self.tracebacks = {}
@@ -791,11 +913,39 @@ class Broker(object):
                         log.exception(e)
 
     def add_exception(self, component, ex, tb=None):
-        if isinstance(ex, MissingRequirements):
-            self.missing_requirements[component] = ex.requirements
-        else:
-            self.exceptions[component].append(ex)
-            self.tracebacks[ex] = tb
+        with self._lock:
+            if isinstance(ex, MissingRequirements):
+                self.missing_requirements[component] = ex.requirements
+            else:
+                self.exceptions[component].append(ex)
+                self.tracebacks[ex] = tb
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["observers"] = defaultdict(set)
+        state["profiler"] = None
+        state["parse_cache"] = None
+        return state
+
+    def profile(self, component):
+        """
+        Returns the context manager a component's invocation is evaluated in.
+        """
+        if self.profiler is None:
+            return _NO_PROFILE
+        return self.profiler.profile(component)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def count_parse_cache(self, hit):
+        """
+        Records a parse cache hit or miss in :attr:`parse_cache_stats`.
+        """
+        with self._lock:
+            self.parse_cache_stats["hits" if hit else "misses"] += 1
 
     def __iter__(self):
         return iter(self.instances)
@@ -803,10 +953,18 @@ class Broker(object):
     def keys(self):
         return self.instances.keys()
 
+    def _load_all(self):
+        with self._lock:
+            lazy = [k for k, v in self.instances.items() if isinstance(v, LazyValue)]
+        for k in lazy:
+            self.get(k)
+
     def items(self):
+        self._load_all()
         return self.instances.items()
 
     def values(self):
+        self._load_all()
         return self.instances.values()
 
     def get_by_type(self, _type):
@@ -814,29 +972,61 @@ class Broker(object):
         Return all of the instances of :class:`ComponentType` ``_type``.
         """
         r = {}
-        for k, v in self.items():
-            if get_component_type(k) is _type:
-                r[k] = v
+        with self._lock:
+            keys = [k for k in self.instances if get_component_type(k) is _type]
+        for k in keys:
+            try:
+                r[k] = self[k]
+            except KeyError:
+                pass
         return r
 
+    def set_lazy(self, component, load):
+        """
+        Adds a component whose instance is produced by calling ``load`` the
+        first time it's needed. See :class:`LazyValue`.
+        """
+        self[component] = LazyValue(load)
+
     def __contains__(self, component):
-        return component in self.instances
+        if component not in self.instances:
+            return False
+        try:
+            self[component]
+            return True
+        except KeyError:
+            return False
 
     def __setitem__(self, component, instance):
         msg = "Already exists in broker with key: %s"
-        if component in self.instances:
-            raise KeyError(msg % get_name(component))
+        with self._lock:
+            if component in self.instances:
+                raise KeyError(msg % get_name(component))
 
-        self.instances[component] = instance
+            self.instances[component] = instance
 
     def __delitem__(self, component):
-        if component in self.instances:
-            del self.instances[component]
-            return
+        with self._lock:
+            if component in self.instances:
+                del self.instances[component]
+                return
 
     def __getitem__(self, component):
         if component in self.instances:
-            return self.instances[component]
+            value = self.instances[component]
+            if not isinstance(value, LazyValue):
+                return value
+            try:
+                result = value.get()
+            except SkipComponent:
+                with self._lock:
+                    if self.instances.get(component) is value:
+                        del self.instances[component]
+            else:
+                with self._lock:
+                    if self.instances.get(component) is value:
+                        self.instances[component] = result
+                return result
 
         raise KeyError("Unknown component: %s" % get_name(component))
 
@@ -916,6 +1106,9 @@ def run_order(graph):
 
 
 def _determine_components(components):
+    if isinstance(components, RunPlan):
+        return components.refresh().graph
+
     if isinstance(components, dict):
         return components
 
@@ -935,6 +1128,187 @@ def _determine_components(components):
         return COMPONENTS[components]
 
 
+class PruneReport(object):
+    """
+    Describes what :func:`prune` removed from a graph.
+
+    Attributes:
+        total (int): the number of components in the original graph.
+        unreachable (set): components that no target depends on, directly or
+            indirectly.
+        unsatisfiable (set): components whose requirements can't be met
+            given the components in the broker.
+    """
+    def __init__(self, total, unreachable, unsatisfiable):
+        self.total = total
+        self.unreachable = unreachable
+        self.unsatisfiable = unsatisfiable
+
+    @property
+    def pruned(self):
+        return self.unreachable | self.unsatisfiable
+
+    def get_pruned_of_type(self, _type):
+        """
+        Return the pruned components whose :class:`ComponentType` is ``_type``
+        or a subclass of it.
+        """
+        return set(c for c in self.pruned
+                   if get_component_type(c) and issubclass(get_component_type(c), _type))
+
+    def __repr__(self):
+        msg = "<PruneReport(total=%d, unreachable=%d, unsatisfiable=%d)>"
+        return msg % (self.total, len(self.unreachable), len(self.unsatisfiable))
+
+
+def _is_satisfiable(component, available):
+    delegate = DELEGATES[component]
+    if any(r not in available for r in delegate.requires):
+        return False
+    return all(available.intersection(alo) for alo in delegate.at_least_one)
+
+
+def prune(components, targets=None, broker=None):
+    """
+    Removes components from a graph that can't contribute to the evaluation of
+    the targets.
+
+    Working backwards from the enabled targets, only components they depend on
+    are kept. Disabled components don't pull in their dependencies. If a
+    broker is passed, components already in it are treated as available, and
+    working forward from them, non-target components whose requirements could
+    never be met are dropped as well. Targets themselves are always kept so
+    they are still reported as missing requirements if they can't run.
+
+    Args:
+        components: Can be one of a dependency graph, a single component, a
+            component group, or a component type.
+
+    Keyword Args:
+        targets (list): the components whose results are wanted. Defaults to
+            the components of the graph nothing else in the graph depends on.
+        broker (Broker): the broker that will be used for evaluation, seeded
+            with contexts and any other initial components.
+
+    Returns:
+        tuple: the pruned dependency graph and a :class:`PruneReport`.
+    """
+    graph = _determine_components(components)
+
+    if targets is None:
+        needed = _reduce(set.union, graph.values(), set())
+        targets = [c for c in graph if c not in needed]
+    elif not isinstance(targets, (list, set, tuple)):
+        targets = [targets]
+    targets = set(t for t in targets if t in graph)
+
+    reachable = set()
+    frontier = list(targets)
+    while frontier:
+        component = frontier.pop()
+        if component in reachable:
+            continue
+        reachable.add(component)
+        if component in DELEGATES and not is_enabled(component):
+            continue
+        frontier.extend(d for d in graph.get(component, []) if d in graph)
+
+    sub = dict((c, graph[c]) for c in reachable)
+    unsatisfiable = set()
+    if broker is not None:
+        available = set()
+        for component in run_order(sub):
+            if component in broker.instances:
+                available.add(component)
+            elif component in sub and component in DELEGATES and is_enabled(component) and _is_satisfiable(component, available):
+                available.add(component)
+            elif component in sub and component not in targets:
+                unsatisfiable.add(component)
+
+    kept = reachable - unsatisfiable
+    pruned = dict((c, set(d for d in graph[c] if d in kept)) for c in kept)
+    report = PruneReport(len(graph), set(graph) - reachable, unsatisfiable)
+    return pruned, report
+
+
+class RunPlan(object):
+    """
+    A precompiled evaluation plan for a graph of components. It freezes the
+    graph, its topological order, and which delegate (if any) should be
+    invoked for each step, so repeated calls to :func:`run` or
+    :func:`run_incremental` over the same graph don't redo that work.
+
+    A plan notices when components are loaded, gain dependencies, or are
+    enabled or disabled after it was compiled and recompiles itself the next
+    time it's used.
+
+    Attributes:
+        graph (dict): the dependency graph the plan evaluates.
+        order (list): the components of the graph in evaluation order.
+        steps (list): ``(component, delegate)`` pairs in evaluation order. The
+            delegate is ``None`` for components that shouldn't be invoked
+            because they aren't part of the graph, aren't registered, or are
+            disabled.
+    """
+    def __init__(self, components=None):
+        self.components = components
+        self.compile()
+
+    def compile(self):
+        """
+        (Re)builds the plan from the current state of the registry.
+        """
+        components = self.components or COMPONENTS[GROUPS.single]
+        self.graph = _determine_components(components)
+        self.order = run_order(self.graph)
+        self.steps = [(c, self._get_delegate(c)) for c in self.order]
+        self._subplans = None
+        self._enabled = ENABLED
+        self._generation = _GENERATION
+
+    def _get_delegate(self, component):
+        if component in self.graph and component in DELEGATES and is_enabled(component):
+            return DELEGATES[component]
+
+    def is_stale(self):
+        """
+        Returns True if the registry has changed since the plan was compiled.
+        """
+        return self._generation != _GENERATION or self._enabled is not ENABLED
+
+    def refresh(self):
+        """
+        Recompiles the plan if it's stale and returns it.
+        """
+        if self.is_stale():
+            self.compile()
+        return self
+
+    def get_subplans(self):
+        """
+        Returns a plan for each disjoint subgraph of the plan's graph.
+        """
+        self.refresh()
+        if self._subplans is None:
+            self._subplans = [RunPlan(g) for g in get_subgraphs(self.graph)]
+        return self._subplans
+
+
+def compile_plan(components=None):
+    """
+    Compiles a :class:`RunPlan` that can be passed to :func:`run`,
+    :func:`run_incremental`, or :func:`run_all` in place of ``components``.
+
+    Keyword Args:
+        components: Can be one of a dependency graph, a single component, a
+            component group, or a component type. Defaults to the
+            ``GROUPS.single`` component group.
+    Returns:
+        RunPlan: the compiled plan.
+    """
+    return RunPlan(components)
+
+
 def run(components=None, broker=None):
     """
     Executes components in an order that satisfies their dependency
@@ -942,8 +1316,8 @@ def run(components=None, broker=None):
 
     Keyword Args:
         components: Can be one of a dependency graph, a single component, a
-            component group, or a component type. If it's anything other than a
-            dependency graph, the appropriate graph is built for you and before
+            component group, a component type, or a :class:`RunPlan`. If it's
+            anything other than a plan, one is compiled for you before
             evaluation.
         broker (Broker): Optionally pass a broker to use for evaluation. One is
             created by default, but it's often useful to seed a broker with an
@@ -951,18 +1325,20 @@ def run(components=None, broker=None):
     Returns:
         Broker: The broker after evaluation.
     """
-    components = components or COMPONENTS[GROUPS.single]
-    components = _determine_components(components)
+    if isinstance(components, RunPlan):
+        plan = components.refresh()
+    else:
+        plan = RunPlan(components)
     broker = broker or Broker()
 
-    for component in run_order(components):
+    for component, delegate in plan.steps:
         start = time.time()
+        present = component in broker.instances
         try:
-            if (component not in broker and component in components and
-               component in DELEGATES and
-               is_enabled(component)):
+            if delegate is not None and not present:
                 log.info("Trying %s" % get_name(component))
-                result = DELEGATES[component].process(broker)
+                with broker.profile(component):
+                    result = delegate.process(broker)
                 broker[component] = result
         except MissingRequirements as mr:
             if log.isEnabledFor(logging.DEBUG):
@@ -977,16 +1353,22 @@ def run(components=None, broker=None):
             log.warning(tb)
             broker.add_exception(component, ex, tb)
         finally:
-            broker.exec_times[component] = time.time() - start
+            if not present or component not in broker.exec_times:
+                broker.exec_times[component] = time.time() - start
             broker.fire_observers(component)
 
     return broker
 
 
 def generate_incremental(components=None, broker=None):
+    seed_broker = broker or Broker()
+    if isinstance(components, RunPlan):
+        for plan in components.get_subplans():
+            yield (plan, Broker(seed_broker))
+        return
+
     components = components or COMPONENTS[GROUPS.single]
     components = _determine_components(components)
-    seed_broker = broker or Broker()
     for graph in get_subgraphs(components):
         broker = Broker(seed_broker)
         yield (graph, broker)
@@ -1002,9 +1384,9 @@ def run_incremental(components=None, broker=None):
 
     Keyword Args:
         components: Can be one of a dependency graph, a single component, a
-            component group, or a component type. If it's anything other than a
-            dependency graph, the appropriate graph is built for you and before
-            evaluation.
+            component group, a component type, or a :class:`RunPlan`. If it's
+            a plan, its cached subplans are evaluated. Otherwise the
+            appropriate graph is built for you before evaluation.
         broker (Broker): Optionally pass a broker to use for evaluation. One is
             created by default, but it's often useful to seed a broker with an
             initial dependency.
@@ -1023,3 +1405,193 @@ def run_all(components=None, broker=None, pool=None):
         return [f.result() for f in futures]
     else:
         return list(run_incremental(components=components, broker=broker))
+
+
+def _execute(component, broker, isolated=False, profiler=None):
+    """
+    Invokes a single component against the broker and returns a tuple of its
+    result, the exception it raised, the exception's traceback, the seconds it
+    took, any exceptions its delegate recorded on an isolated broker, and the
+    profiles recorded by the profiler an isolated broker was given. Runs
+    inside the workers of :func:`run_parallel`, so it doesn't touch the
+    broker's instances, timings, or observers.
+    """
+    if profiler is not None:
+        broker.profiler = profiler
+    start = time.time()
+    result, ex, tb = None, None, None
+    try:
+        with broker.profile(component):
+            result = DELEGATES[component].process(broker)
+    except (MissingRequirements, SkipComponent) as e:
+        ex = e
+    except Exception as e:
+        ex, tb = e, traceback.format_exc()
+    elapsed = time.time() - start
+
+    errors = []
+    if isolated:
+        errors = [(e, broker.tracebacks.get(e)) for e in broker.exceptions.get(component, [])]
+    profiles = None
+    if profiler is not None:
+        profiler.stop()
+        profiles = profiler.profiles
+    return (result, ex, tb, elapsed, errors, profiles)
+
+
+def _isolate(component, broker):
+    """
+    Returns a new broker containing only the instances the component can
+    consult during evaluation. Used when the component is sent to another
+    process.
+    """
+    isolated = Broker()
+    keys = set(get_dependencies(component)) | IGNORE.get(component, set())
+    for k in keys:
+        if k in broker:
+            isolated.instances[k] = broker[k]
+    return isolated
+
+
+def _is_process_pool(executor):
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+    except ImportError:
+        return False
+    return isinstance(executor, ProcessPoolExecutor)
+
+
+def _record(component, broker, outcome):
+    result, ex, tb, elapsed, errors, profiles = outcome
+    for e, t in errors:
+        broker.add_exception(component, e, t)
+    if profiles:
+        broker.profiler.merge(profiles)
+
+    if ex is None:
+        broker[component] = result
+    elif isinstance(ex, MissingRequirements):
+        if log.isEnabledFor(logging.DEBUG):
+            name = get_name(component)
+            reqs = stringify_requirements(ex.requirements)
+            log.debug("%s missing requirements %s" % (name, reqs))
+        broker.add_exception(component, ex)
+    elif not isinstance(ex, SkipComponent):
+        log.warning(tb)
+        broker.add_exception(component, ex, tb)
+    broker.exec_times[component] = elapsed
+
+
+def run_parallel(components=None, broker=None, executor=None):
+    """
+    Executes components concurrently as soon as all of their dependencies have
+    been resolved. Each component is submitted to the executor once every
+    component it depends on has either produced a value or failed, so
+    independent datasources and parsers overlap instead of waiting on each
+    other.
+
+    Results, exceptions, and timings are recorded in the broker and observers
+    are fired by the calling thread, so observers never run concurrently.
+
+    Keyword Args:
+        components: Can be one of a dependency graph, a single component, a
+            component group, or a component type. If it's anything other than a
+            dependency graph, the appropriate graph is built for you and before
+            evaluation.
+        broker (Broker): Optionally pass a broker to use for evaluation. One is
+            created by default, but it's often useful to seed a broker with an
+            initial dependency.
+        executor: A ``concurrent.futures`` style executor. If it's a
+            ``ProcessPoolExecutor``, each component is sent to the pool with a
+            broker holding only its dependencies, so components and their
+            dependency values must be picklable. The broker's profiler is
+            sent along if it has a ``merge`` method, like
+            :class:`insights.core.profiler.Profiler`, and the measurements
+            taken in the workers are merged into it. Other profilers don't
+            see those components. A ``ThreadPoolExecutor`` is
+            created and shut down for the call if one isn't provided. If
+            ``concurrent.futures`` isn't available, this falls back to
+            :func:`run`.
+    Returns:
+        Broker: The broker after evaluation.
+    """
+    components = components or COMPONENTS[GROUPS.single]
+    components = _determine_components(components)
+    broker = broker or Broker()
+
+    if executor is None:
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+        except ImportError:
+            return run(components, broker)
+        with ThreadPoolExecutor() as pool:
+            return run_parallel(components, broker, pool)
+
+    dependents = defaultdict(set)
+    waiting_on = {}
+    for component, deps in components.items():
+        deps = set(deps)
+        deps.discard(component)
+        waiting_on[component] = len(deps)
+        for d in deps:
+            dependents[d].add(component)
+    for component in dependents:
+        waiting_on.setdefault(component, 0)
+
+    isolated = _is_process_pool(executor)
+    profiler = None
+    if isolated and broker.profiler is not None:
+        if hasattr(broker.profiler, "merge"):
+            profiler = broker.profiler
+        else:
+            log.warning("Components run in a process pool aren't profiled: %r can't merge measurements from other processes." % broker.profiler)
+    done = queue.Queue()
+    ready = deque(c for c, n in waiting_on.items() if not n)
+    outstanding = 0
+    finished = 0
+
+    def resolve(component):
+        for d in dependents.get(component, []):
+            waiting_on[d] -= 1
+            if not waiting_on[d]:
+                ready.append(d)
+
+    def notify(component):
+        return lambda future: done.put((component, future))
+
+    while ready or outstanding:
+        while ready:
+            component = ready.popleft()
+            if (component not in broker.instances and component in components and
+               component in DELEGATES and
+               is_enabled(component)):
+                log.info("Trying %s" % get_name(component))
+                if isolated:
+                    future = executor.submit(_execute, component, _isolate(component, broker), True, profiler)
+                else:
+                    future = executor.submit(_execute, component, broker)
+                future.add_done_callback(notify(component))
+                outstanding += 1
+            else:
+                broker.exec_times.setdefault(component, 0.0)
+                broker.fire_observers(component)
+                finished += 1
+                resolve(component)
+
+        if outstanding:
+            component, future = done.get()
+            outstanding -= 1
+            try:
+                outcome = future.result()
+            except Exception as ex:
+                outcome = (None, ex, traceback.format_exc(), 0.0, [], None)
+            _record(component, broker, outcome)
+            broker.fire_observers(component)
+            finished += 1
+            resolve(component)
+
+    if finished != len(waiting_on):
+        cyclic = dict((k, v) for k, v in components.items() if waiting_on.get(k))
+        raise ValueError('Cyclic dependencies exist among these items: {}'.format(', '.join(repr(x) for x in cyclic.items())))
+
+    return broker
@@ -35,7 +35,16 @@ for those classes.
 Filtering can be disabled globally by setting the environment variable
 ``INSIGHTS_FILTERS_ENABLED=False``. This means that no datasources will be
 filtered even if filters are defined for them.
+
+Resolving the filters of a datasource walks the components that depend on it.
+To avoid that at startup, :func:`dump_index` writes the fully resolved filters
+of every loaded datasource to ``filters_index.json`` next to ``filters.yaml``,
+and :func:`load_index` loads them straight into the cache used by
+:func:`get_filters`.
 """
+import hashlib
+import json
+import logging
 import os
 import pkgutil
 import six
@@ -43,9 +52,11 @@ import yaml as ser
 from collections import defaultdict
 
 import insights
-from insights.core import dr, plugins
+from insights.core import dr, plugins, textfilter
 from insights.util import parse_bool
 
+log = logging.getLogger(__name__)
+
 _CACHE = {}
 FILTERS = defaultdict(set)
 ENABLED = parse_bool(os.environ.get("INSIGHTS_FILTERS_ENABLED"), default=True)
@@ -86,7 +97,7 @@ def add_filter(component, patterns):
         FILTERS[component] |= patterns
 
     if not plugins.is_datasource(component):
-        for dep in dr.run_order(dr.get_dependency_graph(component)):
+        for dep in _get_all_dependencies(component):
             if plugins.is_datasource(dep):
                 d = dr.get_delegate(dep)
                 if d.filterable:
@@ -106,6 +117,39 @@ def add_filter(component, patterns):
 _add_filter = add_filter
 
 
+def _get_all_dependencies(component):
+    """
+    Returns every component the component depends on directly or indirectly.
+    """
+    if component not in dr.DEPENDENCIES:
+        raise Exception("%s is not a registered component." % dr.get_name(component))
+
+    seen = set()
+    stack = [component]
+    while stack:
+        for d in dr.get_dependencies(stack.pop()):
+            if d not in seen:
+                seen.add(d)
+                stack.append(d)
+    return seen
+
+
+def _resolve_filters(c, filters=None):
+    filters = filters or set()
+    if not ENABLED:
+        return filters
+
+    if not plugins.is_datasource(c):
+        return filters
+
+    if c in FILTERS:
+        filters |= FILTERS[c]
+
+    for d in dr.get_dependents(c):
+        filters |= _resolve_filters(d, filters)
+    return filters
+
+
 def get_filters(component):
     """
     Get the set of filters for the given datasource.
@@ -126,23 +170,8 @@ def get_filters(component):
     Returns:
         set: The set of filters defined for the datasource
     """
-    def inner(c, filters=None):
-        filters = filters or set()
-        if not ENABLED:
-            return filters
-
-        if not plugins.is_datasource(c):
-            return filters
-
-        if c in FILTERS:
-            filters |= FILTERS[c]
-
-        for d in dr.get_dependents(c):
-            filters |= inner(d, filters)
-        return filters
-
     if component not in _CACHE:
-        _CACHE[component] = inner(component)
+        _CACHE[component] = _resolve_filters(component)
     return _CACHE[component]
 
 
@@ -207,3 +236,127 @@ def dump(stream=None):
         path = os.path.join(os.path.dirname(insights.__file__), _filename)
         with open(path, "w") as f:
             f.write(dumps())
+
+
+_index_filename = "filters_index.json"
+
+
+def _filters_digest():
+    """
+    Returns a digest of the unresolved filters in ``FILTERS`` and of the
+    components each filtered component depends on, which are the ones that
+    can inherit its filters. An index is only valid for the filters and
+    dependency graph it was built from.
+    """
+    entries = []
+    for k, v in FILTERS.items():
+        if not v:
+            continue
+        deps = _get_all_dependencies(k) if k in dr.DEPENDENCIES else []
+        entries.append([dr.get_name(k), sorted(v), sorted(dr.get_name(d) for d in deps)])
+    h = hashlib.sha1()
+    for entry in sorted(entries):
+        h.update(json.dumps(entry).encode("utf-8"))
+    return h.hexdigest()
+
+
+def build_index(components=None):
+    """
+    Resolves the filters of datasources by walking the dependency graph.
+
+    Args:
+        components (iterable): the datasources to resolve. Defaults to all
+            loaded datasources.
+
+    Returns:
+        dict: datasource -> frozenset of its filters
+    """
+    if components is None:
+        components = dr.get_components_of_type(plugins.datasource) or []
+    return dict((c, frozenset(_resolve_filters(c))) for c in components)
+
+
+def dumps_index():
+    """Returns a string representation of the resolved filters index."""
+    index = build_index()
+    doc = {
+        "digest": _filters_digest(),
+        "datasources": dict((dr.get_name(k), sorted(v)) for k, v in index.items()),
+    }
+    return json.dumps(doc, sort_keys=True, separators=(",", ":"))
+
+
+def dump_index(stream=None):
+    """
+    Dumps the resolved filters of all loaded datasources to a stream. If none
+    is passed, it's written to ``filters_index.json`` within the project. It
+    should be regenerated whenever ``filters.yaml`` is.
+    """
+    if stream:
+        stream.write(dumps_index())
+    else:
+        path = os.path.join(os.path.dirname(insights.__file__), _index_filename)
+        with open(path, "w") as f:
+            f.write(dumps_index())
+
+
+def loads_index(string, compile_matchers=True):
+    """
+    Loads the resolved filters index from a string into the cache used by
+    :func:`get_filters`. The index is ignored if the filters currently
+    registered differ from the ones it was built from.
+
+    Args:
+        string (str): the index as written by :func:`dump_index`.
+        compile_matchers (bool): whether to compile and cache the
+            :mod:`insights.core.textfilter` matcher for each set of filters.
+
+    Returns:
+        bool: True if the index was loaded.
+    """
+    if not ENABLED:
+        return False
+
+    doc = json.loads(string)
+    if doc.get("digest") != _filters_digest():
+        log.warning("Filters index is out of date with the registered filters and won't be used.")
+        return False
+
+    for name, patterns in doc.get("datasources", {}).items():
+        component = dr.get_component_by_name(name)
+        if component is None:
+            continue
+        _CACHE[component] = set(patterns)
+        if patterns and compile_matchers:
+            textfilter.get_filter_matcher(patterns)
+    return True
+
+
+def load_index(stream=None, compile_matchers=True):
+    """
+    Loads the resolved filters index from a stream, normally an open file. If
+    one is not passed, it's loaded from a default location within the project.
+    See :func:`loads_index`.
+    """
+    if stream:
+        return loads_index(stream.read(), compile_matchers=compile_matchers)
+    data = pkgutil.get_data(insights.__name__, _index_filename)
+    return loads_index(data.decode("utf-8"), compile_matchers=compile_matchers) if data else False
+
+
+def verify_index():
+    """
+    Checks the filters cached for each datasource against the filters
+    resolved from the live registry.
+
+    Returns:
+        dict: datasource name -> (cached filters, resolved filters) for each
+        datasource that differs. Empty if the cache is consistent.
+    """
+    live = build_index(list(_CACHE))
+    result = {}
+    for c, resolved in live.items():
+        cached = frozenset(_CACHE[c])
+        if cached != resolved:
+            result[dr.get_name(c)] = (cached, resolved)
+    return result
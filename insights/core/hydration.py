@@ -2,6 +2,8 @@ import logging
 import os
 
 from insights.core import archives, dr
+from insights.core.spec_factory import get_spec_globs
+from insights.core.path_index import IndexedTree, scan
 from insights.core.serde import Hydration
 from insights.core.context import (ClusterArchiveContext,
                                    ExecutionContextMeta,
@@ -10,27 +12,22 @@ from insights.core.context import (ClusterArchiveContext,
 
 log = logging.getLogger(__name__)
 
-if hasattr(os, "scandir"):
-    def get_all_files(path):
-        with os.scandir(path) as it:
-            for ent in it:
-                if ent.is_dir(follow_symlinks=False):
-                    for pth in get_all_files(ent.path):
-                        yield pth
-                elif ent.is_file(follow_symlinks=False):
-                    yield ent.path
-
-else:
-    def get_all_files(path):
-        for root, _, files in os.walk(path):
-            for f in files:
-                full_path = os.path.join(root, f)
-                if os.path.isfile(full_path) and not os.path.islink(full_path):
-                    yield full_path
-
-
-def identify(files):
-    common_path, ctx = ExecutionContextMeta.identify(files)
+
+def get_all_files(path):
+    """
+    Generates the paths of the regular files beneath path. Symbolic links
+    aren't included. The tree is walked with
+    :func:`insights.core.path_index.scan`, as :func:`create_context` does.
+    """
+    for f in IndexedTree(path, scan(path)).files():
+        yield f
+
+
+def identify(files, tree=None):
+    if tree is not None:
+        common_path, ctx = ExecutionContextMeta.identify(files, index=tree.index, root=tree.root)
+    else:
+        common_path, ctx = ExecutionContextMeta.identify(files)
     if ctx:
         return common_path, ctx
 
@@ -41,25 +38,67 @@ def identify(files):
     return common_path, HostArchiveContext
 
 
-def create_context(path, context=None):
-    top = os.listdir(path)
+def create_context(path, context=None, archive=None):
+    """
+    Identifies the kind of archive extracted at path and returns a context
+    for it. The files beneath path are indexed in a single walk, and the
+    index is used both to identify the context and, as the context's
+    ``tree``, to resolve file datasources.
+
+    If an :class:`insights.core.archives.ArchiveReader` is passed, path is
+    its ``tmp_dir`` and the files are listed from the archive instead.
+    Serialized and cluster archives are then realized in full, since
+    they're read outside of file datasources. Other contexts get the reader
+    as their ``archive``.
+    """
+    tree = archive if archive is not None else IndexedTree(path, scan(path))
+    top = tree.listdir(path)
     arc = [os.path.join(path, f) for f in top
            if f.endswith(archives.COMPRESSION_TYPES) and
-           os.path.isfile(os.path.join(path, f))]
+           tree.isfile(os.path.join(path, f))]
     if arc:
+        if archive is not None:
+            archive.realize_all()
         return ClusterArchiveContext(path, all_files=arc)
 
-    all_files = list(get_all_files(path))
+    all_files = tree.files()
     if not all_files:
         raise archives.InvalidArchive("No files in archive")
 
-    common_path, ctx = identify(all_files)
+    common_path, ctx = identify(all_files, tree)
     context = context or ctx
-    return context(common_path, all_files=all_files)
+    ctx = context(common_path, all_files=all_files)
+    if isinstance(ctx, SerializedArchiveContext):
+        if archive is not None:
+            archive.realize_all()
+    else:
+        ctx.archive = archive
+        ctx.tree = tree
+    return ctx
+
+
+def extract_specs(ctx, components=None, timeout=None):
+    """
+    Extracts the files of ``ctx.archive`` that the file datasources among
+    components may read, in a single pass over the archive. Everything else
+    stays compressed, so large logs no parser reads are never written out.
+    Files other datasources ask for later are still realized on demand.
+
+    Returns:
+        list: the paths matched by the datasources' patterns.
+    """
+    archive = ctx.archive
+    if archive is None:
+        return []
+    paths = set()
+    for pattern in get_spec_globs(ctx, components):
+        paths.update(archive.glob(os.path.join(ctx.root, pattern.lstrip("/"))))
+    archive.extract(paths, timeout=timeout)
+    return sorted(paths)
 
 
-def initialize_broker(path, context=None, broker=None):
-    ctx = create_context(path, context=context)
+def initialize_broker(path, context=None, broker=None, lazy=False, archive=None):
+    ctx = create_context(path, context=context, archive=archive)
     broker = broker or dr.Broker()
     if isinstance(ctx, ClusterArchiveContext):
         return ctx, broker
@@ -67,5 +106,5 @@ def initialize_broker(path, context=None, broker=None):
     broker[ctx.__class__] = ctx
     if isinstance(ctx, SerializedArchiveContext):
         h = Hydration(ctx.root)
-        broker = h.hydrate(broker=broker)
+        broker = h.hydrate(broker=broker, lazy=lazy)
     return ctx, broker
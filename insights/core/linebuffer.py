@@ -0,0 +1,230 @@
+"""
+Read-only sequences of lines that keep the text of all the lines in one
+buffer with an array of the offsets where they start, instead of a string
+object per line. A list of ten million short log lines takes several times
+the memory of the text itself; a :class:`LineBuffer` takes the text and
+eight bytes a line, and a :class:`MappedLineBuffer` leaves the text in the
+file and maps it into memory with :mod:`mmap`.
+
+Indexing and iterating them create the line strings as they are needed.
+Slices are lists.
+"""
+import codecs
+import mmap
+import os
+import re
+import stat
+from array import array
+from bisect import bisect_right
+from itertools import chain, islice
+
+import six
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+try:
+    from itertools import accumulate
+except ImportError:
+    def accumulate(values):
+        total = 0
+        for value in values:
+            total += value
+            yield total
+
+_BATCH = 4096
+_CHUNK = 1024 * 1024
+_TEXT_NEWLINE = re.compile(u"\r\n|\r|\n")
+
+
+class LineBuffer(Sequence):
+    """
+    The lines are joined with newlines into one string, and line ``i`` is
+    the text from ``starts[i]`` up to the newline before ``starts[i + 1]``.
+    Lines may contain newlines themselves.
+
+    Parameters:
+        lines (iterable): the lines, without line terminators
+    """
+    def __init__(self, lines=()):
+        starts = array("L", [0])
+        pieces = []
+        batch = []
+        pos = 0
+        split = True
+        for line in lines:
+            pos += len(line) + 1
+            starts.append(pos)
+            batch.append(line)
+            if len(batch) == _BATCH:
+                piece = "\n".join(batch)
+                split = split and piece.count("\n") == _BATCH - 1
+                pieces.append(piece + "\n")
+                batch = []
+        if batch:
+            piece = "\n".join(batch)
+            split = split and piece.count("\n") == len(batch) - 1
+            pieces.append(piece + "\n")
+        self._data = "".join(pieces)
+        self._starts = starts
+        # whether the lines can be found by splitting the text on newlines
+        self._split = split
+
+    def _line(self, start, end):
+        return self._data[start:end - 1]
+
+    def _lines(self, i, j):
+        """
+        Returns the list of the lines from `i` up to `j`.
+        """
+        starts = self._starts
+        if i >= j:
+            return []
+        if self._split:
+            return self._data[starts[i]:starts[j] - 1].split("\n")
+        return [self._line(starts[k], starts[k + 1]) for k in range(i, j)]
+
+    def __len__(self):
+        return len(self._starts) - 1
+
+    def __getitem__(self, index):
+        starts = self._starts
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self._lines(start, stop)
+            return [self._line(starts[i], starts[i + 1]) for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("line index out of range")
+        return self._line(starts[index], starts[index + 1])
+
+    def select(self, regex):
+        """
+        Returns the lines in which `regex`, a compiled regular expression,
+        finds a match, like filtering the lines with ``regex.search``. The
+        whole buffer is searched at once, so `regex` must not be able to
+        match across the end of a line, and ``^`` and ``$`` match at the
+        start and end of the buffer instead of each line.
+        """
+        return self._select(regex, self._data)
+
+    def _select(self, regex, data):
+        starts = self._starts
+        search = regex.search
+        hits = []
+        match = search(data)
+        while match:
+            i = bisect_right(starts, match.start()) - 1
+            if i >= len(self):
+                break
+            hits.append(i)
+            match = search(data, starts[i + 1])
+        return [self[i] for i in hits]
+
+    def __iter__(self):
+        size = len(self)
+        for i in range(0, size, _BATCH):
+            for line in self._lines(i, min(i + _BATCH, size)):
+                yield line
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, LineBuffer)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in six.moves.zip(self, other))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (LineBuffer, (list(self),))
+
+    def __repr__(self):
+        return "<%s of %d lines>" % (self.__class__.__name__, len(self))
+
+
+class MappedLineBuffer(LineBuffer):
+    """
+    The lines of a file mapped into memory. Lines are split and decoded like
+    reading the file in text mode as UTF-8 with ``surrogateescape``: ``\\r\\n``,
+    ``\\r`` and ``\\n`` all end lines and aren't part of them.
+
+    The file must not be truncated while it's mapped. Use :func:`load` to
+    fall back to reading files that can't be mapped.
+
+    Parameters:
+        path (str): the path of the file
+
+    Raises:
+        ValueError: if the file is empty
+        EnvironmentError: if the file can't be mapped
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._data = data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        starts = array("L", [0])
+        size = len(data)
+        pos = 0
+        while pos < size:
+            # whole lines, without splitting a \r\n
+            end = data.rfind(b"\n", pos, pos + _CHUNK) + 1
+            if end <= pos or size - pos <= _CHUNK:
+                end = size
+            # bytes split lines on \r\n, \r and \n only
+            lengths = map(len, data[pos:end].splitlines(True))
+            starts.extend(islice(accumulate(chain([pos], lengths)), 1, None))
+            pos = end
+        self._starts = starts
+
+    def _line(self, start, end):
+        line = self._data[start:end]
+        if line.endswith(b"\n"):
+            line = line[:-2] if line.endswith(b"\r\n") else line[:-1]
+        elif line.endswith(b"\r"):
+            line = line[:-1]
+        return line.decode("utf-8", "surrogateescape")
+
+    def select(self, regex):
+        flags = regex.flags & ~re.UNICODE
+        pattern = regex.pattern.encode("utf-8", "surrogateescape")
+        return self._select(re.compile(pattern, flags), self._data)
+
+    def _lines(self, i, j):
+        if i >= j:
+            return []
+        # line terminators are ASCII, so decoding a run of lines at once
+        # gives the same text as decoding them one by one.
+        text = self._data[self._starts[i]:self._starts[j]].decode("utf-8", "surrogateescape")
+        lines = _TEXT_NEWLINE.split(text)
+        if len(lines) > j - i:
+            # the empty string after the last terminator
+            lines.pop()
+        return lines
+
+
+def load(path, mapped=True):
+    """
+    Returns the lines of the file at `path` in a :class:`MappedLineBuffer`
+    when `mapped` is True and the file is a non-empty regular file that can
+    be mapped, and otherwise reads them into a :class:`LineBuffer`. The
+    lines are the same either way.
+    """
+    if mapped and six.PY3:
+        st = os.stat(path)
+        if stat.S_ISREG(st.st_mode) and st.st_size:
+            try:
+                return MappedLineBuffer(path)
+            except (ValueError, EnvironmentError):
+                pass
+    if six.PY3:
+        with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            return LineBuffer(l.rstrip("\n") for l in f)
+    else:
+        with codecs.open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            return LineBuffer(l.rstrip("\n") for l in f)
@@ -3,6 +3,12 @@ This module contains logic for parsing ls output. It attempts to handle
 output when selinux is enabled or disabled and also skip "bad" lines.
 """
 import six
+from array import array
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
 
 
 def parse_path(path):
@@ -20,49 +26,112 @@ def parse_path(path):
     return path, link
 
 
-def parse_non_selinux(parts):
-    """
-    Parse part of an ls output line that isn't selinux.
+COLUMNS = ("links", "owner", "group", "major", "minor", "size", "date", "name",
+           "link", "se_user", "se_role", "se_type", "se_mls")
+"""
+The fields parsed from an ls line after the type and permission bits, in the
+order of the rows built by the ``_parse_*`` functions.
+"""
 
-    Args:
-        parts (list): A four element list of strings representing the initial
-            parts of an ls line after the permission bits. The parts are link
-            count, owner, group, and everything else.
+_POS = dict((c, i) for i, c in enumerate(COLUMNS))
 
-    Returns:
-        A dict containing links, owner, group, date, and name. If the line
-        represented a device, major and minor numbers are included.  Otherwise,
-        size is included. If the raw name was a symbolic link, link is
-        included.
-    """
+# the fields present in each layout of line, other than link, which is
+# present when it's not empty.
+_NON_SELINUX, _DEVICE, _SELINUX, _RHEL8_SELINUX = range(4)
+LAYOUTS = (
+    ("links", "owner", "group", "size", "date", "name"),
+    ("links", "owner", "group", "major", "minor", "date", "name"),
+    ("owner", "group", "se_user", "se_role", "se_type", "se_mls", "name"),
+    ("links", "owner", "group", "se_user", "se_role", "se_type", "se_mls", "size", "name", "date"),
+)
+
+
+def _intern(value):
+    try:
+        return six.moves.intern(value)
+    except TypeError:
+        # None, or unicode on python 2
+        return value
+
+
+def _to_dict(layout, row):
+    result = dict((k, row[_POS[k]]) for k in LAYOUTS[layout])
+    link = row[_POS["link"]]
+    if link:
+        result["link"] = link
+    return result
+
+
+def _parse_non_selinux(parts):
     links, owner, group, last = parts
-    result = {
-        "links": int(links),
-        "owner": owner,
-        "group": group,
-    }
+    major = minor = size = None
 
     # device numbers only go to 256.
     # If a comma is in the first four characters, the next two elements are
     # major and minor device numbers. Otherwise, the next element is the size.
     if "," in last[:4]:
         major, minor, rest = last.split(None, 2)
-        result["major"] = int(major.rstrip(","))
-        result["minor"] = int(minor)
+        major = int(major.rstrip(","))
+        minor = int(minor)
+        layout = _DEVICE
     else:
         size, rest = last.split(None, 1)
-        result["size"] = int(size)
+        size = int(size)
+        layout = _NON_SELINUX
 
     # The date part is always 12 characters regardless of content.
-    result["date"] = rest[:12]
+    date = rest[:12]
 
     # Jump over the date and the following space to get the path part.
     path, link = parse_path(rest[13:])
-    result["name"] = path
-    if link:
-        result["link"] = link
+    return layout, (int(links), owner, group, major, minor, size, date, path,
+                    link, None, None, None, None)
 
-    return result
+
+def _parse_selinux(parts):
+    owner, group = parts[:2]
+    selinux = parts[2].split(":")
+    lsel = len(selinux)
+    path, link = parse_path(parts[-1])
+    return _SELINUX, (None, owner, group, None, None, None, None, path, link,
+                      selinux[0],
+                      selinux[1] if lsel > 1 else None,
+                      selinux[2] if lsel > 2 else None,
+                      selinux[3] if lsel > 3 else None)
+
+
+def _parse_rhel8_selinux(parts):
+    links, owner, group, last = parts
+
+    selinux = parts[3].split(":")
+    lsel = len(selinux)
+    selinux, size, last = parts[-1].split(None, 2)
+    selinux = selinux.split(":")
+    date = last[:12]
+    path, link = parse_path(last[13:])
+    return _RHEL8_SELINUX, (int(links), owner, group, None, None, int(size), date, path, link,
+                            selinux[0],
+                            selinux[1] if lsel > 1 else None,
+                            selinux[2] if lsel > 2 else None,
+                            selinux[3] if lsel > 3 else None)
+
+
+def parse_non_selinux(parts):
+    """
+    Parse part of an ls output line that isn't selinux.
+
+    Args:
+        parts (list): A four element list of strings representing the initial
+            parts of an ls line after the permission bits. The parts are link
+            count, owner, group, and everything else.
+
+    Returns:
+        A dict containing links, owner, group, date, and name. If the line
+        represented a device, major and minor numbers are included.  Otherwise,
+        size is included. If the raw name was a symbolic link, link is
+        included.
+    """
+    return _to_dict(*_parse_non_selinux(parts))
 
 
 def parse_selinux(parts):
@@ -79,23 +148,7 @@ def parse_selinux(parts):
         name. If the raw name was a symbolic link, link is also included.
 
     """
-
-    owner, group = parts[:2]
-    selinux = parts[2].split(":")
-    lsel = len(selinux)
-    path, link = parse_path(parts[-1])
-    result = {
-        "owner": owner,
-        "group": group,
-        "se_user": selinux[0],
-        "se_role": selinux[1] if lsel > 1 else None,
-        "se_type": selinux[2] if lsel > 2 else None,
-        "se_mls": selinux[3] if lsel > 3 else None,
-        "name": path
-    }
-    if link:
-        result["link"] = link
-    return result
+    return _to_dict(*_parse_selinux(parts))
 
 
 def parse_rhel8_selinux(parts):
@@ -113,30 +166,114 @@ def parse_rhel8_selinux(parts):
         link is also included.
 
     """
+    return _to_dict(*_parse_rhel8_selinux(parts))
+
+
+def _parse_line(line):
+    # we can't split(None, 5) here b/c rhel 6/7 selinux lines only have
+    # 4 parts before the path, and the path itself could contain
+    # spaces. Unfortunately, this means we have to split the line again
+    # below
+    parts = line.split(None, 4)
+    if parts[1][0].isdigit():
+        # We have to split the line again to see if this is a RHEL8
+        # selinux stanza. This assumes that the context section will
+        # always have at least two pieces separated by ':'.
+        if ":" in line.split()[4]:
+            layout, row = _parse_rhel8_selinux(parts[1:])
+        else:
+            layout, row = _parse_non_selinux(parts[1:])
+    else:
+        layout, row = _parse_selinux(parts[1:])
+    return parts[0], layout, row
 
-    links, owner, group, last = parts
 
-    selinux = parts[3].split(":")
-    lsel = len(selinux)
-    selinux, size, last = parts[-1].split(None, 2)
-    selinux = selinux.split(":")
-    date = last[:12]
-    path, link = parse_path(last[13:])
-    result = {
-        "links": int(links),
-        "owner": owner,
-        "group": group,
-        "se_user": selinux[0],
-        "se_role": selinux[1] if lsel > 1 else None,
-        "se_type": selinux[2] if lsel > 2 else None,
-        "se_mls": selinux[3] if lsel > 3 else None,
-        "size": int(size),
-        "name": path,
-        "date": date,
-    }
-    if link:
-        result["link"] = link
-    return result
+# strings repeated across most lines of a listing are interned, so rows share
+# one copy of each.
+_INTERNED = tuple(c in ("owner", "group", "date", "se_user", "se_role", "se_type", "se_mls") for c in COLUMNS)
+_INTS = tuple(c in ("links", "major", "minor", "size") for c in COLUMNS)
+
+try:
+    array("q")
+except ValueError:  # pragma: no cover
+    # python 2 has no 64 bit typecode, and sizes don't fit in "l" everywhere
+    _int_column = list
+else:
+    def _int_column(values):
+        return array("q", values)
+
+
+class Entries(Mapping):
+    """
+    A read-only mapping of the entry names in a :class:`Directory` to dicts of
+    their fields. The fields are kept in columns with an item per line:
+    integers in arrays, and repeated strings like owners and dates interned.
+    Columns no line has a value for aren't kept, so listings without
+    devices, links, or selinux contexts don't pay for them. A dict
+    is built each time an entry is looked up; use ``dict(entries)`` for a copy
+    of the whole listing as plain dicts.
+    """
+    def __init__(self, directory, lines):
+        self.directory = directory
+        self.lines = lines
+        self.types = []
+        self.perms = []
+        self.layouts = bytearray()
+        self.columns = [None] * len(COLUMNS)
+
+        columns = [[] for c in COLUMNS]
+        appends = [c.append for c in columns]
+        for line in lines:
+            perms, layout, row = _parse_line(line)
+            self.types.append(perms[0])
+            self.perms.append(_intern(perms[1:]))
+            self.layouts.append(layout)
+            for append, value in zip(appends, row):
+                append(value)
+        self.types = "".join(self.types)
+
+        for c, values in enumerate(columns):
+            if values.count(None) + values.count("") == len(values):
+                continue
+            if _INTS[c]:
+                self.columns[c] = _int_column([v or 0 for v in values])
+            elif _INTERNED[c]:
+                self.columns[c] = [_intern(v) for v in values]
+            else:
+                self.columns[c] = values
+        self.index = dict(zip(self.names(), range(len(self.layouts))))
+
+    def names(self):
+        """
+        Returns the entry name of each line in the listing.
+        """
+        return self.columns[_POS["name"]] or []
+
+    def row(self, i):
+        """
+        Returns the dict of fields for the entry on line i of the listing.
+        """
+        entry = _to_dict(self.layouts[i], tuple(c[i] if c is not None else None for c in self.columns))
+        entry["type"] = self.types[i]
+        entry["perms"] = self.perms[i]
+        entry["raw_entry"] = self.lines[i]
+        entry["dir"] = self.directory
+        return entry
+
+    def __getitem__(self, name):
+        return self.row(self.index[name])
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return repr(dict(self))
 
 
 PASS_KEYS = set(["name", "total"])
@@ -173,40 +310,11 @@ class Directory(dict):
         return super(Directory, self).get(key, default)
 
     def _load(self):
-        dirs = []
-        ents = {}
+        ents = Entries(self["name"], self.body)
         files = []
+        dirs = []
         specials = []
-        for line in self.body:
-            # we can't split(None, 5) here b/c rhel 6/7 selinux lines only have
-            # 4 parts before the path, and the path itself could contain
-            # spaces. Unfortunately, this means we have to split the line again
-            # below
-            parts = line.split(None, 4)
-            perms = parts[0]
-            typ = perms[0]
-            entry = {
-                "type": typ,
-                "perms": perms[1:]
-            }
-            if parts[1][0].isdigit():
-                # We have to split the line again to see if this is a RHEL8
-                # selinux stanza. This assumes that the context section will
-                # always have at least two pieces separated by ':'.
-                if ":" in line.split()[4]:
-                    rest = parse_rhel8_selinux(parts[1:])
-                else:
-                    rest = parse_non_selinux(parts[1:])
-            else:
-                rest = parse_selinux(parts[1:])
-
-            # Update our entry and put it into the correct buckets
-            # based on its type.
-            entry.update(rest)
-            entry["raw_entry"] = line
-            entry["dir"] = self["name"]
-            nm = entry["name"]
-            ents[nm] = entry
+        for nm, typ in zip(ents.names(), ents.types):
             if typ not in "bcd":
                 files.append(nm)
             elif typ == "d":
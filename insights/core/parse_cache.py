@@ -0,0 +1,210 @@
+"""
+Opt-in cache of parser instances keyed by the content they were built from.
+Files like ``/etc/redhat-release`` or the output of ``rpm -qa`` often recur
+byte for byte across many archives. Set a :class:`ParseCache` as the
+``parse_cache`` of a :class:`insights.core.dr.Broker`, and parsers invoked by
+that broker are loaded from the cache instead of being constructed when the
+same parser has already seen the same content.
+
+.. code-block:: python
+
+    from insights import dr
+    from insights.core.parse_cache import ParseCache
+
+    cache = ParseCache("/var/cache/insights/parsers", max_size=512 * 1024 * 1024)
+    for archive in archives:
+        with extract(archive) as ex:
+            ctx, broker = initialize_broker(ex.tmp_dir)
+            broker.parse_cache = cache
+            dr.run(broker=broker)
+            log.info(broker.parse_cache_stats)
+
+A cache key is a digest of the parser's name, the insights-core version, the
+datasource's relative path and command arguments, and the datasource's content.
+Filters are applied before the content is hashed, so instances built from
+differently filtered content don't collide. Only parsers that are a function of
+those inputs should be cached; :class:`insights.core.StreamParser` subclasses
+and datasources that aren't :class:`insights.core.spec_factory.ContentProvider`
+instances are always parsed.
+
+Instances are pickled to one file per key beneath the cache directory. When the
+files exceed ``max_size`` bytes, the least recently used ones are removed.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from six.moves import cPickle as pickle
+
+from insights.core import LogFileOutput, StreamParser
+from insights.core.linebuffer import LineBuffer
+from insights.core.spec_factory import ContentProvider
+from insights.util import fs
+
+log = logging.getLogger(__name__)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ParseCache(object):
+    """
+    A bounded, on-disk, least recently used store of parser instances.
+
+    Args:
+        path (str): directory to keep cached instances in. It's created if it
+            doesn't exist and can be shared by processes.
+        max_size (int): bytes of cached instances to keep.
+        version (str): identifies the parser implementations. Defaults to the
+            insights-core version and commit, so upgrading invalidates the
+            cache.
+    """
+    suffix = ".pickle"
+
+    def __init__(self, path, max_size=256 * 1024 * 1024, version=None):
+        if version is None:
+            from insights import get_nvr, package_info
+            version = "%s-%s" % (get_nvr(), package_info["COMMIT"])
+        self.path = path
+        self.max_size = max_size
+        self.version = version
+        self._lock = threading.Lock()
+        fs.ensure_path(path)
+        self._size = sum(s for _, _, s in self._entries())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _entries(self):
+        for name in os.listdir(self.path):
+            if name.endswith(self.suffix):
+                p = os.path.join(self.path, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                yield p, st.st_mtime, st.st_size
+
+    def make_key(self, component, provider):
+        """
+        Returns the key for the instance the parser component builds from the
+        datasource provider, or None if it shouldn't be cached.
+        """
+        if not isinstance(provider, ContentProvider):
+            return None
+        if isinstance(component, type) and issubclass(component, StreamParser):
+            return None
+
+        h = hashlib.sha256()
+        parts = [
+            "%s.%s" % (component.__module__, component.__name__),
+            self.version,
+            provider.relative_path or "",
+            repr(getattr(provider, "args", None)),
+        ]
+        for p in parts:
+            h.update(p.encode("utf-8"))
+            h.update(b"\0")
+
+        content = None
+        if isinstance(component, type) and issubclass(component, LogFileOutput):
+            # load the lines the way the parser will
+            content = getattr(provider, "buffered_content", None)
+        if content is None:
+            content = provider.content
+        if isinstance(content, (list, LineBuffer)):
+            for line in content:
+                h.update(line.encode("utf-8", "surrogatepass") if not isinstance(line, bytes) else line)
+                h.update(b"\n")
+        elif isinstance(content, bytes):
+            h.update(content)
+        elif content is not None:
+            h.update(content.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def get(self, key):
+        """
+        Returns the cached instance for the key or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except (IOError, OSError):
+            return None
+        except Exception as ex:
+            log.debug("Removing unreadable cache entry %s: %s", path, ex)
+            _remove(path)
+            return None
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key, instance):
+        """
+        Stores the instance under the key. Instances that can't be pickled
+        are skipped.
+        """
+        try:
+            data = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+        except Exception as ex:
+            log.debug("Can't cache %s: %s", type(instance).__name__, ex)
+            return False
+
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.rename(tmp, path)
+        except Exception as ex:
+            log.debug("Can't write cache entry %s: %s", path, ex)
+            _remove(tmp)
+            return False
+
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_size:
+                self._evict()
+        return True
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        size = sum(s for _, _, s in entries)
+        target = self.max_size * 0.9
+        for path, _, s in entries:
+            if size <= target:
+                break
+            _remove(path)
+            size -= s
+        self._size = size
+
+    def __len__(self):
+        return sum(1 for _ in self._entries())
+
+    def clear(self):
+        """
+        Removes every cached instance.
+        """
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                _remove(path)
+            self._size = 0
@@ -0,0 +1,307 @@
+"""
+An in-memory index of the files, directories, and symbolic links beneath a
+root, used to answer existence checks, directory listings, and glob patterns
+without touching the file system. Paths given to and returned by
+:class:`PathIndex` are relative to the root and use "/" as the separator.
+
+:func:`scan` indexes a directory tree in a single walk, and
+:class:`IndexedTree` answers questions about the tree from its index with
+absolute paths, so code written against :mod:`os.path` and :mod:`glob` can
+use it unchanged.
+"""
+import fnmatch
+import os
+import posixpath
+import re
+import stat
+
+_MAGIC = re.compile(r"[*?[]")
+_MAX_LINKS = 40
+
+
+def normalize(path):
+    """
+    Returns path relative to the root of an index, without leading "./" or
+    "/" and with redundant separators and "." components removed. Returns ""
+    for the root itself.
+    """
+    path = posixpath.normpath("/" + path.replace("\\", "/"))
+    return path.lstrip("/")
+
+
+class PathIndex(object):
+    """
+    Index of regular files, directories, and symbolic links. Directories are
+    added implicitly for every parent of an added path.
+    """
+    def __init__(self):
+        self._children = {"": set()}
+        self._files = set()
+        self._links = {}
+        self._order = []
+        self._parents = {}
+
+    def _add_parents(self, path):
+        child = path
+        parent = posixpath.dirname(path)
+        while True:
+            names = self._children.get(parent)
+            if names is None:
+                names = self._children[parent] = set()
+            elif posixpath.basename(child) in names:
+                return
+            name = posixpath.basename(child)
+            names.add(name)
+            self._parents.setdefault(name, []).append(parent)
+            if not parent:
+                return
+            child = parent
+            parent = posixpath.dirname(parent)
+
+    def add_file(self, path):
+        path = normalize(path)
+        if path and path not in self._files:
+            self._files.add(path)
+            self._order.append(path)
+            self._add_parents(path)
+
+    def add_dir(self, path):
+        path = normalize(path)
+        if path:
+            self._children.setdefault(path, set())
+            self._add_parents(path)
+
+    def add_link(self, path, target):
+        """
+        Adds a symbolic link. Relative targets are resolved against the
+        link's directory. Absolute targets and relative ones that climb above
+        the root are treated as pointing outside of it.
+        """
+        path = normalize(path)
+        if not path:
+            return
+        if target.startswith("/"):
+            # absolute targets refer to the system the files came from
+            resolved = None
+        else:
+            resolved = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+            if resolved == ".." or resolved.startswith("../"):
+                resolved = None
+            else:
+                resolved = normalize(resolved)
+        self._links[path] = resolved
+        self._add_parents(path)
+
+    def resolve(self, path):
+        """
+        Returns path with every symbolic link in it resolved, or None if a
+        link points outside the root or links form a loop.
+        """
+        parts = normalize(path).split("/") if path.strip("/.") else []
+        resolved = ""
+        hops = 0
+        while parts:
+            name = parts.pop(0)
+            candidate = posixpath.join(resolved, name) if resolved else name
+            if candidate in self._links:
+                hops += 1
+                target = self._links[candidate]
+                if target is None or hops > _MAX_LINKS:
+                    return None
+                parts = (target.split("/") if target else []) + parts
+                resolved = ""
+            else:
+                resolved = candidate
+        return resolved
+
+    def isfile(self, path):
+        resolved = self.resolve(path)
+        return resolved is not None and resolved in self._files
+
+    def isdir(self, path):
+        resolved = self.resolve(path)
+        return resolved is not None and resolved in self._children
+
+    def exists(self, path):
+        resolved = self.resolve(path)
+        return resolved is not None and (resolved in self._files or resolved in self._children)
+
+    def islink(self, path):
+        return normalize(path) in self._links
+
+    def listdir(self, path):
+        """
+        Returns the sorted names of the entries in the directory at path.
+
+        Raises:
+            OSError: if path isn't a directory.
+        """
+        resolved = self.resolve(path)
+        if resolved is None or resolved not in self._children:
+            raise OSError("Not a directory: %s" % path)
+        return sorted(self._children[resolved])
+
+    def find(self, path):
+        """
+        Returns the sorted directories that contain path as a file or
+        directory, without following symbolic links. Finding a name is a
+        lookup rather than a scan of every indexed path.
+        """
+        path = normalize(path)
+        if not path:
+            return []
+        first = path.split("/", 1)[0]
+        results = []
+        for parent in self._parents.get(first, ()):
+            candidate = posixpath.join(parent, path) if parent else path
+            if candidate in self._files or candidate in self._children:
+                results.append(parent)
+        return sorted(results)
+
+    def files(self):
+        """
+        Returns the paths of all regular files in the order they were added.
+        Symbolic links aren't included.
+        """
+        return list(self._order)
+
+    def glob(self, pattern):
+        """
+        Returns the paths matching a shell style pattern the way
+        :func:`glob.glob` would for the files beneath the root. Wildcards
+        don't match names starting with "." unless the pattern component
+        does.
+        """
+        pattern = normalize(pattern)
+        if not pattern:
+            return []
+        results = [""]
+        components = pattern.split("/")
+        last = len(components) - 1
+        for i, comp in enumerate(components):
+            matches = []
+            for base in results:
+                if _MAGIC.search(comp):
+                    if not self.isdir(base):
+                        continue
+                    names = self._children[self.resolve(base)]
+                    if not comp.startswith("."):
+                        names = [n for n in names if not n.startswith(".")]
+                    for n in fnmatch.filter(sorted(names), comp):
+                        matches.append(posixpath.join(base, n) if base else n)
+                else:
+                    candidate = posixpath.join(base, comp) if base else comp
+                    if i < last:
+                        found = self.isdir(candidate)
+                    else:
+                        found = self.exists(candidate) or self.islink(candidate)
+                    if found:
+                        matches.append(candidate)
+            results = matches
+            if not results:
+                break
+        return results
+
+    def __len__(self):
+        return len(self._files)
+
+
+if hasattr(os, "scandir"):
+    def _entries(path):
+        with os.scandir(path) as it:
+            for ent in it:
+                yield ent.name, ent.path, ent.is_dir(follow_symlinks=False), \
+                    ent.is_file(follow_symlinks=False), ent.is_symlink()
+
+else:
+    def _entries(path):
+        for name in os.listdir(path):
+            full_path = os.path.join(path, name)
+            mode = os.lstat(full_path).st_mode
+            yield name, full_path, stat.S_ISDIR(mode), stat.S_ISREG(mode), stat.S_ISLNK(mode)
+
+
+def _scan(index, path, rel):
+    for name, full_path, is_dir, is_file, is_link in _entries(path):
+        child = rel + "/" + name if rel else name
+        if is_dir:
+            index.add_dir(child)
+            _scan(index, full_path, child)
+        elif is_file:
+            index.add_file(child)
+        elif is_link:
+            index.add_link(child, os.readlink(full_path))
+
+
+def scan(root):
+    """
+    Walks the directory tree beneath root once and returns a
+    :class:`PathIndex` of its regular files, directories, and symbolic
+    links. Other kinds of files are left out.
+    """
+    index = PathIndex()
+    _scan(index, root, "")
+    return index
+
+
+class IndexedTree(object):
+    """
+    Answers questions about the files beneath the directory root from a
+    :class:`PathIndex` of them. Methods take and return absolute paths
+    beneath root and behave like their :mod:`os.path`, :func:`os.listdir`,
+    and :func:`glob.glob` counterparts.
+
+    Args:
+        root (str): the directory the index describes.
+        index (PathIndex): the index of the files beneath root.
+    """
+    def __init__(self, root, index):
+        self.root = root
+        self.index = index
+
+    def _rel(self, path):
+        rel = os.path.relpath(path, self.root)
+        if rel == os.curdir:
+            return ""
+        if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return None
+        return rel
+
+    def _abs(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def exists(self, path):
+        rel = self._rel(path)
+        return rel is not None and self.index.exists(rel)
+
+    def isfile(self, path):
+        rel = self._rel(path)
+        return rel is not None and self.index.isfile(rel)
+
+    def isdir(self, path):
+        rel = self._rel(path)
+        return rel is not None and self.index.isdir(rel)
+
+    def listdir(self, path):
+        rel = self._rel(path)
+        if rel is None:
+            raise OSError("Not a directory: %s" % path)
+        return self.index.listdir(rel)
+
+    def glob(self, pattern):
+        rel = self._rel(pattern)
+        if rel is None:
+            return []
+        return [self._abs(p) for p in self.index.glob(rel)]
+
+    def find(self, path):
+        """
+        Returns the directories that contain path, as absolute paths.
+        """
+        return [self._abs(d) for d in self.index.find(path)]
+
+    def files(self):
+        """
+        Returns the paths of the regular files beneath root.
+        """
+        return [self._abs(p) for p in self.index.files()]
@@ -121,13 +121,34 @@ class parser(PluginType):
         self.continue_on_error = kwargs.get('continue_on_error', True)
         super(parser, self).__init__(*args, group=group)
 
+    def parse(self, broker, provider):
+        """
+        Returns the parser instance for a datasource value, using the broker's
+        parse cache if it has one.
+        """
+        cache = broker.parse_cache
+        if cache is None:
+            return self.component(provider)
+
+        key = cache.make_key(self.component, provider)
+        if key is None:
+            return self.component(provider)
+
+        result = cache.get(key)
+        broker.count_parse_cache(result is not None)
+        if result is None:
+            result = self.component(provider)
+            if result is not None:
+                cache.put(key, result)
+        return result
+
     def invoke(self, broker):
         dep_value = broker[self.requires[0]]
         exception = False
 
         if not isinstance(dep_value, list):
             try:
-                return self.component(dep_value)
+                return self.parse(broker, dep_value)
             except ContentException as ce:
                 log.debug(ce)
                 broker.add_exception(self.component, ce, traceback.format_exc())
@@ -143,7 +164,7 @@ class parser(PluginType):
         results = []
         for d in dep_value:
             try:
-                r = self.component(d)
+                r = self.parse(broker, d)
                 if r is not None:
                     results.append(r)
             except dr.SkipComponent:
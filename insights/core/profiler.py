@@ -0,0 +1,277 @@
+"""
+Opt-in resource profiling of component evaluation. Set a :class:`Profiler` as
+the ``profiler`` of a :class:`insights.core.dr.Broker` before running a graph,
+and every component the broker invokes will have its wall time, CPU time, CPU
+time of reaped child processes, peak RSS growth, and optionally Python memory
+allocations recorded.
+
+.. code-block:: python
+
+    from insights import dr
+    from insights.core.profiler import Profiler
+
+    broker = dr.Broker()
+    broker.profiler = Profiler(trace_allocations=True)
+    dr.run(broker=broker)
+
+    broker.profiler.stop()
+
+    with open("profile.json", "w") as f:
+        broker.profiler.dump_json(f)
+
+    with open("profile.folded", "w") as f:
+        broker.profiler.dump_collapsed(f, metric="cpu")
+
+Commands run by :class:`insights.core.spec_factory.CommandOutputProvider` are
+executed lazily when a parser first reads their content, so their CPU time
+shows up as ``child_cpu`` of that parser instead of its own ``cpu``.
+
+Resource usage is gathered with :func:`resource.getrusage`, which is per
+process. When components are run concurrently by
+:func:`insights.core.dr.run_parallel`, CPU time is measured per thread where
+the platform supports it, but child CPU and RSS may be attributed to whichever
+components overlapped. If it's given a process pool, each component is
+measured by a copy of the profiler in the worker that evaluates it, and the
+measurements are merged back into the original.
+"""
+import json
+import threading
+import time
+
+from insights.core import dr
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+if hasattr(time, "thread_time"):
+    def _cpu_time():
+        return time.thread_time()
+elif resource is not None:
+    def _cpu_time():
+        ru = resource.getrusage(resource.RUSAGE_SELF)
+        return ru.ru_utime + ru.ru_stime
+else:
+    def _cpu_time():
+        return time.clock()
+
+
+def _child_cpu_time():
+    if resource is None:
+        return 0.0
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+def _max_rss():
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class ComponentProfile(object):
+    """
+    Resources used by a component. Components that produce multiple instances
+    or that are invoked more than once accumulate their measurements.
+
+    Attributes:
+        calls (int): how many times the component was invoked.
+        wall (float): wall clock seconds.
+        cpu (float): seconds of CPU time used by the evaluating thread.
+        child_cpu (float): seconds of CPU time used by child processes that
+            were reaped during evaluation.
+        rss_delta (int): growth of the process's peak resident set size, in
+            the units of ``ru_maxrss`` (kilobytes on Linux).
+        alloc_size (int): net bytes of Python memory allocated. Only recorded
+            if allocation tracing is enabled.
+        alloc_peak (int): peak bytes of Python memory allocated during
+            evaluation, above what was allocated when it started. Only
+            recorded if allocation tracing is enabled and
+            :func:`tracemalloc.reset_peak` is available (Python 3.9+).
+    """
+    fields = ("calls", "wall", "cpu", "child_cpu", "rss_delta", "alloc_size", "alloc_peak")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.child_cpu = 0.0
+        self.rss_delta = 0
+        self.alloc_size = 0
+        self.alloc_peak = 0
+
+    def to_dict(self):
+        return dict((f, getattr(self, f)) for f in self.fields)
+
+
+class _Measurement(object):
+    def __init__(self, profiler, component):
+        self.profiler = profiler
+        self.component = component
+
+    def __enter__(self):
+        self.track_peak = False
+        if self.profiler.trace_allocations:
+            # the traced peak is process wide, so start it over here.
+            self.track_peak = hasattr(tracemalloc, "reset_peak")
+            if self.track_peak:
+                tracemalloc.reset_peak()
+            self.alloc = tracemalloc.get_traced_memory()[0]
+        self.rss = _max_rss()
+        self.child_cpu = _child_cpu_time()
+        self.cpu = _cpu_time()
+        self.wall = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.time() - self.wall
+        cpu = _cpu_time() - self.cpu
+        child_cpu = _child_cpu_time() - self.child_cpu
+        rss_delta = max(0, _max_rss() - self.rss)
+        alloc_size = alloc_peak = 0
+        if self.profiler.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            alloc_size = current - self.alloc
+            if self.track_peak:
+                alloc_peak = max(0, peak - self.alloc)
+        self.profiler.record(self.component, wall, cpu, child_cpu, rss_delta, alloc_size, alloc_peak)
+        return False
+
+
+class Profiler(object):
+    """
+    Records a :class:`ComponentProfile` for each component a broker invokes.
+
+    Args:
+        trace_allocations (bool): if True, :mod:`tracemalloc` is started if it
+            isn't already tracing and allocation sizes are recorded. Tracing
+            allocations slows evaluation down considerably.
+
+    Attributes:
+        profiles (dict): component -> :class:`ComponentProfile`
+    """
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations and tracemalloc is not None
+        self._started_tracing = False
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.profiles = {}
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """
+        Stops allocation tracing if this profiler started it. Measurements
+        already recorded are kept.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.trace_allocations = False
+
+    def profile(self, component):
+        """
+        Returns a context manager that measures the resources used within it
+        and records them for the component.
+        """
+        return _Measurement(self, component)
+
+    def record(self, component, wall, cpu, child_cpu=0.0, rss_delta=0, alloc_size=0, alloc_peak=0):
+        with self._lock:
+            p = self.profiles.get(component)
+            if p is None:
+                p = self.profiles[component] = ComponentProfile()
+            p.calls += 1
+            p.wall += wall
+            p.cpu += cpu
+            p.child_cpu += child_cpu
+            p.rss_delta += rss_delta
+            p.alloc_size += alloc_size
+            p.alloc_peak = max(p.alloc_peak, alloc_peak)
+
+    def merge(self, profiles):
+        """
+        Adds measurements recorded elsewhere to this profiler. Used by
+        :func:`insights.core.dr.run_parallel` to collect the profiles of
+        components evaluated in a process pool.
+
+        Args:
+            profiles (dict): component -> :class:`ComponentProfile`, like the
+                ``profiles`` of another profiler.
+        """
+        with self._lock:
+            for comp, o in profiles.items():
+                p = self.profiles.get(comp)
+                if p is None:
+                    p = self.profiles[comp] = ComponentProfile()
+                for f in ComponentProfile.fields:
+                    if f != "alloc_peak":
+                        setattr(p, f, getattr(p, f) + getattr(o, f))
+                p.alloc_peak = max(p.alloc_peak, o.alloc_peak)
+
+    def __getstate__(self):
+        # a copy sent to another process starts empty. Its profiles are
+        # merged back by the caller.
+        return {"trace_allocations": self.trace_allocations}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def to_dict(self):
+        """
+        Returns a dictionary of component names to dictionaries of their
+        measurements and component type.
+        """
+        result = {}
+        for comp, p in self.profiles.items():
+            d = p.to_dict()
+            _type = dr.get_component_type(comp)
+            d["type"] = dr.get_name(_type) if _type else None
+            result[dr.get_name(comp)] = d
+        return result
+
+    def dump_json(self, stream, **kwargs):
+        """
+        Writes :meth:`to_dict` to stream as JSON.
+        """
+        json.dump(self.to_dict(), stream, **kwargs)
+
+    def to_collapsed(self, metric="wall"):
+        """
+        Returns the profile in the collapsed stack format understood by
+        ``flamegraph.pl`` and compatible tools. Each line is a component's type,
+        module, and name separated by semicolons followed by the metric in
+        integer microseconds (or the raw value for non time metrics).
+        Concatenating the output for many archives aggregates them.
+
+        Args:
+            metric (str): one of the :class:`ComponentProfile` fields.
+        """
+        scale = 1000000 if metric in ("wall", "cpu", "child_cpu") else 1
+        lines = []
+        for comp, p in self.profiles.items():
+            value = int(getattr(p, metric) * scale)
+            if value <= 0:
+                continue
+            _type = dr.get_component_type(comp)
+            frames = [
+                _type.__name__ if _type else "unknown",
+                dr.get_module_name(comp) or "unknown",
+                dr.get_simple_name(comp)
+            ]
+            lines.append("%s %d" % (";".join(f.replace(";", ":").replace(" ", "_") for f in frames), value))
+        return "\n".join(sorted(lines))
+
+    def dump_collapsed(self, stream, metric="wall"):
+        """
+        Writes :meth:`to_collapsed` to stream.
+        """
+        out = self.to_collapsed(metric)
+        if out:
+            stream.write(out + "\n")
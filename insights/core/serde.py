@@ -5,10 +5,15 @@ serializer and deserializer functions for types. It also provides a
 load objects from the file system. The Hydration class includes a
 :py:func`Hydration.make_persister` method that returns a function appropriate
 to register as an observer on a :py:class:`Broker`.
+
+Component metadata documents are saved either as one file per component in a
+directory or packed into a single indexed file by :py:class:`PackedStore`.
 """
 import json as ser
 import logging
 import os
+import struct
+import threading
 import time
 import traceback
 from glob import glob
@@ -114,23 +119,185 @@ def unmarshal(data, root=None):
     return deserialize(data, root=root)
 
 
+class PackedStore(object):
+    """
+    Stores component metadata documents as length prefixed records in a single
+    file so they can be loaded without listing and opening a file for each.
+
+    Each record is the byte lengths of the component name and of the document
+    as two big endian 32 bit integers, followed by the name and the
+    serialized document. :py:meth:`close` appends a table of the record
+    offsets and a fixed size footer pointing to it. A file without the table,
+    like one left by an interrupted collection, is indexed by scanning the
+    record headers.
+
+    Args:
+        path (str): the file to read or to append to.
+    """
+    header = struct.Struct(">II")
+    footer = struct.Struct(">Q8s")
+    magic = b"INSPACK1"
+
+    def __init__(self, path):
+        self.path = path
+        self._index = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def _read_index(self, f):
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size >= self.footer.size:
+            f.seek(size - self.footer.size)
+            table, magic = self.footer.unpack(f.read(self.footer.size))
+            if magic == self.magic and table < size:
+                f.seek(table)
+                data = f.read(size - self.footer.size - table)
+                return table, dict((k, tuple(v)) for k, v in ser.loads(data.decode("utf-8")).items())
+
+        index = {}
+        pos = 0
+        f.seek(0)
+        while pos + self.header.size <= size:
+            name_len, doc_len = self.header.unpack(f.read(self.header.size))
+            start = pos + self.header.size + name_len
+            if start + doc_len > size:
+                break
+            name = f.read(name_len).decode("utf-8")
+            index[name] = (start, doc_len)
+            pos = start + doc_len
+            f.seek(pos)
+        return pos, index
+
+    @property
+    def index(self):
+        """
+        dict: component name -> (offset, length) of its serialized document.
+        """
+        if self._index is None:
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    self._index = self._read_index(f)[1]
+            else:
+                self._index = {}
+        return self._index
+
+    def names(self):
+        """
+        Returns the names of the stored components in the order they were
+        written.
+        """
+        return [k for k, _ in sorted(self.index.items(), key=lambda i: i[1][0])]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def load(self, name):
+        """
+        Reads and parses the document of a single component.
+        """
+        offset, length = self.index[name]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return ser.loads(f.read(length).decode("utf-8"))
+
+    def write(self, name, doc):
+        """
+        Appends the document for a component. A later document for the same
+        name replaces the earlier one.
+        """
+        data = ser.dumps(doc).encode("utf-8")
+        key = name.encode("utf-8")
+        with self._lock:
+            if self._writer is None:
+                f = open(self.path, "a+b")
+                end, self._index = self._read_index(f)
+                # drop the offset table. It's rewritten on close.
+                f.truncate(end)
+                f.seek(end)
+                self._writer = f
+            f = self._writer
+            pos = f.tell()
+            f.write(self.header.pack(len(key), len(data)) + key + data)
+            self._index[name] = (pos + self.header.size + len(key), len(data))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_writer"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def close(self):
+        """
+        Writes the offset table if anything was written and closes the file.
+        """
+        with self._lock:
+            f = self._writer
+            if f is None:
+                return
+            table = f.tell()
+            f.write(ser.dumps(self._index).encode("utf-8"))
+            f.write(self.footer.pack(table, self.magic))
+            f.close()
+            self._writer = None
+
+
+def _load_path(path):
+    with open(path) as f:
+        return ser.load(f)
+
+
+def _read_doc(load, root=None, deserialize=False):
+    """
+    Reads a metadata document and optionally unmarshals its results in place.
+    Runs in a worker of the pool passed to :meth:`Hydration.hydrate`.
+    """
+    doc = load()
+    if deserialize:
+        doc["results"] = unmarshal(doc["results"], root=root)
+    return doc
+
+
 class Hydration(object):
     """
     The Hydration class is responsible for saving and loading insights
     components. It puts metadata about a component's evaluation in a metadata
     file for the component and allows the serializer for a component to put raw
     data beneath a working directory.
+
+    With ``storage="packed"`` the metadata documents are written to a single
+    :py:class:`PackedStore` file named after the metadata directory with a
+    ``.pack`` extension, and :py:meth:`close` must be called once all
+    components are saved. :py:meth:`hydrate` reads whichever format is
+    present.
     """
-    def __init__(self, root=None, meta_data="meta_data", data="data", pool=None):
+    storage_types = ("directory", "packed")
+
+    def __init__(self, root=None, meta_data="meta_data", data="data", pool=None, storage="directory"):
+        if storage not in self.storage_types:
+            raise ValueError("Unknown hydration storage: %s" % storage)
         self.root = root
         self.meta_data = os.path.join(root, meta_data) if root else None
         self.data = os.path.join(root, data) if root else None
         self.ser_name = dr.get_base_module_name(ser)
         self.created = False
         self.pool = pool
+        self.storage = storage
+        self.pack = PackedStore(self.meta_data + ".pack") if root else None
 
-    def _hydrate_one(self, doc):
-        """ Returns (component, results, errors, duration) """
+    def _hydrate_one(self, doc, lazy=False, unmarshaled=False):
+        """
+        Returns (component, results, exec_time, ser_time). If lazy is True,
+        results is a function that deserializes them or None if there are none.
+        If unmarshaled is True, the doc's results are already deserialized.
+        """
         name = doc["name"]
 
         key = dr.get_component_by_name(name)
@@ -138,26 +305,88 @@ class Hydration(object):
             raise ValueError("{} is not a loaded component.".format(name))
         exec_time = doc["exec_time"]
         ser_time = doc["ser_time"]
-        results = unmarshal(doc["results"], root=self.data)
+        if lazy:
+            results = self._make_loader(doc["results"]) if doc["results"] else None
+        elif unmarshaled:
+            results = doc["results"]
+        else:
+            results = unmarshal(doc["results"], root=self.data)
         return (key, results, exec_time, ser_time)
 
-    def hydrate(self, broker=None):
+    def _make_loader(self, data):
+        """
+        Returns a function that deserializes results when a lazily hydrated
+        component is first accessed. Failures are logged as :meth:`hydrate`
+        would and leave the component out of the broker.
+        """
+        def load():
+            from insights.core.spec_factory import ContentException
+
+            try:
+                results = unmarshal(data, root=self.data)
+            except ContentException as ex:
+                log.debug(ex)
+                raise dr.SkipComponent()
+            except Exception as ex:
+                log.warning(ex)
+                raise dr.SkipComponent()
+            if not results:
+                raise dr.SkipComponent()
+            return results
+        return load
+
+    def _get_loaders(self):
+        """
+        Returns a function for each saved component that reads its metadata
+        document.
+        """
+        if os.path.exists(self.pack.path):
+            return [partial(self.pack.load, n) for n in self.pack.names()]
+        return [partial(_load_path, p) for p in glob(os.path.join(self.meta_data, "*"))]
+
+    def _read_docs(self, pool=None, deserialize=False):
+        """
+        Returns a function for each saved component that returns its metadata
+        document. With a pool, the documents are read by its workers and the
+        functions wait for them.
+        """
+        loaders = self._get_loaders()
+        if pool is None:
+            return [partial(_read_doc, load, self.data, deserialize) for load in loaders]
+        futures = [pool.submit(_read_doc, load, self.data, deserialize) for load in loaders]
+        return [f.result for f in futures]
+
+    def hydrate(self, broker=None, lazy=False, pool=None):
         """
         Loads a Broker from a previously saved one. A Broker is created if one
         isn't provided.
+
+        If lazy is True, the metadata of every component is read but its
+        results are only deserialized when the broker is first asked for them.
+        See :meth:`insights.core.dr.Broker.set_lazy`.
+
+        If a ``concurrent.futures`` style pool is passed, its workers read the
+        metadata documents and, unless lazy is True, deserialize the results.
+        A ``ThreadPoolExecutor`` overlaps the file reads. A
+        ``ProcessPoolExecutor`` also spreads deserialization over processes,
+        but the results must be picklable. Components are added to the broker
+        in the same order either way.
         """
         from insights.core.spec_factory import ContentException
 
         broker = broker or dr.Broker()
-        for path in glob(os.path.join(self.meta_data, "*")):
+        deserialize = pool is not None and not lazy
+        for read in self._read_docs(pool, deserialize):
             try:
-                with open(path) as f:
-                    doc = ser.load(f)
-                    res = self._hydrate_one(doc)
-                    comp, results, exec_time, ser_time = res
-                    if results:
+                doc = read()
+                res = self._hydrate_one(doc, lazy=lazy, unmarshaled=deserialize)
+                comp, results, exec_time, ser_time = res
+                if results:
+                    if lazy:
+                        broker.set_lazy(comp, results)
+                    else:
                         broker[comp] = results
-                        broker.exec_times[comp] = exec_time + ser_time
+                    broker.exec_times[comp] = exec_time + ser_time
             except ContentException as ex:
                 log.debug(ex)
             except Exception as ex:
@@ -172,7 +401,8 @@ class Hydration(object):
             raise Exception("Hydration meta_path not set. Can't dehydrate.")
 
         if not self.created:
-            fs.ensure_path(self.meta_data, mode=0o770)
+            if self.storage == "directory":
+                fs.ensure_path(self.meta_data, mode=0o770)
             if self.data:
                 fs.ensure_path(self.data, mode=0o770)
             self.created = True
@@ -202,6 +432,13 @@ class Hydration(object):
             log.exception(ex)
         else:
             if doc is not None and (doc["results"] or doc["errors"]):
+                if self.storage == "packed":
+                    try:
+                        self.pack.write(name, doc)
+                    except Exception as boom:
+                        log.error("Could not serialize %s to %s: %r" % (name, self.pack.path, boom))
+                    return
+
                 try:
                     path = os.path.join(self.meta_data, name + "." + self.ser_name)
                     with open(path, "w") as f:
@@ -211,6 +448,13 @@ class Hydration(object):
                     if path:
                         fs.remove(path)
 
+    def close(self):
+        """
+        Finishes writing packed metadata. Does nothing for directory storage.
+        """
+        if self.pack:
+            self.pack.close()
+
     def make_persister(self, to_persist):
         """
         Returns a function that hydrates components as they are evaluated. The
@@ -229,3 +473,26 @@ class Hydration(object):
             if c in to_persist:
                 self.dehydrate(c, broker)
         return persister
+
+
+def pack_meta_data(root, meta_data="meta_data", remove=True):
+    """
+    Converts the per component metadata files saved beneath root to the packed
+    storage format.
+
+    Args:
+        root (str): the directory the components were saved to.
+        meta_data (str): name of the metadata directory beneath root.
+        remove (bool): whether to remove the metadata directory afterward.
+
+    Returns:
+        str: the path to the packed file.
+    """
+    h = Hydration(root, meta_data=meta_data, storage="packed")
+    for path in sorted(glob(os.path.join(h.meta_data, "*"))):
+        doc = _load_path(path)
+        h.pack.write(doc["name"], doc)
+    h.close()
+    if remove:
+        fs.remove(h.meta_data)
+    return h.pack.path
@@ -6,17 +6,18 @@ import signal
 import six
 import traceback
 import codecs
+from contextlib import contextmanager
 
 from collections import defaultdict
 from glob import glob
 from subprocess import call
 
-from insights.core import blacklist, dr
+from insights.core import blacklist, dr, linebuffer, textfilter
 from insights.core.filters import _add_filter, get_filters
 from insights.core.context import ExecutionContext, FSRoots, HostContext
 from insights.core.plugins import component, datasource, ContentException, is_datasource
 from insights.util import fs, streams, which
-from insights.util.subproc import Pipeline
+from insights.util.subproc import CalledProcessError, Pipeline
 from insights.core.serde import deserializer, serializer
 import shlex
 
@@ -49,6 +50,27 @@ def escape(s):
     return re.sub(r"([=\(\)|\-_!@*~\"&/\\\^\$\=])", r"\\\1", s)
 
 
+class _LocalFiles(object):
+    """
+    Looks up paths on the local file system. The
+    :class:`insights.core.path_index.IndexedTree` of a context built from an
+    archive, or an :class:`insights.core.archives.ArchiveReader` for one
+    that wasn't extracted, answers the same questions from an index.
+    """
+    exists = staticmethod(os.path.exists)
+    isfile = staticmethod(os.path.isfile)
+    isdir = staticmethod(os.path.isdir)
+    listdir = staticmethod(os.listdir)
+    glob = staticmethod(glob)
+
+
+_LOCAL_FILES = _LocalFiles()
+
+
+def _get_files(ctx):
+    return getattr(ctx, "tree", None) or getattr(ctx, "archive", None) or _LOCAL_FILES
+
+
 def mangle_command(command, name_max=255):
     """
     Mangle a command line string into something suitable for use as the basename of a filename.
@@ -179,6 +201,21 @@ class FileProvider(ContentProvider):
             log.warning("WARNING: Skipping file %s", "/" + self.relative_path)
             raise dr.SkipComponent()
 
+        archive = getattr(self.ctx, "archive", None)
+        if archive is not None:
+            if not archive.isfile(self.path):
+                raise ContentException("%s does not exist." % self.path)
+            return
+
+        tree = getattr(self.ctx, "tree", None)
+        if tree is not None:
+            # the index doesn't follow links outside of the root
+            if not tree.isfile(self.path):
+                raise ContentException("%s does not exist." % self.path)
+            if not os.access(self.path, os.R_OK):
+                raise ContentException("Cannot access %s" % self.path)
+            return
+
         if not os.path.exists(self.path):
             raise ContentException("%s does not exist." % self.path)
 
@@ -190,6 +227,38 @@ class FileProvider(ContentProvider):
         if not os.access(self.path, os.R_OK):
             raise ContentException("Cannot access %s" % self.path)
 
+    def realize(self):
+        """
+        Makes sure the file is on disk. Files of a context whose archive
+        wasn't extracted are written out of the archive the first time their
+        content is needed.
+        """
+        archive = getattr(self.ctx, "archive", None)
+        if archive is not None:
+            try:
+                archive.realize(self.path)
+            except IOError as ex:
+                raise ContentException(str(ex))
+
+    @contextmanager
+    def realized(self):
+        """
+        Like :meth:`realize`, but the file is kept on disk until the block
+        exits, even if other files are realized from the archive meanwhile.
+        """
+        archive = getattr(self.ctx, "archive", None)
+        if archive is None:
+            yield
+            return
+        try:
+            archive.pin(self.path)
+        except IOError as ex:
+            raise ContentException(str(ex))
+        try:
+            yield
+        finally:
+            archive.unpin(self.path)
+
     def __repr__(self):
         return '%s("%r")' % (self.__class__.__name__, self.path)
 
@@ -202,19 +271,31 @@ class RawFileProvider(FileProvider):
 
     def load(self):
         self.loaded = True
-        with open(self.path, 'rb') as f:
-            return f.read()
+        with self.realized():
+            with open(self.path, 'rb') as f:
+                return f.read()
 
     def write(self, dst):
-        fs.ensure_path(os.path.dirname(dst))
-        call([which("cp", env=SAFE_ENV), self.path, dst], env=SAFE_ENV)
+        with self.realized():
+            fs.ensure_path(os.path.dirname(dst))
+            call([which("cp", env=SAFE_ENV), self.path, dst], env=SAFE_ENV)
 
 
 class TextFileProvider(FileProvider):
     """
     Class used in datasources that returns the contents of a file a list of
     lines. Each line is filtered if filters are defined for the datasource.
+
+    If the context's ``native_filtering`` attribute is True, filtering is done
+    in process by :class:`insights.core.textfilter.TextFilter` instead of a
+    ``grep`` and ``sed`` pipeline, falling back to the pipeline for content it
+    can't filter identically.
+
+    The lines are loaded into a :class:`insights.core.linebuffer.LineBuffer`
+    instead of a list when they're read through :attr:`buffered_content` and
+    the context's ``buffered_lines`` attribute is True.
     """
+    _buffered_content = None
 
     def create_args(self):
         args = []
@@ -239,19 +320,70 @@ class TextFileProvider(FileProvider):
             args.append(sed)
         return args
 
-    def load(self):
+    def create_filter(self):
+        """
+        Returns a :class:`insights.core.textfilter.TextFilter` equivalent to
+        the pipeline from :meth:`create_args`, or None if filtering shouldn't be
+        done in process.
+        """
+        if not getattr(self.ctx, "native_filtering", False):
+            return None
+        try:
+            return textfilter.TextFilter(get_filters(self.ds) if self.ds else None,
+                                         blacklist.get_disallowed_patterns(),
+                                         blacklist.get_disallowed_keywords())
+        except textfilter.Unsupported as ex:
+            log.debug(ex)
+
+    @property
+    def buffered_content(self):
+        """
+        The content as a :class:`insights.core.linebuffer.LineBuffer` if the
+        context's ``buffered_lines`` attribute is True, unless it was already
+        loaded as a list. :class:`insights.core.LogFileOutput` parsers read
+        their content with it. The buffer is kept apart from :attr:`content`,
+        which is still a list.
+        """
+        if self._buffered_content is not None:
+            return self._buffered_content
+        if self._content is not None or not getattr(self.ctx, "buffered_lines", False):
+            return self.content
+        if self._exception:
+            raise self._exception
+        try:
+            self._buffered_content = self.load(buffered=True)
+        except Exception as ex:
+            self._exception = ex
+            raise
+        return self._buffered_content
+
+    def load(self, buffered=False):
         self.loaded = True
-        args = self.create_args()
-        if args:
-            rc, out = self.ctx.shell_out(args, keep_rc=True, env=SAFE_ENV)
-            self.rc = rc
-            return out
-        if six.PY3:
-            with open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
-                return [l.rstrip("\n") for l in f]
-        else:
-            with codecs.open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
-                return [l.rstrip("\n") for l in f]
+        with self.realized():
+            args = self.create_args()
+            if args:
+                tf = self.create_filter()
+                if tf:
+                    try:
+                        if buffered:
+                            out = linebuffer.LineBuffer(tf.iter_lines(self.path))
+                            self.rc = tf.rc
+                            return out
+                        self.rc, out = tf.lines(self.path)
+                        return out
+                    except textfilter.Unsupported as ex:
+                        log.debug(ex)
+                rc, out = self.ctx.shell_out(args, keep_rc=True, env=SAFE_ENV)
+                self.rc = rc
+                return linebuffer.LineBuffer(out) if buffered else out
+            if buffered:
+                return linebuffer.load(self.path, mapped=getattr(self.ctx, "mapped_files", False))
+            if six.PY3:
+                with open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
+                    return [l.rstrip("\n") for l in f]
+            else:
+                with codecs.open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
+                    return [l.rstrip("\n") for l in f]
 
     def _stream(self):
         """
@@ -263,31 +395,52 @@ class TextFileProvider(FileProvider):
             if self._content:
                 yield self._content
             else:
-                args = self.create_args()
-                if args:
-                    with streams.connect(*args, env=SAFE_ENV) as s:
-                        yield s
-                else:
-                    if six.PY3:
-                        with open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
-                            yield f
+                with self.realized():
+                    args = self.create_args()
+                    if args:
+                        with streams.connect(*args, env=SAFE_ENV) as s:
+                            yield s
                     else:
-                        with codecs.open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
-                            yield f
+                        if six.PY3:
+                            with open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
+                                yield f
+                        else:
+                            with codecs.open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
+                                yield f
         except StopIteration:
             raise
         except Exception as ex:
             self._exception = ex
             raise ContentException(str(ex))
 
+    def _write_filtered(self, tf, args, dst):
+        already_exists = os.path.exists(dst)
+        try:
+            with open(dst, "wb") as f:
+                for chunk in tf.chunks(self.path):
+                    f.write(chunk)
+            if tf.rc:
+                raise CalledProcessError(tf.rc, args[0], "")
+        except BaseException:
+            if not already_exists and os.path.exists(dst):
+                os.remove(dst)
+            raise
+
     def write(self, dst):
-        fs.ensure_path(os.path.dirname(dst))
-        args = self.create_args()
-        if args:
-            p = Pipeline(*args, env=SAFE_ENV)
-            p.write(dst)
-        else:
-            call([which("cp", env=SAFE_ENV), self.path, dst], env=SAFE_ENV)
+        with self.realized():
+            fs.ensure_path(os.path.dirname(dst))
+            args = self.create_args()
+            if args:
+                tf = self.create_filter()
+                if tf:
+                    try:
+                        return self._write_filtered(tf, args, dst)
+                    except textfilter.Unsupported as ex:
+                        log.debug(ex)
+                p = Pipeline(*args, env=SAFE_ENV)
+                p.write(dst)
+            else:
+                call([which("cp", env=SAFE_ENV), self.path, dst], env=SAFE_ENV)
 
 
 class SerializedOutputProvider(TextFileProvider):
@@ -600,12 +753,13 @@ class glob_file(object):
 
     def __call__(self, broker):
         ctx = _get_context(self.context, broker)
+        files = _get_files(ctx)
         root = ctx.root
         results = []
         for pattern in self.patterns:
             pattern = ctx.locate_path(pattern)
-            for path in sorted(glob(os.path.join(root, pattern.lstrip('/')))):
-                if self.ignore_func(path) or os.path.isdir(path):
+            for path in sorted(files.glob(os.path.join(root, pattern.lstrip('/')))):
+                if self.ignore_func(path) or files.isdir(path):
                     continue
                 try:
                     results.append(self.kind(path[len(root):], root=root, ds=self, ctx=ctx))
@@ -696,9 +850,10 @@ class listdir(object):
 
     def __call__(self, broker):
         ctx = _get_context(self.context, broker)
+        files = _get_files(ctx)
         p = os.path.join(ctx.root, self.path.lstrip('/'))
         p = ctx.locate_path(p)
-        result = sorted(os.listdir(p)) if os.path.isdir(p) else sorted(glob(p))
+        result = sorted(files.listdir(p)) if files.isdir(p) else sorted(files.glob(p))
 
         if result:
             return [os.path.basename(r) for r in result if not self.ignore_func(r)]
@@ -906,6 +1061,7 @@ class foreach_collect(object):
         result = []
         source = broker[self.provider]
         ctx = _get_context(self.context, broker)
+        files = _get_files(ctx)
         root = ctx.root
         if isinstance(source, ContentProvider):
             source = source.content
@@ -913,8 +1069,8 @@ class foreach_collect(object):
             source = [source]
         for e in source:
             pattern = ctx.locate_path(self.path % e)
-            for p in glob(os.path.join(root, pattern.lstrip('/'))):
-                if self.ignore_func(p) or os.path.isdir(p):
+            for p in files.glob(os.path.join(root, pattern.lstrip('/'))):
+                if self.ignore_func(p) or files.isdir(p):
                     continue
                 try:
                     result.append(self.kind(p[len(root):], root=root, ds=self, ctx=ctx))
@@ -1010,6 +1166,46 @@ class find(object):
         return dict(results)
 
 
+_TEMPLATE_FIELD = re.compile(r"%[-#0 +]*\d*(?:\.\d+)?[sdr]")
+
+
+def get_spec_globs(ctx, components=None):
+    """
+    Returns the sorted glob patterns, relative to ``ctx.root``, of the files
+    that the enabled :class:`simple_file`, :class:`first_file`,
+    :class:`glob_file` and :class:`foreach_collect` datasources in components
+    may read under the context. Substitution fields in :class:`foreach_collect`
+    path templates become ``*``. :class:`listdir` only needs directory
+    listings, so it contributes nothing.
+
+    Args:
+        ctx (ExecutionContext): the context the datasources will run under.
+        components (iterable): the components to consider. Defaults to every
+            loaded component.
+    """
+    if components is None:
+        components = dr.get_components_of_type(datasource) or []
+    ctx_type = type(ctx)
+    patterns = set()
+    for comp in components:
+        if not isinstance(comp, (simple_file, first_file, glob_file, foreach_collect)):
+            continue
+        context = comp.context if isinstance(comp.context, list) else [comp.context]
+        if ctx_type not in context or not dr.is_enabled(comp):
+            continue
+        if isinstance(comp, simple_file):
+            paths = [comp.path]
+        elif isinstance(comp, first_file):
+            paths = comp.paths
+        elif isinstance(comp, glob_file):
+            paths = comp.patterns
+        else:
+            paths = [_TEMPLATE_FIELD.sub("*", comp.path)]
+        for p in paths:
+            patterns.add("/" + ctx.locate_path(p).lstrip("/"))
+    return sorted(patterns)
+
+
 @serializer(CommandOutputProvider)
 def serialize_command_output(obj, root):
     rel = os.path.join("insights_commands", mangle_command(obj.cmd))
@@ -0,0 +1,234 @@
+"""
+In-process implementation of the ``grep -F``, ``grep -v -F`` and ``sed``
+pipeline :class:`insights.core.spec_factory.TextFileProvider` uses to apply
+datasource filters and the blacklisted patterns and keywords to a file.
+
+Files are read in large chunks of whole lines and matched as bytes, the way
+the commands do with ``LC_ALL=C``, so the output is byte for byte what the
+pipeline would produce. Content the commands would handle differently, like
+files with NUL bytes that ``grep`` reports as binary, patterns ``grep`` would
+parse as options, or keywords that use ``sed`` regular expression features
+beyond ``.``, ``*``, ``^`` and ``$``, raise :class:`Unsupported` so the caller
+can fall back to the pipeline.
+
+Matchers for a set of patterns are compiled once and cached.
+"""
+import re
+import six
+
+CHUNK_SIZE = 1 << 20
+"""
+Number of bytes read from a file at a time.
+"""
+
+
+class Unsupported(Exception):
+    """
+    Raised when content or keywords can't be filtered identically to the
+    ``grep`` and ``sed`` pipeline.
+    """
+    pass
+
+
+def _encode(s):
+    if isinstance(s, six.binary_type):
+        return s
+    return s.encode("utf-8", "surrogateescape") if six.PY3 else s.encode("utf-8")
+
+
+class LiteralMatcher(object):
+    """
+    Finds lines containing any of a set of literal byte strings, like
+    ``grep -F`` with newline separated patterns.
+
+    Args:
+        patterns (iterable): the byte strings to look for. An empty pattern
+            matches every line.
+    """
+    def __init__(self, patterns):
+        patterns = set(patterns)
+        self.match_all = b"" in patterns
+        alternatives = sorted(patterns, key=lambda p: (-len(p), p))
+        self.regex = re.compile(b"|".join(re.escape(p) for p in alternatives)) if patterns else None
+
+    def split(self, buf):
+        """
+        Splits a buffer of complete, newline terminated lines into the lines
+        that match and those that don't.
+
+        Returns:
+            tuple: lists of ``(start, end)`` offsets of the matching and
+            nonmatching lines. ``end`` includes the newline.
+        """
+        end = len(buf)
+        if self.match_all:
+            return [(0, end)], []
+        if self.regex is None:
+            return [], [(0, end)]
+
+        hits, misses = [], []
+        pos = 0
+        search = self.regex.search
+        while pos < end:
+            m = search(buf, pos)
+            if m is None:
+                misses.append((pos, end))
+                break
+            start = buf.rfind(b"\n", pos, m.start()) + 1 or pos
+            stop = buf.find(b"\n", m.end()) + 1 or end
+            if start > pos:
+                misses.append((pos, start))
+            hits.append((start, stop))
+            pos = stop
+        return hits, misses
+
+
+def _translate_keyword(kw):
+    """
+    Translates a keyword as ``sed -e s/kw/keyword/g`` interprets it in the
+    C locale to a python bytes regular expression.
+    """
+    kw = _encode(kw)
+    out = []
+    last = len(kw) - 1
+    for i in range(len(kw)):
+        c = kw[i:i + 1]
+        if c in (b"\\", b"[", b"\n"):
+            raise Unsupported("Unsupported keyword: %r" % kw)
+        if c == b"^" and i == 0:
+            out.append(b"^")
+        elif c == b"$" and i == last:
+            out.append(b"$")
+        elif c == b"." or (c == b"*" and out and out != [b"^"]):
+            if c == b"*" and out[-1] == b"*":
+                continue
+            out.append(c)
+        else:
+            out.append(re.escape(c))
+
+    regex = re.compile(b"".join(out), re.MULTILINE)
+    if regex.match(b""):
+        raise Unsupported("Keyword matches empty string: %r" % kw)
+    return regex
+
+
+class TextFilter(object):
+    """
+    Applies datasource filters, disallowed patterns and keywords to a file.
+    The stages are the same, and in the same order, as
+    :meth:`insights.core.spec_factory.TextFileProvider.create_args`.
+
+    Args:
+        filters (iterable): keep only lines containing one of these strings.
+        patterns (iterable): drop lines containing one of these strings.
+        keywords (iterable): replace each of these ``sed`` expressions with
+            "keyword".
+
+    Raises:
+        Unsupported: if a keyword can't be translated or the filters or
+            patterns start with "-".
+    """
+    def __init__(self, filters=None, patterns=None, keywords=None):
+        filters = "\n".join(filters or [])
+        patterns = "\n".join(patterns or [])
+        if filters.startswith("-") or patterns.startswith("-"):
+            raise Unsupported("grep would parse the patterns as an option")
+        self.filters = get_filter_matcher(filters) if filters else None
+        self.patterns = get_filter_matcher(patterns) if patterns else None
+        self.keywords = [_translate_keyword(k) for k in (keywords or [])]
+
+    def _process(self, buf):
+        """
+        Filters a buffer of complete lines. Returns the output bytes and
+        whether the last ``grep`` stage selected any line.
+        """
+        if self.filters:
+            buf = b"".join(buf[s:e] for s, e in self.filters.split(buf)[0])
+        if self.patterns:
+            buf = b"".join(buf[s:e] for s, e in self.patterns.split(buf)[1])
+        selected = bool(buf)
+        for regex in self.keywords:
+            buf = regex.sub(b"keyword", buf)
+        return buf, selected
+
+    def chunks(self, path):
+        """
+        Generates the filtered content of the file at path as chunks of
+        bytes. The return code the pipeline would have had is available
+        as :attr:`rc` once the generator is exhausted.
+
+        Raises:
+            Unsupported: if the file contains NUL bytes.
+        """
+        self.rc = 0 if self.keywords else 1
+        tail = b""
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                if b"\0" in data:
+                    raise Unsupported("Binary content in %s" % path)
+                data = tail + data
+                cut = data.rfind(b"\n") + 1
+                tail = data[cut:]
+                if cut:
+                    out, selected = self._process(data[:cut])
+                    if selected and not self.keywords:
+                        self.rc = 0
+                    if out:
+                        yield out
+
+        if tail:
+            # grep terminates the last line of output with a newline
+            if self.filters or self.patterns:
+                tail += b"\n"
+            out, selected = self._process(tail)
+            if selected and not self.keywords:
+                self.rc = 0
+            if out:
+                yield out
+
+    def lines(self, path):
+        """
+        Returns the return code and the filtered lines of the file at path,
+        decoded and split like :meth:`insights.core.context.ExecutionContext.shell_out`
+        does with the pipeline's output.
+        """
+        lines = list(self.iter_lines(path))
+        return self.rc, lines
+
+    def iter_lines(self, path):
+        """
+        Generates the lines :meth:`lines` returns. :attr:`rc` is available
+        once the generator is exhausted.
+        """
+        for chunk in self.chunks(path):
+            for line in chunk.decode("utf-8", "ignore").splitlines():
+                yield line
+
+
+_MATCHERS = {}
+
+
+def get_matcher(patterns):
+    """
+    Returns a cached :class:`LiteralMatcher` for the set of byte string
+    patterns.
+    """
+    key = frozenset(patterns)
+    matcher = _MATCHERS.get(key)
+    if matcher is None:
+        matcher = _MATCHERS[key] = LiteralMatcher(key)
+    return matcher
+
+
+def get_filter_matcher(filters):
+    """
+    Returns the cached :class:`LiteralMatcher` for a collection of filter
+    strings, or for filter strings already joined with newlines, as
+    ``grep -F`` would receive them.
+    """
+    if not isinstance(filters, six.string_types):
+        filters = "\n".join(filters)
+    return get_matcher(_encode(filters).split(b"\n"))
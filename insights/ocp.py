@@ -3,12 +3,25 @@ Top level OpenShift 4 component
 ===============================
 The :py:func:`conf` component recognizes insights-operator and must-gather
 archives.
+
+Archives hold tens of thousands of YAML documents, so :py:func:`analyze` can
+parse files with a ``concurrent.futures`` pool, reuse the documents parsed
+from identical files in earlier runs through a
+:py:class:`insights.core.parse_cache.ParseCache`, and skip files that can't
+hold the resource kinds or namespaces of interest.
 """
+import hashlib
 import logging
+import multiprocessing
 import os
+import re
+import sys
 import yaml
 
+from contextlib import contextmanager
 from fnmatch import fnmatch
+from functools import partial
+from itertools import islice
 from insights.core.plugins import component, datasource
 from insights.core.context import InsightsOperatorContext, MustGatherContext
 
@@ -34,39 +47,154 @@ def _get_files(path):
             yield os.path.join(root, name)
 
 
+def _has_files(path, count):
+    """
+    Returns True if there are at least count files beneath path, walking no
+    more of the tree than it takes to find them.
+    """
+    return sum(1 for _ in islice(_get_files(path), count)) == count
+
+
 def _load(path):
     with open(path) as f:
         for doc in yaml.load_all(f, Loader=Loader):
             yield from_dict(doc, src=path)
 
 
-def _process(path, excludes=None):
+def _in_namespaces(path, namespaces):
+    """
+    Returns False if path is beneath a must-gather ``namespaces/<name>``
+    directory for a namespace not in namespaces.
+    """
+    parts = path.split(os.sep)
+    for i in range(len(parts) - 3, -1, -1):
+        if parts[i] == "namespaces":
+            return parts[i + 1] in namespaces
+    return True
+
+
+# matches both yaml and json spellings of "kind: Name"
+_kinds_regex = re.compile(b"\\bkind[\"']?[ \t]*:[ \t]*[\"']?([\\w.-]+)")
+
+POOL_MIN_FILES = 500
+"""
+The number of files an archive must hold before :py:func:`conf` parses it
+with a process pool. Starting the pool costs more than it saves for smaller
+archives.
+"""
+
+
+def _mentions(content, kinds):
+    return any(m.group(1) in kinds for m in _kinds_regex.finditer(content))
+
+
+def _load_docs(path, cache=None, kinds=None):
+    """
+    Returns the documents in the YAML file at path as plain python objects,
+    or an empty list if the file can't be loaded or doesn't mention one of
+    kinds. Runs in the workers of the pool passed to :py:func:`analyze`.
+    """
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+        if kinds is not None and not _mentions(content, kinds):
+            return []
+
+        key = None
+        if cache is not None:
+            key = hashlib.sha256(b"ocp-yaml\0" + content).hexdigest()
+            docs = cache.get(key)
+            if docs is not None:
+                return docs
+
+        docs = [d for d in yaml.load_all(content, Loader=Loader) if d is not None]
+        if key is not None:
+            cache.put(key, docs)
+        return docs
+    except Exception:
+        log.debug("Failed to load %s; skipping.", path)
+        return []
+
+
+def _process(path, excludes=None, pool=None, cache=None, kinds=None, namespaces=None):
     excludes = excludes if excludes is not None else []
+    files = []
     for f in _get_files(path):
         if excludes and any(fnmatch(f, e) for e in excludes):
             continue
-        try:
-            for d in _load(f):
-                yield d
-        except Exception:
-            log.debug("Failed to load %s; skipping.", f)
+        if namespaces is not None and not _in_namespaces(os.path.relpath(f, path), namespaces):
+            continue
+        files.append(f)
+
+    load = partial(_load_docs, cache=cache, kinds=kinds)
+    loaded = pool.map(load, files, chunksize=16) if pool is not None else map(load, files)
+    for f, docs in zip(files, loaded):
+        for d in docs:
+            try:
+                yield from_dict(d, src=f)
+            except Exception:
+                log.debug("Failed to load a document from %s; skipping.", f)
 
 
-def analyze(paths, excludes=None):
+@contextmanager
+def process_pool(workers=None):
+    """
+    Yields a ``ProcessPoolExecutor`` to pass to :py:func:`analyze`, or None
+    when one can't be created, like inside a daemonic worker process.
+    Workers are started from a fork server where it's available, since the
+    caller may be running components in threads.
+    """
+    if multiprocessing.current_process().daemon:
+        yield None
+        return
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+    except ImportError:
+        yield None
+        return
+    kwargs = {}
+    # mp_context is new in python 3.7
+    if sys.version_info >= (3, 7) and "forkserver" in multiprocessing.get_all_start_methods():
+        kwargs["mp_context"] = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(workers, **kwargs) as pool:
+        yield pool
+
+
+def analyze(paths, excludes=None, pool=None, cache=None, kinds=None, namespaces=None):
+    """
+    Loads the YAML documents in the files, directories, and archives in
+    paths into a :py:class:`insights.parsr.query.Result` of trees.
+
+    Args:
+        paths (str or list): files, directories, or archives to load.
+        excludes (list): glob patterns of files to skip.
+        pool: a ``concurrent.futures`` executor that parses files. They're
+            parsed in the calling process if it's None.
+        cache (ParseCache): reuses the documents parsed from files with the
+            same content in an earlier run.
+        kinds (list): only load files mentioning at least one of these
+            resource kinds. Files hold many documents, so other kinds may
+            still be loaded.
+        namespaces (list): skip must-gather namespace directories not in
+            this list. Cluster scoped resources are always loaded.
+    """
     if not isinstance(paths, list):
         paths = [paths]
+    kinds = frozenset(k.encode("utf-8") for k in kinds) if kinds is not None else None
+    namespaces = set(namespaces) if namespaces is not None else None
+    options = dict(pool=pool, cache=cache, kinds=kinds, namespaces=namespaces)
 
     results = []
     for path in paths:
         if content_type.from_file(path) == "text/plain":
             results.extend(_load(path))
         elif os.path.isdir(path):
-            results.extend(_process(path, excludes))
+            results.extend(_process(path, excludes, **options))
         else:
             with extract(path) as ex:
-                results.extend(_process(ex.tmp_dir, excludes))
+                results.extend(_process(ex.tmp_dir, excludes, **options))
 
-    return Result(children=results)
+    return Result(children=results).enable_index()
 
 
 @datasource(contexts)
@@ -86,4 +214,7 @@ def conf(root):
 
     .. _tutorial: https://insights-core.readthedocs.io/en/latest/notebooks/Parsr%20Query%20Tutorial.html
     """
+    if _has_files(root, POOL_MIN_FILES):
+        with process_pool() as pool:
+            return analyze(root, excludes=["*.log"], pool=pool)
     return analyze(root, excludes=["*.log"])
@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 import argparse
 import logging
-from insights.ocp import analyze
+from insights.core.parse_cache import ParseCache
+from insights.ocp import analyze, process_pool
 
 
 log = logging.getLogger(__name__)
@@ -39,6 +40,10 @@ def parse_args():
     p.add_argument("archives", nargs="+", help="Archive or directory to analyze.")
     p.add_argument("-D", "--debug", help="Verbose debug output.", action="store_true")
     p.add_argument("--exclude", default="*.log", help="Glob patterns to exclude separated by commas")
+    p.add_argument("--kinds", help="Only load files mentioning these resource kinds, separated by commas")
+    p.add_argument("--namespaces", help="Only load these must-gather namespaces, separated by commas")
+    p.add_argument("--workers", type=int, help="Processes parsing files. Defaults to the CPU count.")
+    p.add_argument("--cache", help="Directory for reusing documents parsed in earlier runs.")
     return p.parse_args()
 
 
@@ -54,7 +59,12 @@ def main():
 
     excludes = parse_exclude(args.exclude) if args.exclude else ["*.log"]
 
-    conf = analyze(archives, excludes)  # noqa F841 / unused var
+    kinds = parse_exclude(args.kinds) if args.kinds else None
+    namespaces = parse_exclude(args.namespaces) if args.namespaces else None
+    cache = ParseCache(args.cache) if args.cache else None
+
+    with process_pool(args.workers) as pool:
+        conf = analyze(archives, excludes, pool=pool, cache=cache, kinds=kinds, namespaces=namespaces)  # noqa F841 / unused var
 
     # import all the built-in predicates
     from insights.parsr.query import (lt, le, eq, gt, ge, isin, contains,  # noqa: F403
@@ -17,7 +17,7 @@ from insights.core import ConfigParser
 from insights.specs import Specs
 from .. import SysconfigOptions, parser
 
-from insights.parsr import (EOF, Forward, InSet, LeftCurly, Lift, LineEnd,
+from insights.parsr import (compile as compile_grammar, EOF, Forward, InSet, LeftCurly, Lift, LineEnd,
         Literal, RightCurly, Many, Number, OneLineComment, PosMarker,
         skip_none, String, QuotedString, WS, WSChar)
 from insights.parsr.query import Directive, Entry, Section
@@ -85,7 +85,7 @@ def parse_doc(f, ctx=None, line_end="\n"):
     Stanza = (Lift(to_entry) * Name * (Block | (Sep >> Value))) | Comment
     Stmt <= WS >> Stanza << WS
     Doc = Many(Stmt).map(skip_none)
-    Top = Doc + EOF
+    Top = compile_grammar(Doc + EOF)
 
     return Entry(children=Top(f)[0], src=ctx)
 
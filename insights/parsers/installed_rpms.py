@@ -77,7 +77,7 @@ import warnings
 
 from ..util import rsplit
 from .. import parser, get_active_lines, CommandParser
-from .rpm_vercmp import rpm_version_compare
+from .rpm_vercmp import rpm_version_key
 from insights.specs import Specs
 
 # This list of architectures is taken from PDC (Product Definition Center):
@@ -182,7 +182,7 @@ class RpmList(object):
         if package_name not in self.packages:
             return None
         else:
-            return max(self.packages[package_name])
+            return self._bounds(package_name)[1]
 
     def get_min(self, package_name):
         """
@@ -197,7 +197,20 @@ class RpmList(object):
         if package_name not in self.packages:
             return None
         else:
-            return min(self.packages[package_name])
+            return self._bounds(package_name)[0]
+
+    def _bounds(self, package_name):
+        """
+        Returns the lowest and highest versions of the installed package with
+        the given name. They're found once per name and reused until the list
+        of packages with that name is replaced or changes length.
+        """
+        pkgs = self.packages[package_name]
+        cache = self.__dict__.setdefault("_bounds_cache", {})
+        cached = cache.get(package_name)
+        if cached is None or cached[0] is not pkgs or cached[1] != len(pkgs):
+            cached = cache[package_name] = (pkgs, len(pkgs), min(pkgs), max(pkgs))
+        return cached[2:]
 
     @property
     def is_hypervisor(self):
@@ -583,24 +596,38 @@ class InstalledRpm(object):
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if not isinstance(other, InstalledRpm):
-            return False
-
+    @property
+    def version_key(self):
+        """
+        tuple: The epoch, version, and release as a key that sorts like
+        rpm compares them. It's computed once and recomputed only if one of
+        them changes.
+        """
+        evr = (self.epoch, self.version, self.release)
+        cached = self.__dict__.get("_version_key")
+        if cached is None or cached[0] != evr:
+            key = (int(self.epoch), rpm_version_key(self.version), rpm_version_key(self.release))
+            cached = self._version_key = (evr, key)
+        return cached[1]
+
+    def _check_name(self, other):
         if self.name != other.name:
             raise ValueError('Cannot compare packages with differing names {0} != {1}'
                              .format(self.name, other.name))
 
-        return rpm_version_compare(self, other) == 0
-
-    def __lt__(self, other):
+    def __eq__(self, other):
         if not isinstance(other, InstalledRpm):
             return False
 
-        if self == other:
+        self._check_name(other)
+        return self.version_key == other.version_key
+
+    def __lt__(self, other):
+        if not isinstance(other, InstalledRpm):
             return False
 
-        return rpm_version_compare(self, other) < 0
+        self._check_name(other)
+        return self.version_key < other.version_key
 
     def __ne__(self, other):
         return not self == other
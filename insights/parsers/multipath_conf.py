@@ -19,7 +19,7 @@ from insights.contrib import pyparsing as p
 from insights import parser, Parser, LegacyItemAccess
 from insights.core import ConfigParser
 from insights.parsers import SkipException
-from insights.parsr import (EOF, Forward, LeftCurly, Lift, Literal, LineEnd,
+from insights.parsr import (compile as compile_grammar, EOF, Forward, LeftCurly, Lift, Literal, LineEnd,
         RightCurly, Many, Number, OneLineComment, PosMarker, skip_none, String,
         QuotedString, WS, WSChar)
 from insights.parsr.query import Entry
@@ -197,7 +197,7 @@ def parse_doc(content, ctx):
     Stanza = (Lift(to_entry) * Name * (Block | Value)) | Comment
     Stmt <= WS >> Stanza << WS
     Doc = Many(Stmt).map(skip_none)
-    Top = Doc + EOF
+    Top = compile_grammar(Doc + EOF)
 
     return Entry(children=Top(content)[0])
 
@@ -8,9 +8,19 @@ and non-ascii characters.
 https://raw.githubusercontent.com/rpm-software-management/rpm/master/tests/rpmvercmp.at
 """
 
+import re
+
 from collections import deque
 from itertools import takewhile
 
+_segments = re.compile(r"[~^]|[0-9]+|[a-zA-Z]+")
+
+# Where each kind of segment sorts when compared with one of another kind at
+# the same position: tilde before the end of the string, the end before a
+# caret, and carets before alpha segments, which are older than numbers.
+_TILDE, _END, _CARET, _ALPHA, _NUM = range(5)
+_END_KEY = (_END, 0)
+
 
 def _rpm_vercmp(a, b):
     if a == b:
@@ -122,6 +132,31 @@ def _rpm_vercmp(a, b):
     return 1
 
 
+def rpm_version_key(s):
+    """
+    Returns a tuple that sorts like ``s`` does under :func:`_rpm_vercmp`, so
+    comparing the keys of two version or release strings gives the same
+    answer as comparing the strings, without walking them again.
+
+    Each alpha or numeric segment, tilde, and caret becomes a pair of its
+    kind and value, and a marker for the end of the string is appended.
+    Everything else is a separator and only splits segments, as in rpm.
+    """
+    key = []
+    for seg in _segments.findall(s):
+        c = seg[0]
+        if c == "~":
+            key.append((_TILDE, 0))
+        elif c == "^":
+            key.append((_CARET, 0))
+        elif c.isdigit():
+            key.append((_NUM, int(seg)))
+        else:
+            key.append((_ALPHA, seg))
+    key.append(_END_KEY)
+    return tuple(key)
+
+
 def rpm_version_compare(left, right):
     if left is right:
         return 0
@@ -252,6 +252,19 @@ def test_max_min():
     assert rpms.get_max('yum').package == 'yum-3.4.3-132.el7'
 
 
+def test_max_min_cached():
+    rpms = InstalledRpms(context_wrap(RPMS_MULTIPLE_KERNEL))
+    assert rpms.newest('kernel') is rpms.newest('kernel')
+    rpms.packages['kernel'].append(InstalledRpm.from_package('kernel-3.10.0-514.el7'))
+    assert rpms.newest('kernel').package == 'kernel-3.10.0-514.el7'
+    assert rpms.oldest('kernel').package == 'kernel-3.10.0-327.el7'
+
+    rpm = rpms.newest('kernel')
+    rpm.epoch = '1'
+    assert rpm.version_key[0] == 1
+    assert rpm > InstalledRpm.from_package('kernel-4.18.0-80.el8')
+
+
 def test_max_min_not_found():
     rpms = InstalledRpms(context_wrap(RPMS_MULTIPLE_KERNEL))
     assert rpms.get_min('abc') is None
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import pytest
-from insights.parsers.rpm_vercmp import _rpm_vercmp
+from insights.parsers.rpm_vercmp import _rpm_vercmp, rpm_version_key
 
 
 # data copied from
@@ -174,3 +174,10 @@ def test_rpm_vercmp(rpm_data):
     for l, r, expected in rpm_data:
         actual = _rpm_vercmp(l, r)
         assert actual == expected, (l, r, actual, expected)
+
+
+def test_rpm_version_key(rpm_data):
+    for l, r, expected in rpm_data:
+        kl, kr = rpm_version_key(l), rpm_version_key(r)
+        actual = (kl > kr) - (kl < kr)
+        assert actual == expected, (l, r, actual, expected)
@@ -43,14 +43,31 @@ Here's an example that evaluates arithmetic expressions.
         expr <= (term + Many(InSet("+-") + term)).map(op)
 
         evaluate = expr << EOF
+
+Parsers that can be tried many times at the same position, like alternatives
+sharing a prefix, can be evaluated in packrat mode by calling the parser with
+``packrat=True``. Each result is then remembered by parser and position for the
+rest of the call so it's computed only once. Memory is bounded by keeping only
+the most recent results, ``packrat`` may be the number to keep instead of
+``True``.
+
+Packrat mode assumes mapped functions don't modify the values they're given,
+since a remembered value is handed out every time its parser is tried at the
+same position again. Parsers that read or change the indent or tag stacks of
+the :py:class:`Context` set ``context_sensitive`` and are always evaluated,
+along with any parser that contains them. Failures inside a remembered result
+aren't reported again, so errors in packrat mode can list fewer alternatives.
 """
 from __future__ import print_function
 import functools
 import logging
 import os
+import re
+import six
 import string
 import traceback
 from bisect import bisect_left
+from collections import OrderedDict
 from six import StringIO, with_metaclass
 
 log = logging.getLogger(__name__)
@@ -121,6 +138,17 @@ def _debug_hook(func):
         if ctx.function_error is not None:
             # no point in continuing...
             raise Exception()
+        memo = ctx.memo
+        key = None
+        if memo is not None and self in memo.parsers:
+            # inner is part of the key since a process calling its super
+            # class's process reenters the hook for the same parser.
+            key = (self, pos, inner)
+            res = memo.results.get(key)
+            if res is _FAILED:
+                raise Exception()
+            if res is not None:
+                return res
         ctx.parser_stack.append(self)
         if self._debug:
             line = ctx.line(pos) + 1
@@ -130,8 +158,12 @@ def _debug_hook(func):
             res = func(self, pos, data, ctx)
             if self._debug:
                 log.debug("Result: {0}".format(res[1]))
+            if key is not None:
+                memo.add(key, res)
             return res
         except:
+            if key is not None:
+                memo.add(key, _FAILED)
             if self._debug:
                 ps = "-> ".join([str(p) for p in ctx.parser_stack])
                 log.debug("Failed: {0}".format(ps))
@@ -141,6 +173,76 @@ def _debug_hook(func):
     return inner
 
 
+_FAILED = object()
+
+
+class _Memo(object):
+    """
+    Remembers the results of parsers at positions during a packrat call. Only
+    the most recent size results are kept. parsers is the set of parsers whose
+    results can be remembered.
+    """
+    def __init__(self, parsers, size):
+        self.parsers = parsers
+        self.size = size
+        self.results = OrderedDict()
+
+    def add(self, key, res):
+        results = self.results
+        results[key] = res
+        if len(results) > self.size:
+            results.popitem(last=False)
+
+
+def _memoizable(root):
+    """
+    Returns the parsers reachable from root that have children and don't
+    contain a context sensitive parser.
+    """
+    nodes = []
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node not in seen:
+            seen.add(node)
+            nodes.append(node)
+            stack.extend(node.children)
+
+    sensitive = set(n for n in nodes if n.context_sensitive)
+    changed = True
+    while changed:
+        changed = False
+        for n in nodes:
+            if n not in sensitive and any(c in sensitive for c in n.children):
+                sensitive.add(n)
+                changed = True
+    return set(n for n in nodes if n.children and n not in sensitive)
+
+
+def _char_class(chars):
+    """
+    Returns the body of a regular expression character class matching the
+    single characters in chars. Anything else can never equal one character of
+    input, so it's left out.
+    """
+    chars = sorted(c for c in chars if isinstance(c, six.string_types) and len(c) == 1)
+    return "".join(re.escape(c) for c in chars)
+
+
+def _record_failure(ctx, parser, pos, msg=None):
+    """
+    Records the error parser would have set at pos if it had been called
+    there. Used by the fast paths that match runs of characters with regular
+    expressions instead of calling a parser once per character. The message
+    defaults to the one :py:class:`InSet` uses.
+    """
+    if pos >= ctx.pos:
+        ctx.parser_stack.append(parser)
+        ctx.set(pos, msg or "Expected {0}.".format(parser))
+        ctx.parser_stack.pop()
+
+
 class Backtrack(Exception):
     """
     Mapped or Lifted functions should Backtrack if they want to fail without
@@ -162,10 +264,11 @@ class Context(object):
         self.indents = []
         self.tags = []
         self.src = src
-        self.lines = [i for i, x in enumerate(lines) if x == "\n"]
+        self.lines = [m.start() for m in re.finditer("\n", lines)]
         self.parser_stack = []
         self.errors = []
         self.function_error = None
+        self.memo = None
 
     def set(self, pos, msg):
         """
@@ -207,7 +310,16 @@ class _ParserMeta(type):
 class Parser(with_metaclass(_ParserMeta, Node)):
     """
     Parser is the common base class of all Parsers.
+
+    ``process`` is given the input string, the position to start at, and the
+    :py:class:`Context`. The end of input is at ``len(data)``.
+    """
+    context_sensitive = False
     """
+    Set by parsers whose results depend on more than the input and position,
+    like those using the indent or tag stacks. They're never memoized.
+    """
+
     def __init__(self):
         super(Parser, self).__init__()
         self.name = None
@@ -315,7 +427,7 @@ class Parser(with_metaclass(_ParserMeta, Node)):
     def process(self, pos, data, ctx):
         raise NotImplementedError()
 
-    def __call__(self, data, src=None, Ctx=Context):
+    def __call__(self, data, src=None, Ctx=Context, packrat=False):
         """
         Invoke the parser like a function on a regular string of characters.
 
@@ -323,10 +435,16 @@ class Parser(with_metaclass(_ParserMeta, Node)):
         the Context instance. You also can provide a Context subclass if your
         parsers have particular needs not covered by the default
         implementation that provides significant indent and tag stacks.
+
+        Set packrat to ``True`` or the number of results to keep to remember
+        the results of parsers by position for the duration of the call.
         """
-        data = list(data)
-        data.append(None)  # add a terminal so we don't overrun
+        if not isinstance(data, six.string_types):
+            data = "".join(data)
         ctx = Ctx(data, src=src)
+        if packrat:
+            size = 100000 if packrat is True else packrat
+            ctx.memo = _Memo(_memoizable(self), size)
 
         try:
             _, ret = self.process(0, data, ctx)
@@ -349,7 +467,7 @@ class Parser(with_metaclass(_ParserMeta, Node)):
         print(msg.format(lineno, colno, ctx.lines), file=err)
         for parsers, msg in ctx.errors:
             names = " -> ".join([p.name for p in parsers if p.name])
-            v = data[ctx.pos] or "EOF"
+            v = data[ctx.pos] if 0 <= ctx.pos < len(data) else "EOF"
             print(names, file=err)
             print("    {0} Got {1!r}.".format(msg, v), file=err)
         err.seek(0)
@@ -361,8 +479,8 @@ class Parser(with_metaclass(_ParserMeta, Node)):
 
 class AnyChar(Parser):
     def process(self, pos, data, ctx):
-        c = data[pos]
-        if c is not None:
+        c = data[pos:pos + 1]
+        if c:
             return (pos + 1, c)
         msg = "Expected any character."
         ctx.set(pos, msg)
@@ -385,7 +503,7 @@ class Char(Parser):
         self.char = char
 
     def process(self, pos, data, ctx):
-        if data[pos] == self.char:
+        if data[pos:pos + 1] == self.char:
             return (pos + 1, self.char)
         msg = "Expected {0}.".format(self.char)
         ctx.set(pos, msg)
@@ -416,14 +534,20 @@ class InSet(Parser):
         super(InSet, self).__init__()
         self.values = set(s)
         self.name = name
+        chars = _char_class(self.values)
+        # runs of characters in or out of the set for Many and Until
+        self._run = re.compile("[%s]*" % chars if chars else "")
+        self._until = re.compile("[^%s]*" % chars if chars else "(?s).*")
 
     def process(self, pos, data, ctx):
-        c = data[pos]
-        if c in self.values:
+        c = data[pos:pos + 1]
+        if c and c in self.values:
             return (pos + 1, c)
-        msg = "Expected {0}.".format(self)
-        ctx.set(pos, msg)
-        raise Exception(msg)
+        # errors are only kept for the farthest position, so don't render
+        # the set for ones that would be dropped.
+        if pos >= ctx.pos:
+            ctx.set(pos, "Expected {0}.".format(self))
+        raise Exception()
 
     def __repr__(self):
         if self.name is None:
@@ -452,25 +576,27 @@ class String(Parser):
         self.echars = set(echars) if echars else set()
         self.min_length = min_length
 
+        # an escape takes precedence over a backslash in chars.
+        chars = _char_class(self.chars)
+        echars = _char_class(self.echars)
+        alts = []
+        if echars:
+            alts.append(r"\\[%s]" % echars)
+        if chars:
+            alts.append("[%s]" % chars)
+        self._regex = re.compile("(?:%s)*" % "|".join(alts) if alts else "")
+        self._escape = re.compile(r"\\([%s])" % echars) if echars else None
+
     def process(self, pos, data, ctx):
-        results = []
-        p = data[pos]
-        old = pos
-        while p in self.chars or p == "\\":
-            if p == "\\" and data[pos + 1] in self.echars:
-                results.append(data[pos + 1])
-                pos += 2
-            elif p in self.chars:
-                results.append(p)
-                pos += 1
-            else:
-                break
-            p = data[pos]
-        if len(results) < self.min_length:
-            msg = "Expected {0} of {1}.".format(self.min_length, sorted(self.chars))
-            ctx.set(old, msg)
-            raise Exception(msg)
-        return pos, "".join(results)
+        m = self._regex.match(data, pos)
+        result = m.group()
+        if self._escape is not None and "\\" in result:
+            result = self._escape.sub(r"\1", result)
+        if len(result) < self.min_length:
+            if pos >= ctx.pos:
+                ctx.set(pos, "Expected {0} of {1}.".format(self.min_length, sorted(self.chars)))
+            raise Exception()
+        return m.end(), result
 
 
 class Literal(Parser):
@@ -517,27 +643,18 @@ class Literal(Parser):
         self.name = "Literal{0!r}".format(self.chars)
 
     def process(self, pos, data, ctx):
-        old = pos
+        end = pos + len(self.chars)
         if not self.ignore_case:
-            for c in self.chars:
-                if data[pos] == c:
-                    pos += 1
-                else:
-                    msg = "Expected {0!r}.".format(self.chars)
-                    ctx.set(old, msg)
-                    raise Exception(msg)
-            return pos, (self.chars if self.value is self._NULL else self.value)
+            if data.startswith(self.chars, pos):
+                return end, (self.chars if self.value is self._NULL else self.value)
+            msg = "Expected {0!r}.".format(self.chars)
         else:
-            result = []
-            for c in self.chars:
-                if data[pos].lower() == c:
-                    result.append(data[pos])
-                    pos += 1
-                else:
-                    msg = "Expected case insensitive {0!r}.".format(self.chars)
-                    ctx.set(old, msg)
-                    raise Exception(msg)
-            return pos, ("".join(result) if self.value is self._NULL else self.value)
+            result = data[pos:end]
+            if result.lower() == self.chars:
+                return end, (result if self.value is self._NULL else self.value)
+            msg = "Expected case insensitive {0!r}.".format(self.chars)
+        ctx.set(pos, msg)
+        raise Exception(msg)
 
 
 class Wrapper(Parser):
@@ -706,14 +823,21 @@ class Many(Parser):
 
     def process(self, pos, data, ctx):
         orig = pos
-        results = []
         p = self.children[0]
-        while True:
-            try:
-                pos, res = p.process(pos, data, ctx)
-                results.append(res)
-            except Exception:
-                break
+        if type(p) is InSet and not p._debug:
+            # match the whole run at once and record the failure that ends it
+            m = p._run.match(data, pos)
+            pos = m.end()
+            results = list(m.group())
+            _record_failure(ctx, p, pos)
+        else:
+            results = []
+            while True:
+                try:
+                    pos, res = p.process(pos, data, ctx)
+                    results.append(res)
+                except Exception:
+                    break
         if len(results) < self.lower:
             child = self.children[0]
             msg = "Expected at least {0} of {1}.".format(self.lower, child)
@@ -757,6 +881,18 @@ class Until(Parser):
 
     def process(self, pos, data, ctx):
         parser, pred = self.children
+        if parser is AnyChar and type(pred) is InSet and not (parser._debug or pred._debug):
+            # everything up to the first character in the set, with the
+            # failures the predicate and AnyChar would have recorded.
+            m = pred._until.match(data, pos)
+            end = m.end()
+            if end > pos:
+                _record_failure(ctx, pred, end - 1)
+            if end == len(data):
+                _record_failure(ctx, pred, end)
+                _record_failure(ctx, parser, end, "Expected any character.")
+            return end, list(m.group())
+
         results = []
         while True:
             try:
@@ -1051,7 +1187,7 @@ class EOF(Parser):
 
     """
     def process(self, pos, data, ctx):
-        if data[pos] is None:
+        if pos >= len(data):
             return pos, None
         msg = "Expected end of input."
         ctx.set(pos, msg)
@@ -1118,6 +1254,8 @@ class WithIndent(Wrapper):
             KVPair = WithIndent(Key + Opt(Sep >> Value))
 
     """
+    context_sensitive = True
+
     def process(self, pos, data, ctx):
         new, _ = WS.process(pos, data, ctx)
         try:
@@ -1139,6 +1277,8 @@ class HangingString(Parser):
             KVPair = WithIndent(Key + Opt(Sep >> Value))
 
     """
+    context_sensitive = True
+
     def __init__(self, chars, echars=None, min_length=1):
         super(HangingString, self).__init__()
         p = String(chars, echars=echars, min_length=min_length)
@@ -1169,6 +1309,8 @@ class StartTagName(Wrapper):
     etc. The tag result is captured and put onto a tag stack in the
     :py:class:`Context` object.
     """
+    context_sensitive = True
+
     def process(self, pos, data, ctx):
         pos, res = self.children[0].process(pos, data, ctx)
         ctx.tags.append(res)
@@ -1182,6 +1324,8 @@ class EndTagName(Wrapper):
     :py:class:`Context` object. The tags must match for the parse to be
     successful.
     """
+    context_sensitive = True
+
     def __init__(self, parser, ignore_case=False):
         super(EndTagName, self).__init__(parser)
         self.ignore_case = ignore_case
@@ -1240,3 +1384,5 @@ Number = (Lift(_make_number) * Opt(Char("-"), "") * Digits * Opt(Char(".") + Dig
 SingleQuotedString = Char("'") >> String(set(string.printable) - set("'"), "'") << Char("'")
 DoubleQuotedString = Char('"') >> String(set(string.printable) - set('"'), '"') << Char('"')
 QuotedString = Wrapper(DoubleQuotedString | SingleQuotedString) % "quoted string"
+
+from insights.parsr.compiler import CompiledParser, compile  # noqa: E402,F401
@@ -0,0 +1,370 @@
+"""
+compile turns a parsr grammar into Python functions specialized for it, so
+parsing doesn't dispatch through ``process`` and its debug hook for every
+parser at every position. Sequences, character tests, and runs of characters
+are generated inline, and :py:class:`insights.parsr.Many` and
+:py:class:`insights.parsr.Until` become loops.
+
+    .. code-block:: python
+
+        from insights.parsr import compile as compile_grammar
+
+        Top = compile_grammar(Doc + EOF)
+        result = Top(content)
+
+A compiled grammar returns the same values as the grammar itself. If it fails,
+the grammar is run again to raise its usual error message. Parsers of unknown
+types and parsers with debug enabled are called through ``process`` as usual.
+
+Generated code is cached by its source, and the source only depends on the
+shape of the grammar. Grammars rebuilt for every document, for example to
+close over the document's context in mapped functions, reuse the code compiled
+for the first one.
+"""
+import six
+from six.moves import builtins
+
+from insights.parsr import (AnyChar, Backtrack, Choice, Char, Context,
+                            EnclosedComment, EndTagName, EOF, FollowedBy,
+                            Forward, HangingString, InSet, KeepLeft, KeepRight,
+                            Lift, Literal, Many, Map, Mark, NotFollowedBy,
+                            OneLineComment, Opt, PosMarker, Sequence,
+                            StartTagName, String, Until, WithIndent, Wrapper,
+                            WS)
+
+_cache = {}
+_CACHE_SIZE = 128
+
+# parsers that only delegate to their child
+_TRANSPARENT = (Forward, Wrapper, EnclosedComment, OneLineComment)
+
+
+class CompiledParser(object):
+    """
+    A grammar compiled by :py:func:`compile`. Call it like the grammar.
+    """
+    def __init__(self, grammar, parse, source):
+        self.grammar = grammar
+        self.source = source
+        self._parse = parse
+
+    def __call__(self, data, src=None, Ctx=Context):
+        if not isinstance(data, six.string_types):
+            data = "".join(data)
+        try:
+            res = self._parse(data, Ctx(data, src=src))
+        except Exception:
+            res = None
+        if res is not None:
+            return res[1]
+        # let the grammar report what went wrong
+        return self.grammar(data, src=src, Ctx=Ctx)
+
+    def __repr__(self):
+        return "compile({0})".format(self.grammar)
+
+
+class _Compiler(object):
+    """
+    Generates a function for each parser reachable from a grammar. Every
+    function takes a position and returns the new position and value or None
+    if its parser doesn't match. Code for parsers that can be inlined is
+    emitted into the functions of their parents and never changes ``pos`` when
+    it fails.
+    """
+    def __init__(self):
+        self.consts = []
+        self.names = {}
+        self.queue = []
+
+    def const(self, value):
+        name = "k%d" % len(self.consts)
+        self.consts.append(value)
+        return name
+
+    def resolve(self, node):
+        seen = set()
+        while type(node) in _TRANSPARENT and node.children and not node._debug and node not in seen:
+            seen.add(node)
+            node = node.children[0]
+        return node
+
+    def ref(self, node):
+        node = self.resolve(node)
+        name = self.names.get(node)
+        if name is None:
+            name = self.names[node] = "p%d" % len(self.names)
+            self.queue.append((node, name))
+        return name
+
+    def inline(self, node, res, fail):
+        """
+        Returns lines matching node at ``pos`` that store its value in res or
+        run the fail statement, or None if node can't be inlined.
+        """
+        if node._debug:
+            return None
+        kind = type(node)
+        if kind is Char:
+            c = self.const(node.char)
+            if len(node.char) != 1:
+                return [fail]
+            return ["if not startswith(%s, pos): %s" % (c, fail),
+                    "%s = %s" % (res, c),
+                    "pos += 1"]
+        if kind is InSet:
+            values = self.const(node.values)
+            return ["%s = data[pos:pos + 1]" % res,
+                    "if not %s or %s not in %s: %s" % (res, res, values, fail),
+                    "pos += 1"]
+        if kind is String:
+            lines = ["m = %s(data, pos)" % self.const(node._regex.match),
+                     "%s = m.group()" % res]
+            if node._escape is not None:
+                sub = self.const(node._escape.sub)
+                lines.append('if "\\\\" in %s: %s = %s(r"\\1", %s)' % (res, res, sub, res))
+            if node.min_length:
+                lines.append("if len(%s) < %d: %s" % (res, node.min_length, fail))
+            lines.append("pos = m.end()")
+            return lines
+        if kind is Literal:
+            c = self.const(node.chars)
+            size = len(node.chars)
+            if not node.ignore_case:
+                value = c if node.value is Literal._NULL else self.const(node.value)
+                return ["if not startswith(%s, pos): %s" % (c, fail),
+                        "%s = %s" % (res, value),
+                        "pos += %d" % size]
+            lines = ["%s = data[pos:pos + %d]" % (res, size),
+                     "if %s.lower() != %s: %s" % (res, c, fail),
+                     "pos += %d" % size]
+            if node.value is not Literal._NULL:
+                lines.append("%s = %s" % (res, self.const(node.value)))
+            return lines
+        if kind is type(AnyChar):
+            return ["%s = data[pos:pos + 1]" % res,
+                    "if not %s: %s" % (res, fail),
+                    "pos += 1"]
+        if kind is type(EOF):
+            return ["if pos < n: %s" % fail,
+                    "%s = None" % res]
+        if kind is Many:
+            child = self.resolve(node.children[0])
+            if type(child) is InSet and not child._debug:
+                lines = ["m = %s(data, pos)" % self.const(child._run.match),
+                         "%s = list(m.group())" % res]
+                if node.lower:
+                    lines.append("if len(%s) < %d: %s" % (res, node.lower, fail))
+                lines.append("pos = m.end()")
+                return lines
+        if kind is Until:
+            parser, pred = [self.resolve(c) for c in node.children]
+            if parser is AnyChar and type(pred) is InSet and not (parser._debug or pred._debug):
+                return ["m = %s(data, pos)" % self.const(pred._until.match),
+                        "%s = list(m.group())" % res,
+                        "pos = m.end()"]
+        return None
+
+    def match(self, node, res, fail):
+        node = self.resolve(node)
+        lines = self.inline(node, res, fail)
+        if lines is not None:
+            return lines
+        return ["r = %s(pos)" % self.ref(node),
+                "if r is None: %s" % fail,
+                "pos, %s = r" % res]
+
+    def body(self, node):
+        lines = self.inline(node, "v", "return None")
+        if lines is not None:
+            return lines + ["return pos, v"]
+
+        kind = type(node)
+        children = node.children
+        if node._debug or kind not in _BODIES:
+            return ["try:",
+                    "    return %s.process(pos, data, ctx)" % self.const(node),
+                    "except Exception:",
+                    "    if ctx.function_error is not None:",
+                    "        raise",
+                    "    return None"]
+        if kind in _TRANSPARENT:
+            # a Forward that was never defined
+            return ["return None"]
+        return _BODIES[kind](self, node, children)
+
+    def sequence(self, node, children):
+        lines = []
+        for i, c in enumerate(children):
+            lines.extend(self.match(c, "v%d" % i, "return None"))
+        return lines + ["return pos, [%s]" % ", ".join("v%d" % i for i in range(len(children)))]
+
+    def choice(self, node, children):
+        lines = []
+        for c in children:
+            c = self.resolve(c)
+            inline = self.inline(c, "v", "break")
+            if inline is None:
+                lines.extend(["r = %s(pos)" % self.ref(c),
+                              "if r is not None: return r"])
+            else:
+                lines.append("while 1:")
+                lines.extend("    " + l for l in inline)
+                lines.append("    return pos, v")
+        return lines + ["return None"]
+
+    def many(self, node, children):
+        lines = ["results = []", "while 1:"]
+        lines.extend("    " + l for l in self.match(children[0], "v", "break"))
+        lines.append("    results.append(v)")
+        if node.lower:
+            lines.append("if len(results) < %d: return None" % node.lower)
+        return lines + ["return pos, results"]
+
+    def until(self, node, children):
+        parser, pred = children
+        lines = ["results = []", "while %s(pos) is None:" % self.ref(pred)]
+        lines.extend("    " + l for l in self.match(parser, "v", "break"))
+        return lines + ["    results.append(v)", "return pos, results"]
+
+    def followed_by(self, node, children):
+        left, right = children
+        test = "is" if type(node) is FollowedBy else "is not"
+        return self.match(left, "v", "return None") + [
+            "if %s(pos) %s None: return None" % (self.ref(right), test),
+            "return pos, v"]
+
+    def keep_left(self, node, children):
+        left, right = children
+        lines = self.match(left, "v", "return None")
+        lines.extend(self.match(right, "w", "return None"))
+        return lines + ["return pos, v"]
+
+    def keep_right(self, node, children):
+        left, right = children
+        lines = self.match(left, "w", "return None")
+        lines.extend(self.match(right, "v", "return None"))
+        return lines + ["return pos, v"]
+
+    def opt(self, node, children):
+        lines = ["while 1:"]
+        lines.extend("    " + l for l in self.match(children[0], "v", "break"))
+        return lines + ["    return pos, v", "return pos, %s" % self.const(node.default)]
+
+    def map(self, node, children):
+        return self.match(children[0], "v", "return None") + [
+            "try:",
+            "    v = %s(v)" % self.const(node.func),
+            "except Backtrack:",
+            "    return None",
+            "return pos, v"]
+
+    def lift(self, node, children):
+        lines = []
+        for i, c in enumerate(children):
+            lines.extend(self.match(c, "v%d" % i, "return None"))
+        args = ", ".join("v%d" % i for i in range(len(children)))
+        return lines + [
+            "try:",
+            "    v = %s(%s)" % (self.const(node.func), args),
+            "except Backtrack:",
+            "    return None",
+            "return pos, v"]
+
+    def pos_marker(self, node, children):
+        return ["start = pos"] + self.match(children[0], "v", "return None") + [
+            "return pos, Mark(line(start) + 1, col(start) + 1, v)"]
+
+    def with_indent(self, node, children):
+        lines = ["pos = %s(data, pos).end()" % self.const(WS.children[0]._run.match),
+                 "indents.append(col(pos))",
+                 "try:"]
+        lines.extend("    " + l for l in self.match(children[0], "v", "return None"))
+        return lines + ["    return pos, v", "finally:", "    indents.pop()"]
+
+    def hanging_string(self, node, children):
+        lines = ["old = pos",
+                 "results = []",
+                 "while 1:",
+                 "    if not indents: break",
+                 "    if col(pos) <= indents[-1]:",
+                 "        pos = old",
+                 "        break"]
+        lines.extend("    " + l for l in self.match(children[0], "v", "break"))
+        return lines + [
+            "    results.append(v.rstrip(%s))" % self.const(" \\"),
+            "    old = pos",
+            "    pos = %s(data, pos).end()" % self.const(WS.children[0]._run.match),
+            'return pos, " ".join(results)']
+
+    def start_tag(self, node, children):
+        return self.match(children[0], "v", "return None") + [
+            "tags.append(v)",
+            "return pos, v"]
+
+    def end_tag(self, node, children):
+        lower = ".lower()" if node.ignore_case else ""
+        return self.match(children[0], "v", "return None") + [
+            "if not tags: return None",
+            "expect = tags.pop()",
+            "if v%s != expect%s: return None" % (lower, lower),
+            "return pos, v"]
+
+    def generate(self, grammar):
+        root = self.ref(grammar)
+        funcs = []
+        while self.queue:
+            node, name = self.queue.pop(0)
+            funcs.append("        def %s(pos):" % name)
+            funcs.extend("            " + l for l in self.body(node))
+        lines = ["def make(k, Backtrack, Mark):"]
+        lines.extend("    k%d = k[%d]" % (i, i) for i in range(len(self.consts)))
+        lines.extend([
+            "    def parse(data, ctx):",
+            "        n = len(data)",
+            "        startswith = data.startswith",
+            "        line = ctx.line",
+            "        col = ctx.col",
+            "        indents = ctx.indents",
+            "        tags = ctx.tags"])
+        lines.extend(funcs)
+        lines.extend(["        return %s(0)" % root, "    return parse"])
+        return "\n".join(lines) + "\n"
+
+
+_BODIES = {
+    Sequence: _Compiler.sequence,
+    Choice: _Compiler.choice,
+    Many: _Compiler.many,
+    Until: _Compiler.until,
+    FollowedBy: _Compiler.followed_by,
+    NotFollowedBy: _Compiler.followed_by,
+    KeepLeft: _Compiler.keep_left,
+    KeepRight: _Compiler.keep_right,
+    Opt: _Compiler.opt,
+    Map: _Compiler.map,
+    Lift: _Compiler.lift,
+    PosMarker: _Compiler.pos_marker,
+    WithIndent: _Compiler.with_indent,
+    HangingString: _Compiler.hanging_string,
+    StartTagName: _Compiler.start_tag,
+    EndTagName: _Compiler.end_tag,
+}
+for t in _TRANSPARENT:
+    _BODIES[t] = None
+
+
+def compile(grammar):
+    """
+    Returns a :py:class:`CompiledParser` for grammar.
+    """
+    compiler = _Compiler()
+    source = compiler.generate(grammar)
+    make = _cache.get(source)
+    if make is None:
+        if len(_cache) >= _CACHE_SIZE:
+            _cache.clear()
+        namespace = {}
+        six.exec_(builtins.compile(source, "<parsr.compile>", "exec"), namespace)
+        make = _cache[source] = namespace["make"]
+    return CompiledParser(grammar, make(compiler.consts, Backtrack, Mark), source)
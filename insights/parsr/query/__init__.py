@@ -19,6 +19,11 @@ attributes and substructure. This module doesn't cover that case.
 queries. This allows their instances to be accessed like simple dictionaries,
 but the key passed to ``[]`` is converted to a query of immediate child
 instances instead of a simple lookup.
+
+Deep queries like :py:meth:`Entry.find` normally walk every node beneath an
+entry. Calling :py:meth:`Entry.enable_index` on an entry that's queried many
+times lets deep queries whose first element is a plain name look up their
+candidates in an index of the entry's descendants by name instead.
 """
 import operator
 import re
@@ -80,7 +85,7 @@ class Entry(object):
     Entry is the base class for the data model, which is a tree of Entry
     instances. Each instance has a name, attributes, a parent, and children.
     """
-    __slots__ = ("_name", "attrs", "children", "parent", "lineno", "src")
+    __slots__ = ("_name", "attrs", "children", "parent", "lineno", "src", "_index")
 
     def __init__(self, name=None, attrs=None, children=None, lineno=None, src=None, set_parents=True):
         if type(name) is str:
@@ -95,6 +100,7 @@ class Entry(object):
         self.parent = None
         self.lineno = lineno
         self.src = src  # insights.core.Parser instance
+        self._index = None
         if set_parents:
             for c in self.children:
                 c.parent = self
@@ -245,6 +251,36 @@ class Entry(object):
         """
         return list(chain.from_iterable(c.children for c in self.children))
 
+    def _deep_nodes(self):
+        """
+        The nodes whose subtrees deep queries against this entry search.
+        """
+        return self.children
+
+    def enable_index(self):
+        """
+        Makes deep queries against this entry look up entries by name in an
+        index of everything beneath it. The index is built by the first deep
+        query and reused by later ones, so enable it on the roots of trees
+        that are queried many times and don't change afterward. Call it again
+        to rebuild the index after changing the tree. Returns the entry.
+        """
+        self._index = True
+        return self
+
+    def _get_index(self):
+        if self._index is None:
+            return None
+        if self._index is True:
+            index = defaultdict(list)
+            for n in _flatten(self._deep_nodes()):
+                try:
+                    index[n._name].append(n)
+                except TypeError:
+                    pass
+            self._index = index
+        return self._index
+
     def upto(self, query):
         """
         Go up from the current node to the first node that matches query.
@@ -263,6 +299,8 @@ class Entry(object):
         instances children, and ``kwargs`` on to :py:func:`select`.
         """
         query = compile_queries(*queries)
+        if kwargs.get("deep"):
+            kwargs["index"] = self._get_index()
         return select(query, self.children, **kwargs)
 
     def find(self, *queries, **kwargs):
@@ -457,6 +495,9 @@ class Result(Entry):
         super(Result, self).__init__()
         self.children = children or []
 
+    def _deep_nodes(self):
+        return chain.from_iterable(c.children for c in self.children)
+
     def get_keys(self):
         """
         Returns the unique names of all the grandchildren as a list.
@@ -620,7 +661,9 @@ class Result(Entry):
 
     def select(self, *queries, **kwargs):
         query = compile_queries(*queries)
-        return select(query, self.grandchildren, **kwargs)
+        if kwargs.get("deep"):
+            kwargs["index"] = self._get_index()
+        return select(query, self._deep_nodes(), **kwargs)
 
     def where(self, name, value=None):
         """
@@ -685,7 +728,7 @@ class Result(Entry):
         if isinstance(query, (int, slice)):
             return self.children[query]
         query = _desugar(query)
-        return Result(children=[c for c in self.grandchildren if query(c)])
+        return Result(children=[c for c in self._deep_nodes() if query(c)])
 
 
 class _Choose(Result):
@@ -866,13 +909,37 @@ def _desugar(q):
 
 def _flatten(nodes):
     """
-    Flatten the config tree into a list of nodes.
+    Generates the nodes of the config trees in nodes depth first.
     """
-    def inner(n):
-        yield n
-        for i in chain.from_iterable(inner(c) for c in n.children):
-            yield i
-    return list(chain.from_iterable(inner(n) for n in nodes))
+    stack = [iter(nodes)]
+    while stack:
+        for n in stack[-1]:
+            yield n
+            if n.children:
+                stack.append(iter(n.children))
+            break
+        else:
+            stack.pop()
+
+
+def _index_key(q):
+    """
+    Returns the name a query matches exactly, or None if it matches names
+    some other way.
+    """
+    if isinstance(q, tuple):
+        q = q[0] if q else None
+    if q is None or callable(q) or isinstance(q, (Boolean, _EntryQuery)):
+        return None
+    try:
+        hash(q)
+    except TypeError:
+        return None
+    return q
+
+
+def _filter(q, nodes):
+    return (n for n in nodes if q(n))
 
 
 def compile_queries(*queries):
@@ -888,23 +955,21 @@ def compile_queries(*queries):
     are `or'd` together and that result is `anded` with the name query. Any
     query that raises an exception is treated as ``False``.
     """
+    key = _index_key(queries[0]) if queries else None
     queries = [_desugar(q) for q in queries]
 
-    def match(qs, nodes):
-        q = qs[0]
-        qs = qs[1:]
-        res = [n for n in nodes if q(n)]
-        if qs and res:
-            gc = list(chain.from_iterable(n.children for n in res))
-            return match(qs, gc)
-        return res
-
     def inner(nodes):
-        return Result(children=match(queries, nodes))
+        # each level lazily filters the children of the previous one's
+        # matches, so only the final results are collected into a list
+        res = _filter(queries[0], nodes)
+        for q in queries[1:]:
+            res = _filter(q, chain.from_iterable(n.children for n in res))
+        return Result(children=list(res))
+    inner.key = key
     return inner
 
 
-def select(query, nodes, deep=False, roots=False):
+def select(query, nodes, deep=False, roots=False, index=None):
     """
     select runs query, a function returned by :py:func:`compile_queries`,
     against a list of :py:class:`Entry` instances. If you pass ``deep=True``,
@@ -912,8 +977,20 @@ def select(query, nodes, deep=False, roots=False):
     results of running the query against it. If you pass ``roots=True``,
     select returns the deduplicated set of final ancestors of all successful
     queries. Otherwise, it returns the matching entries.
+
+    ``index`` is a name index of the entries a deep query walks, like the one
+    :py:meth:`Entry.enable_index` maintains. If the query's first element
+    is a plain name, only the entries with that name are tried.
     """
-    results = query(_flatten(nodes)) if deep else query(nodes)
+    if deep:
+        key = getattr(query, "key", None)
+        if index is not None and key is not None:
+            results = query(index.get(key, ()))
+        else:
+            results = query(_flatten(nodes))
+    else:
+        results = query(nodes)
+    results = results.children
 
     if not roots:
         return Result(children=results)
@@ -0,0 +1,58 @@
+from insights.parsr.query import Entry, Result, from_dict, startswith
+
+
+def tree():
+    return from_dict({
+        "spec": {
+            "containers": [
+                {"name": "a", "image": "x", "ports": [{"port": 80}, {"port": 443}]},
+                {"name": "b", "image": "y", "ports": [{"port": 8080}]},
+            ],
+            "nodeName": "n1",
+        },
+        "status": {"name": "ok", "port": 1},
+    })
+
+
+QUERIES = [
+    ("name",),
+    ("port",),
+    ("containers", "ports", "port"),
+    (("name", "b"),),
+    (startswith("po"),),
+    ("missing",),
+    (None,),
+]
+
+
+def test_index_matches_walk():
+    plain = tree()
+    indexed = tree().enable_index()
+    for q in QUERIES:
+        expected = plain.find(*q)
+        actual = indexed.find(*q)
+        assert [(e.name, e.attrs) for e in actual] == [(e.name, e.attrs) for e in expected], q
+
+        expected = plain.select(*q, deep=True, roots=True)
+        actual = indexed.select(*q, deep=True, roots=True)
+        assert len(actual) == len(expected) == (1 if expected else 0)
+
+
+def test_index_built_once():
+    root = tree().enable_index()
+    assert root.find("port").values == [80, 443, 8080, 1]
+    index = root._index
+    assert root.find("name").values == ["a", "b", "ok"]
+    assert root._index is index
+
+    # enabling again rebuilds after changes
+    root.children = root.children + (Entry(name="port", attrs=(22,)),)
+    assert root.find("port").values == [80, 443, 8080, 1]
+    assert root.enable_index().find("port").values == [80, 443, 8080, 1, 22]
+
+
+def test_result_index():
+    docs = Result(children=[tree(), tree()])
+    expected = docs.find("port").values
+    assert docs.enable_index().find("port").values == expected == [80, 443, 8080, 1] * 2
+    assert docs.find("containers", "name").values == ["a", "b"] * 2
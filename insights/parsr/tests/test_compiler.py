@@ -0,0 +1,88 @@
+import string
+
+import pytest
+
+from insights.parsr import (Backtrack, Char, compile as compile_grammar, EOF, HangingString, InSet,
+                            Lift, Literal, Many, Number, Parser, String, WithIndent,
+                            WS, compiler)
+from insights.parsr.examples import httpd_conf, json_parser, logrotate_conf, multipath_conf
+
+CASES = [
+    (json_parser.Top, ['{"a": [1, 2.5, "x\\"y", true, null, {"b": []}]}', '{"a": [1, 2,}', '[1, 2 3]', '"abc']),
+    (httpd_conf.Top, ["<VirtualHost *:80>\n ServerName x # c\n</VirtualHost>\n",
+                      "<VirtualHost *:80>\n ServerName x\n</VirtualHostx>\n",
+                      "A 'b\n"]),
+    (logrotate_conf.Top, ["/var/log/x {\n daily\n postrotate\n  kill -HUP x\n endscript\n}\n", "a b\n c"]),
+    (multipath_conf.Top, ['defaults {\n a "b"\n c 5\n}\n', "x {\n y \"z\n}"]),
+]
+
+
+def run(parser, data):
+    try:
+        return "ok", repr(parser(data))
+    except Exception as ex:
+        return "error", str(ex)
+
+
+@pytest.mark.parametrize("grammar,inputs", CASES)
+def test_same_results(grammar, inputs):
+    compiled = compile_grammar(grammar)
+    for data in inputs:
+        assert run(compiled, data) == run(grammar, data)
+
+
+def test_code_cached():
+    def grammar(func):
+        return compile_grammar(Lift(func) * String(string.ascii_letters) * (WS >> Number) << EOF)
+
+    first = grammar(lambda name, num: (name, num))
+    second = grammar(lambda name, num: {name: num})
+    assert first("a 1") == ("a", 1)
+    assert second("b 2") == {"b": 2}
+    assert first.source == second.source
+    assert compiler._cache[first.source]
+
+
+def test_backtrack_and_function_errors():
+    def even(x):
+        if x % 2:
+            raise Backtrack("odd")
+        return x
+
+    def broken(x):
+        raise ValueError("broken")
+
+    Top = (Number.map(even) | Literal("one", value=1)) << EOF
+    assert compile_grammar(Top)("2") == 2
+    assert compile_grammar(Top)("one") == 1
+    assert run(compile_grammar(Top), "3") == run(Top, "3")
+
+    Top = Number.map(broken) << EOF
+    assert run(compile_grammar(Top), "3") == run(Top, "3")
+    assert "raised" in run(Top, "3")[1]
+
+
+class Twice(Parser):
+    def __init__(self, parser):
+        super(Twice, self).__init__()
+        self.add_child(parser)
+
+    def process(self, pos, data, ctx):
+        pos, a = self.children[0].process(pos, data, ctx)
+        pos, b = self.children[0].process(pos, data, ctx)
+        return pos, a + b
+
+
+def test_unknown_and_debug_parsers():
+    Top = compile_grammar(Many(Twice(Char("a")) | InSet("b").debug()) << EOF)
+    assert Top("aabaa") == ["aa", "b", "aa"]
+    with pytest.raises(Exception):
+        Top("aab a")
+
+
+def test_hanging_strings():
+    Key = WS >> String(string.ascii_letters) << WS
+    Value = WS >> HangingString(set(string.printable) - set("\r\n"))
+    Top = Many(WithIndent(Key + (Char("=") >> Value))) << EOF
+    data = "a = 1\n  2\nb = 3\n"
+    assert compile_grammar(Top)(data) == Top(data) == [["a", "1 2"], ["b", "3"]]
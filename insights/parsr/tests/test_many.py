@@ -1,5 +1,5 @@
 import pytest
-from insights.parsr import Char, Many
+from insights.parsr import Char, EOF, InSet, Many
 
 
 def test_many():
@@ -52,3 +52,19 @@ def test_many1():
 
     ab = Many(a | b, lower=1)
     assert ab("aababb") == ["a", "a", "b", "a", "b", "b"]
+
+
+def errors(parser, data):
+    try:
+        parser(data)
+    except Exception as ex:
+        return str(ex)
+
+
+def test_many_inset():
+    # a debugged InSet is tried one character at a time
+    fast = Many(InSet("ab"), lower=2) + EOF
+    slow = Many(InSet("ab").debug(), lower=2) + EOF
+    for data in ["", "a", "abba", "abc", "ab\nbc"]:
+        assert errors(fast, data) == errors(slow, data)
+    assert fast("abba") == [["a", "b", "b", "a"], None]
@@ -0,0 +1,63 @@
+from insights.parsr import (Char, EOF, EndTagName, Forward, Many, StartTagName,
+                            String, WS, _memoizable)
+from insights.parsr.examples.httpd_conf import Top as HttpdTop
+
+HTTPD = """
+ServerRoot "/etc/httpd"
+<VirtualHost *:80>
+    ServerName www.example.com
+    <Directory "/var/www/html">
+        Options Indexes FollowSymLinks
+    </Directory>
+</VirtualHost>
+"""
+
+
+def test_packrat_reuses_results():
+    calls = []
+
+    def word(w):
+        calls.append(w)
+        return w
+
+    # both alternatives start with the same parser at the same position
+    Word = WS >> String("abc").map(word) << WS
+    Top = ((Word + Char("x")) | (Word + Char("y"))) << EOF
+
+    assert Top("abc y") == ["abc", "y"]
+    assert len(calls) == 2
+
+    del calls[:]
+    assert Top("abc y", packrat=True) == ["abc", "y"]
+    assert len(calls) == 1
+
+
+def test_packrat_same_results():
+    expected = HttpdTop(HTTPD)
+    assert repr(HttpdTop(HTTPD, packrat=True)) == repr(expected)
+    assert repr(HttpdTop(HTTPD, packrat=2)) == repr(expected)
+
+
+def test_packrat_recursion():
+    Expr = Forward()
+    Expr <= (Char("(") >> Expr << Char(")")) | String("ab")
+    Top = Many(WS >> Expr << WS) << EOF
+    assert Top("((a)) (b) ab", packrat=True) == ["a", "b", "ab"]
+
+
+def test_context_sensitive_not_memoized():
+    Name = String("abc")
+    Start = Char("<") >> StartTagName(Name) << Char(">")
+    Close = Char("<") >> Char("/")
+    End = Close >> EndTagName(Name) << Char(">")
+    Tag = Forward()
+    Tag <= Start + Many(Tag) + End
+    Top = Many(Tag) << EOF
+
+    memoizable = _memoizable(Top)
+    assert Tag not in memoizable
+    assert Top not in memoizable
+    assert Close in memoizable
+
+    data = "<a><b></b></a><c></c>"
+    assert Top(data, packrat=True) == Top(data)
@@ -1,3 +1,4 @@
+import pytest
 import string
 from insights.parsr import InSet, String, DoubleQuotedString, QuotedString
 
@@ -22,3 +23,14 @@ def test_escaped_string():
     "%h %l %u %t \"%r\" %>s %b \"%{Referer}i\" \"%{User-Agent}i\""
     """.strip()
     assert DoubleQuotedString(data)
+
+
+def test_string_escapes():
+    s = String("ab\\", echars="\\'")
+    assert s(r"ab\'a") == "ab'a"
+    assert s(r"a\\b") == "a\\b"
+    assert s("a\\b") == "a\\b"
+    assert String("ab", echars="'")(r"ab\'c") == "ab'"
+    assert String("ab", echars="'", min_length=0)("c") == ""
+    with pytest.raises(Exception):
+        String("ab", min_length=3)("abc")
@@ -1,4 +1,5 @@
-from insights.parsr import Char, Until
+import pytest
+from insights.parsr import AnyChar, Char, InSet, Until
 
 
 def test_until():
@@ -7,3 +8,18 @@ def test_until():
     u = Until(a, b)
     res = u("aaaab")
     assert len(res) == 4
+
+
+def test_until_inset():
+    # a debugged InSet is tried one character at a time
+    fast = AnyChar.until(InSet("\r\n")) + Char("\n")
+    slow = AnyChar.until(InSet("\r\n").debug()) + Char("\n")
+    for data in ["", "abc", "abc\n", "ab\rc", "\n"]:
+        try:
+            expected = slow(data)
+        except Exception as ex:
+            with pytest.raises(Exception) as actual:
+                fast(data)
+            assert str(actual.value) == str(ex)
+        else:
+            assert fast(data) == expected
@@ -0,0 +1,71 @@
+import logging
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from insights.contrib.soscleaner import SOSCleaner
+
+FILES = {
+    "etc/hosts": "127.0.0.1 localhost\n10.0.0.5 web01.corp.com web01\n",
+    "var/log/messages": ("web01 sshd: accepted from 192.168.1.20 port 22\n"
+                         "db02.corp.com: connect to 10.0.0.5 failed, secret=hunter2\n") * 50,
+    "sos_commands/networking/ip_addr": "inet 192.168.1.20/24 brd 192.168.1.255\n",
+    "sos_commands/general/uname": "Linux web01.corp.com 4.18.0\n",
+}
+
+
+def make_cleaner():
+    cleaner = SOSCleaner(quiet=True)
+    cleaner.logger = logging.getLogger(__name__)
+    cleaner.hostname, cleaner.domainname, cleaner.fqdn = "web01", "corp.com", "web01.corp.com"
+    cleaner.hn_db["abc.example.com"] = cleaner.fqdn
+    cleaner.kw_db = {"hunter2": "keyword0"}
+    cleaner.kw_count = 1
+    cleaner.logger.con_out = lambda *args: None
+    cleaner._domains2db()
+    return cleaner
+
+
+@pytest.fixture
+def report():
+    tmp = tempfile.mkdtemp()
+    for name, content in FILES.items():
+        path = os.path.join(tmp, name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+    yield tmp
+    shutil.rmtree(tmp)
+
+
+def clean(report):
+    cleaner = make_cleaner()
+    files = sorted(os.path.join(report, name) for name in FILES)
+    cleaner._clean_files(files)
+    contents = {}
+    for name in FILES:
+        with open(os.path.join(report, name)) as f:
+            contents[name] = f.read()
+    return cleaner, contents
+
+
+def test_clean_line():
+    cleaner = make_cleaner()
+    line = "web01 db02.corp.com 10.0.0.5 hunter2 10.0.0.5 300.1.1.1\n"
+    assert cleaner._clean_line(line) == ("abc.example.com host1.example.com "
+                                         "10.230.230.1 keyword0 10.230.230.1 300.1.1.1\n")
+    assert cleaner.ip_db == {cleaner._ip2int("10.230.230.1"): cleaner._ip2int("10.0.0.5")}
+    assert cleaner.hn_db["host1.example.com"] == "db02.corp.com"
+
+
+def test_clean_files(report):
+    cleaner, actual = clean(report)
+    assert "192.168.1.20" not in actual["var/log/messages"]
+    assert "hunter2" not in actual["var/log/messages"]
+    assert "corp.com" not in actual["sos_commands/general/uname"]
+    # values are assigned in file order
+    assert cleaner.ip_db[cleaner._ip2int("10.230.230.1")] == cleaner._ip2int("127.0.0.1")
+    assert cleaner.ip_db[cleaner._ip2int("10.230.230.2")] == cleaner._ip2int("10.0.0.5")
@@ -0,0 +1,253 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+import pytest
+
+from insights import dr, load_default_plugins, process_dir, run
+from insights.core import spec_factory
+from insights.core.archives import open_archive
+from insights.core.context import HostArchiveContext, HostContext
+from insights.core.hydration import extract_specs, initialize_broker
+from insights.core.spec_factory import (TextFileProvider, foreach_collect, get_spec_globs, glob_file, listdir,
+                                       simple_file)
+from insights.parsers.hostname import Hostname
+from insights.parsers.redhat_release import RedhatRelease
+
+FILES = {
+    "insights_commands/hostname_-f": "host.example.com\n",
+    "etc/redhat-release": "Red Hat Enterprise Linux Server release 7.9 (Maipo)\n",
+    "etc/hosts": "127.0.0.1 localhost\n",
+    "var/log/messages": "big\n" * 1000,
+}
+
+hosts = simple_file("/etc/hosts_link", context=HostArchiveContext)
+logs = glob_file("/var/log/*", context=HostArchiveContext)
+etc = listdir("/etc", context=HostArchiveContext)
+etc_files = foreach_collect(etc, "/etc/%s", context=HostArchiveContext)
+
+
+@pytest.fixture
+def archive_dir():
+    tmp = tempfile.mkdtemp()
+    top = os.path.join(tmp, "insights-host")
+    for name, content in FILES.items():
+        path = os.path.join(top, name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+    os.symlink("hosts", os.path.join(top, "etc", "hosts_link"))
+    os.symlink("/etc/passwd", os.path.join(top, "etc", "passwd"))
+    yield tmp
+    shutil.rmtree(tmp)
+
+
+def make_tar(tmp, compression="gz"):
+    path = os.path.join(tmp, "insights-host.tar" + ("." + compression if compression else ""))
+    with tarfile.open(path, "w:" + compression) as tf:
+        tf.add(os.path.join(tmp, "insights-host"), "insights-host")
+    return path
+
+
+def make_zip(tmp):
+    path = os.path.join(tmp, "insights-host.zip")
+    with zipfile.ZipFile(path, "w") as zf:
+        for name in FILES:
+            zf.write(os.path.join(tmp, "insights-host", name), os.path.join("insights-host", name))
+    return path
+
+
+@pytest.mark.parametrize("make", [make_tar, make_zip])
+def test_archive_reader_index(archive_dir, make):
+    path = make(archive_dir)
+    with open_archive(path) as arc:
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        assert sorted(arc.files()) == sorted(os.path.join(root, n) for n in FILES)
+        assert arc.isdir(os.path.join(root, "etc"))
+        assert arc.listdir(os.path.join(root, "var", "log")) == ["messages"]
+        assert arc.glob(os.path.join(root, "etc", "r*")) == [os.path.join(root, "etc", "redhat-release")]
+        assert not arc.exists(os.path.join(root, "missing"))
+
+        p = arc.realize(os.path.join(root, "etc", "hosts"))
+        with open(p) as f:
+            assert f.read() == FILES["etc/hosts"]
+        assert not os.path.exists(os.path.join(root, "var", "log", "messages"))
+    assert not os.path.exists(arc.tmp_dir)
+
+
+def test_archive_reader_links(archive_dir):
+    path = make_tar(archive_dir)
+    with open_archive(path) as arc:
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        assert arc.isfile(os.path.join(root, "etc", "hosts_link"))
+        # links pointing outside the archive don't exist
+        assert not arc.exists(os.path.join(root, "etc", "passwd"))
+
+        p = arc.realize(os.path.join(root, "etc", "hosts_link"))
+        with open(p) as f:
+            assert f.read() == FILES["etc/hosts"]
+
+
+def test_run_without_extraction(archive_dir):
+    load_default_plugins()
+    # compressed tars are extracted in full once members are read out of order
+    path = make_tar(archive_dir, compression="")
+    with open_archive(path) as arc:
+        ctx, broker = initialize_broker(arc.tmp_dir, archive=arc)
+        assert isinstance(ctx, HostArchiveContext)
+        assert ctx.archive is arc
+
+        graph = {}
+        for c in (Hostname, RedhatRelease, hosts, logs):
+            graph.update(dr.get_dependency_graph(c))
+        broker = dr.run(graph, broker=broker)
+
+        assert broker[Hostname].fqdn == "host.example.com"
+        assert broker[RedhatRelease].major == 7
+        assert broker[hosts].content == ["127.0.0.1 localhost"]
+        assert [l.relative_path for l in broker[logs]] == ["var/log/messages"]
+
+        # the log was found but never read, so it wasn't written out
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        assert os.path.exists(os.path.join(root, "etc", "redhat-release"))
+        assert not os.path.exists(os.path.join(root, "var", "log", "messages"))
+
+
+def test_run_extract_archive(archive_dir):
+    path = make_tar(archive_dir)
+    extracted = run(RedhatRelease, root=path)
+    streamed = run(RedhatRelease, root=path, extract_archive=False)
+    assert streamed[RedhatRelease].version == extracted[RedhatRelease].version == "7.9"
+
+
+def test_get_spec_globs(archive_dir):
+    path = make_tar(archive_dir)
+    with open_archive(path) as arc:
+        ctx, broker = initialize_broker(arc.tmp_dir, archive=arc)
+        assert get_spec_globs(ctx, [hosts, logs, etc, etc_files, Hostname]) == ["/etc/*", "/etc/hosts_link", "/var/log/*"]
+        # datasources for other contexts are skipped
+        assert get_spec_globs(ctx, [simple_file("/etc/hosts", context=HostContext)]) == []
+
+
+@pytest.mark.parametrize("make", [make_tar, make_zip])
+def test_extract_specs(archive_dir, make):
+    path = make(archive_dir)
+    with open_archive(path) as arc:
+        ctx, broker = initialize_broker(arc.tmp_dir, archive=arc)
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        paths = extract_specs(ctx, [hosts, etc, etc_files])
+        if make is make_tar:
+            assert paths == sorted(os.path.join(root, "etc", n) for n in ("hosts", "hosts_link", "passwd", "redhat-release"))
+        assert not os.path.exists(os.path.join(root, "var", "log", "messages"))
+        with open(os.path.join(root, "etc", "hosts")) as f:
+            assert f.read() == FILES["etc/hosts"]
+        assert os.path.exists(os.path.join(root, "etc", "redhat-release"))
+
+
+def test_process_dir_extract_specs(archive_dir):
+    load_default_plugins()
+    path = make_tar(archive_dir)
+    graph = {}
+    for c in (Hostname, RedhatRelease, hosts):
+        graph.update(dr.get_dependency_graph(c))
+    with open_archive(path) as arc:
+        broker = process_dir(dr.Broker(), arc.tmp_dir, graph, None, archive=arc, extract_spec_files=True)
+        assert broker[Hostname].fqdn == "host.example.com"
+        assert broker[hosts].content == ["127.0.0.1 localhost"]
+
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        with open(os.path.join(root, "etc", "hosts_link")) as f:
+            assert f.read() == FILES["etc/hosts"]
+        assert not os.path.exists(os.path.join(root, "var", "log", "messages"))
+
+    broker = run(RedhatRelease, root=path, extract_archive="specs")
+    assert broker[RedhatRelease].version == "7.9"
+
+
+def test_archive_reader_spill_limit(archive_dir):
+    path = make_zip(archive_dir)
+    with open_archive(path) as arc:
+        arc.max_spill = len(FILES["etc/hosts"]) + len(FILES["etc/redhat-release"])
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        hosts = arc.realize(os.path.join(root, "etc", "hosts"))
+        release = arc.realize(os.path.join(root, "etc", "redhat-release"))
+        assert os.path.exists(hosts) and os.path.exists(release)
+
+        # the oldest member is removed to make room
+        messages = arc.realize(os.path.join(root, "var", "log", "messages"))
+        assert not os.path.exists(hosts) and not os.path.exists(release)
+        with open(messages) as f:
+            assert f.read() == FILES["var/log/messages"]
+
+        # and written again when it's needed
+        with open(arc.realize(hosts)) as f:
+            assert f.read() == FILES["etc/hosts"]
+
+
+def test_archive_reader_compressed_order(archive_dir):
+    path = make_tar(archive_dir)
+    with open_archive(path) as arc:
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        members = sorted(arc._members.values(), key=lambda m: m.offset_data)
+        first, last = [os.path.join(arc.tmp_dir, m.name) for m in (members[0], members[-1])]
+
+        # members after the last one read are read from the stream
+        arc.realize(last)
+        assert not os.path.exists(first)
+
+        # going back extracts the rest of the archive at once
+        arc.realize(first)
+        for name, content in FILES.items():
+            with open(os.path.join(root, name)) as f:
+                assert f.read() == content
+
+
+def test_archive_reader_pinned(archive_dir):
+    path = make_zip(archive_dir)
+    with open_archive(path) as arc:
+        arc.max_spill = 1
+        root = os.path.join(arc.tmp_dir, "insights-host")
+        hosts = os.path.join(root, "etc", "hosts")
+        release = os.path.join(root, "etc", "redhat-release")
+        messages = os.path.join(root, "var", "log", "messages")
+
+        arc.pin(hosts)
+        arc.pin(hosts)
+        arc.realize(release)
+        arc.realize(messages)
+        # a member being read isn't removed to make room for others
+        assert os.path.exists(hosts)
+        assert not os.path.exists(release)
+
+        arc.unpin(hosts)
+        arc.realize(release)
+        assert os.path.exists(hosts)
+        arc.unpin(hosts)
+        arc.realize(messages)
+        assert not os.path.exists(hosts)
+
+
+def test_provider_pins_while_reading(archive_dir, monkeypatch):
+    path = make_zip(archive_dir)
+    with open_archive(path) as arc:
+        arc.max_spill = 1
+        ctx = HostArchiveContext(os.path.join(arc.tmp_dir, "insights-host"))
+        ctx.archive = arc
+        provider = TextFileProvider("/etc/hosts", root=ctx.root, ctx=ctx)
+
+        class Pipeline(object):
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def write(self, dst):
+                # another member is realized while this one is being read
+                arc.realize(os.path.join(ctx.root, "var", "log", "messages"))
+                assert os.path.exists(provider.path)
+
+        monkeypatch.setattr(spec_factory, "Pipeline", Pipeline)
+        monkeypatch.setattr(provider, "create_args", lambda: [["grep", "-F", "x", provider.path]])
+        provider.write(os.path.join(archive_dir, "out"))
+        assert not arc._pins
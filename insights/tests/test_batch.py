@@ -0,0 +1,134 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+from six import StringIO
+
+from insights import dr, load_default_plugins, make_fail, rule
+from insights.core import batch
+from insights.parsers.redhat_release import RedhatRelease
+
+futures = pytest.importorskip("concurrent.futures")
+
+
+@rule(RedhatRelease)
+def report(rel):
+    return make_fail("RELEASE", version=rel.version)
+
+
+@pytest.fixture
+def hosts():
+    tmp = tempfile.mkdtemp()
+    paths = []
+    for i, version in enumerate(["7.9", "8.4"]):
+        top = os.path.join(tmp, "host%d" % i, "insights-host")
+        os.makedirs(os.path.join(top, "insights_commands"))
+        os.makedirs(os.path.join(top, "etc"))
+        with open(os.path.join(top, "insights_commands", "hostname_-f"), "w") as f:
+            f.write("host%d.example.com\n" % i)
+        with open(os.path.join(top, "etc", "redhat-release"), "w") as f:
+            f.write("Red Hat Enterprise Linux release %s\n" % version)
+        paths.append(os.path.join(tmp, "host%d" % i))
+    yield paths
+    shutil.rmtree(tmp)
+
+
+def test_serve_stream(hosts):
+    load_default_plugins()
+    stream = StringIO("\n".join(hosts + [os.path.join(hosts[0], "missing.tar.gz")]) + "\n")
+    output = StringIO()
+    with futures.ThreadPoolExecutor(2) as pool:
+        batch.serve(dr.get_dependency_graph(report), stream=stream, output=output, executor=pool)
+
+    results = dict((r["archive"], r) for r in map(json.loads, output.getvalue().splitlines()))
+    assert len(results) == 3
+    for path, version in zip(hosts, ["7.9", "8.4"]):
+        reports = results[path]["reports"]
+        assert [(r["key"], r["details"]["version"]) for r in reports] == [("RELEASE", version)]
+    assert "error" in results[os.path.join(hosts[0], "missing.tar.gz")]
+
+
+def test_serve_compiles_plan_once(hosts, monkeypatch):
+    load_default_plugins()
+    compiled = []
+    compile_plan = dr.RunPlan.compile
+
+    def compile(plan):
+        compiled.append(plan)
+        return compile_plan(plan)
+
+    monkeypatch.setattr(dr.RunPlan, "compile", compile)
+    output = StringIO()
+    with futures.ThreadPoolExecutor(2) as pool:
+        batch.serve(dr.get_dependency_graph(report), stream=StringIO("\n".join(hosts) + "\n"),
+                    output=output, executor=pool)
+    assert len(output.getvalue().splitlines()) == 2
+    assert len(compiled) == 1
+
+
+def test_serve_spool(hosts):
+    tmp = tempfile.mkdtemp()
+    try:
+        spool = os.path.join(tmp, "spool")
+        os.makedirs(spool)
+        # spooled files are claimed and removed once their result is written
+        with open(os.path.join(spool, "not_an_archive"), "w") as f:
+            f.write("junk\n")
+        output = StringIO()
+        processor = batch.BatchProcessor(futures.ThreadPoolExecutor(1), stream=output, interval=0.01)
+        paths = batch.watch_spool(spool, interval=0.01)
+        claimed = next(paths)
+        assert claimed == os.path.join(spool, ".work", "not_an_archive")
+        assert next(paths) is None
+        processor.process([claimed], done=os.remove)
+        assert "error" in json.loads(output.getvalue())
+        assert os.listdir(os.path.join(spool, ".work")) == []
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_run_max_pending(monkeypatch):
+    lock = threading.Lock()
+    running = [0]
+    most = [0]
+
+    def analyze(path):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return path
+
+    monkeypatch.setattr(batch, "analyze", analyze)
+    with futures.ThreadPoolExecutor(8) as pool:
+        processor = batch.BatchProcessor(pool, stream=StringIO(), max_pending=2)
+        # like socket connections, each in a thread of its own
+        threads = [threading.Thread(target=processor.run, args=(str(i),)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert most[0] <= 2
+
+
+def test_serve_pool_mp_context(monkeypatch):
+    created = []
+
+    class Pool(futures.ThreadPoolExecutor):
+        def __init__(self, workers, **kwargs):
+            created.append(kwargs)
+            super(Pool, self).__init__(1)
+
+    class OldPython(object):
+        version_info = (3, 6, 15)
+
+    monkeypatch.setattr(futures, "ProcessPoolExecutor", Pool)
+    monkeypatch.setattr(batch, "sys", OldPython)
+    batch.serve({}, stream=StringIO(""), output=StringIO())
+    assert created == [{}]
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("ansible")
+futures = pytest.importorskip("concurrent.futures")
+
+from insights.core import cluster, dr  # noqa: E402
+
+
+def cpu_fact():
+    pass
+
+
+def fallback_id(_):
+    return cluster.machine_id(None, None)
+
+
+def fake_host_facts(delays=None, fail=None, started=None, in_flight=None):
+    lock = threading.Lock()
+    running = [0]
+
+    def host_facts(graph, archive):
+        with lock:
+            running[0] += 1
+            if in_flight is not None:
+                in_flight.append(running[0])
+            if started is not None:
+                started.append(archive)
+        try:
+            time.sleep((delays or {}).get(archive, 0))
+            if archive == fail:
+                raise Exception("broken archive %s" % archive)
+            return "host-" + archive, {cpu_fact: {"archive": archive}}
+        finally:
+            with lock:
+                running[0] -= 1
+    return host_facts
+
+
+def archives(n):
+    return [str(i) for i in range(n)]
+
+
+def test_fallback_ids_differ_across_workers():
+    with futures.ProcessPoolExecutor(2) as pool:
+        ids = list(pool.map(fallback_id, range(4)))
+    assert len(set(ids)) == 4
+
+
+def test_collect_facts_keeps_archive_order(monkeypatch):
+    # the first archives finish last
+    delays = dict((a, 0.02 * (5 - i)) for i, a in enumerate(archives(5)))
+    monkeypatch.setattr(cluster, "host_facts", fake_host_facts(delays=delays))
+    with futures.ThreadPoolExecutor(5) as pool:
+        facts = cluster.collect_facts({}, archives(5), pool, max_extractions=5)
+    assert [r["archive"] for r in facts[cpu_fact]] == archives(5)
+    assert [r["machine_id"] for r in facts[cpu_fact]] == ["host-" + a for a in archives(5)]
+
+
+def test_collect_facts_max_extractions(monkeypatch):
+    in_flight = []
+    monkeypatch.setattr(cluster, "host_facts", fake_host_facts(delays=dict((a, 0.01) for a in archives(8)),
+                                                               in_flight=in_flight))
+    with futures.ThreadPoolExecutor(8) as pool:
+        facts = cluster.collect_facts({}, archives(8), pool, max_extractions=2)
+    assert len(facts[cpu_fact]) == 8
+    assert max(in_flight) <= 2
+
+
+def test_collect_facts_cancels_on_error(monkeypatch):
+    started = []
+    monkeypatch.setattr(cluster, "host_facts", fake_host_facts(fail="1", started=started))
+    with futures.ThreadPoolExecutor(1) as pool:
+        with pytest.raises(Exception) as exc:
+            cluster.collect_facts({}, archives(10), pool, max_extractions=2)
+    assert "broken archive 1" in str(exc)
+    # only the archives submitted before the error were processed
+    assert set(started) <= set(["0", "1", "2"])
+
+
+def test_process_cluster_serial(monkeypatch):
+    monkeypatch.setattr(cluster, "host_facts", fake_host_facts())
+    broker = cluster.process_cluster({}, ["0"], dr.Broker())
+    frame = broker[cpu_fact]
+    assert list(frame["archive"]) == ["0"]
+    assert list(frame["machine_id"]) == ["host-0"]
+    assert broker[cluster.ClusterMeta].num_members == 1
+
+    # an executor gives the same facts
+    with futures.ThreadPoolExecutor(2) as pool:
+        threaded = cluster.process_cluster({}, archives(3), dr.Broker(), executor=pool)
+    serial = defaultdict(list)
+    for a in archives(3):
+        cluster.add_facts(serial, *cluster.host_facts({}, a))
+    assert threaded[cpu_fact].to_dict("records") == serial[cpu_fact]
@@ -1,5 +1,6 @@
 from insights.core.context import (ExecutionContextMeta, HostArchiveContext,
                                    SerializedArchiveContext, SosArchiveContext)
+from insights.core.path_index import PathIndex
 
 
 def test_host_archive_context():
@@ -70,3 +71,13 @@ def test_unrecognized():
     files = ["/foo/junk", "/bar/junk"]
     actual = ExecutionContextMeta.identify(files)
     assert actual == (None, None), actual
+
+
+def test_identify_with_index():
+    index = PathIndex()
+    for f in ["foo/junk", "foo/bar/sos_commands/x", "foo/bar/insights_commands/y"]:
+        index.add_file(f)
+    files = ["/tmp/" + f for f in index.files()]
+    assert HostArchiveContext.handles(files, index=index, root="/tmp") == ("/tmp/foo/bar", HostArchiveContext)
+    assert SosArchiveContext.handles(files, index=index, root="/tmp") == ("/tmp/foo/bar", SosArchiveContext)
+    assert ExecutionContextMeta.identify(files, index=index, root="/tmp")[0] == "/tmp/foo/bar"
@@ -1,4 +1,5 @@
 import os
+import pytest
 import sys
 from insights import run, make_fail, make_pass
 from insights.core import dr
@@ -32,6 +33,21 @@ def stage4(common):
     return common
 
 
+@stage(stage1, stage2)
+def stage5(one, two):
+    return one + two
+
+
+@stage("common")
+def boom(common):
+    raise Exception("boom")
+
+
+@stage(boom)
+def after_boom(b):
+    return b
+
+
 def test_run():
     broker = dr.Broker()
     broker["common"] = 3
@@ -61,6 +77,146 @@ def test_run_incremental():
     assert len(brokers) == 3
 
 
+def _parallel_graph():
+    graph = {}
+    for c in (stage3, stage4, stage5, after_boom):
+        graph.update(dr.get_dependency_graph(c))
+    return graph
+
+
+def _seeded_broker():
+    broker = dr.Broker()
+    broker["dep1"] = 1
+    broker["dep2"] = 2
+    broker["common"] = 3
+    return broker
+
+
+def test_run_parallel_threads():
+    seen = []
+    broker = _seeded_broker()
+    broker.add_observer(lambda c, b: seen.append(c), stage)
+
+    futures = pytest.importorskip("concurrent.futures")
+    with futures.ThreadPoolExecutor(max_workers=4) as pool:
+        broker = dr.run_parallel(_parallel_graph(), broker, pool)
+
+    assert broker[stage3] == 3
+    assert broker[stage4] == 3
+    assert broker[stage5] == "stage1stage2"
+    assert boom in broker.exceptions
+    assert boom not in broker
+    assert after_boom in broker.missing_requirements
+    assert seen.index(stage5) > seen.index(stage1)
+    assert seen.index(stage5) > seen.index(stage2)
+    assert set(broker.exec_times) >= set(_parallel_graph())
+
+
+def test_run_parallel_matches_run():
+    serial = dr.run(_parallel_graph(), _seeded_broker())
+    parallel = dr.run_parallel(_parallel_graph(), _seeded_broker())
+    assert serial.instances == parallel.instances
+    assert set(serial.missing_requirements) == set(parallel.missing_requirements)
+    assert set(serial.exceptions) == set(parallel.exceptions)
+
+
+def test_run_parallel_processes():
+    futures = pytest.importorskip("concurrent.futures")
+    with futures.ProcessPoolExecutor(max_workers=2) as pool:
+        broker = dr.run_parallel(_parallel_graph(), _seeded_broker(), pool)
+
+    assert broker[stage5] == "stage1stage2"
+    assert broker[stage3] == 3
+    assert boom in broker.exceptions
+    assert broker.tracebacks[broker.exceptions[boom][0]]
+
+
+def test_run_plan():
+    plan = dr.compile_plan(_parallel_graph())
+    assert plan.order.index(stage5) > plan.order.index(stage1)
+
+    first = dr.run(plan, _seeded_broker())
+    second = dr.run(plan, _seeded_broker())
+    serial = dr.run(_parallel_graph(), _seeded_broker())
+    assert first.instances == second.instances == serial.instances
+    assert set(first.missing_requirements) == set(serial.missing_requirements)
+
+
+def test_run_plan_invalidation():
+    plan = dr.compile_plan(_parallel_graph())
+    steps = plan.steps
+    assert not plan.is_stale()
+
+    dr.set_enabled(stage5, False)
+    try:
+        assert plan.is_stale()
+        broker = dr.run(plan, _seeded_broker())
+        assert stage5 not in broker
+        assert plan.steps is not steps
+    finally:
+        dr.set_enabled(stage5, True)
+
+    broker = dr.run(plan, _seeded_broker())
+    assert broker[stage5] == "stage1stage2"
+
+
+def test_run_plan_incremental():
+    graph = dr.get_dependency_graph(stage1)
+    graph.update(dr.get_dependency_graph(stage2))
+    graph.update(dr.get_dependency_graph(stage3))
+    graph.update(dr.get_dependency_graph(stage4))
+    plan = dr.compile_plan(graph)
+
+    brokers = list(dr.run_incremental(plan, _seeded_broker()))
+    assert len(brokers) == 3
+    assert plan.get_subplans() is plan.get_subplans()
+
+
+def test_prune_unreachable():
+    graph, report = dr.prune(_parallel_graph(), [stage5])
+    assert set(graph) == set([stage5, stage1, stage2, "dep1", "dep2"])
+    assert stage3 in report.unreachable
+    assert after_boom in report.unreachable
+    assert not report.unsatisfiable
+    assert report.total == len(_parallel_graph())
+
+
+def test_prune_unsatisfiable():
+    broker = dr.Broker()
+    broker["dep1"] = 1
+    graph, report = dr.prune(_parallel_graph(), [stage5], broker=broker)
+    assert stage2 in report.unsatisfiable
+    assert "dep2" in report.unsatisfiable
+    assert stage5 in graph
+    assert report.get_pruned_of_type(stage) == set([stage2, stage3, stage4, boom, after_boom])
+
+    broker = dr.run(graph, broker)
+    assert broker[stage1] == "stage1"
+    assert stage5 in broker.missing_requirements
+
+
+def test_prune_disabled():
+    dr.set_enabled(stage5, False)
+    try:
+        graph, report = dr.prune(_parallel_graph(), [stage5])
+    finally:
+        dr.set_enabled(stage5, True)
+    assert set(graph) == set([stage5])
+
+
+def test_prune_stale_plan():
+    plan = dr.compile_plan()
+
+    @stage("dep1")
+    def late(dep1):
+        return dep1
+
+    assert plan.is_stale()
+    graph, report = dr.prune(plan, [late])
+    assert set(graph) == set([late])
+    assert not plan.is_stale()
+
+
 ALWAYS_FIRES_RESULT = make_pass("ALWAYS_FIRES", kernel="this is junk")
 NEVER_FIRES_RESULT = {
     'rule_fqdn': 'insights.plugins.never_fires.report',
@@ -98,6 +254,11 @@ def test_run_command(tmpdir):
     assert Specs.redhat_release in broker
     assert broker[Specs.redhat_release].content == [REDHAT_RELEASE]
 
+    broker = run([always_fires.report, never_fires.report], root=tmpdir.strpath, prune=True)
+    assert broker[always_fires.report] == ALWAYS_FIRES_RESULT
+    assert broker[never_fires.report] == NEVER_FIRES_RESULT
+    assert Specs.redhat_release not in broker
+
     testargs = ["insights-run", "-p", "insights.plugins"]
     with patch.object(sys, 'argv', testargs):
         broker = run(print_summary=True)
@@ -1,5 +1,6 @@
 from collections import defaultdict
-from insights.core import filters
+from insights.core import dr, filters
+from insights.core.spec_factory import RegistryPoint, SpecSet, simple_file
 
 from insights.parsers.ps import PsAux, PsAuxcww
 from insights.specs import Specs
@@ -115,3 +116,63 @@ def test_add_filter_exception_raw():
 def test_add_filter_exception_empty():
     with pytest.raises(Exception):
         filters.add_filter(Specs.ps_aux, "")
+
+
+def test_filters_index():
+    old = filters.FILTERS
+    filters.FILTERS = defaultdict(set)
+    filters._CACHE.clear()
+    filters.add_filter(PsAux, "COMMAND")
+    filters.add_filter(DefaultSpecs.ps_aux, "MEM")
+    try:
+        index = filters.build_index([Specs.ps_aux, DefaultSpecs.ps_aux, Specs.ps_auxcww])
+        assert index[Specs.ps_aux] == frozenset(["COMMAND"])
+        assert index[DefaultSpecs.ps_aux] == frozenset(["COMMAND", "MEM"])
+        assert index[Specs.ps_auxcww] == frozenset()
+
+        s = filters.dumps_index()
+        filters._CACHE.clear()
+        assert filters.loads_index(s)
+        assert filters._CACHE[DefaultSpecs.ps_aux] == set(["COMMAND", "MEM"])
+        assert filters.get_filters(Specs.ps_aux) == set(["COMMAND"])
+        assert filters.verify_index() == {}
+
+        filters._CACHE[Specs.ps_aux] = set(["bogus"])
+        assert dr.get_name(Specs.ps_aux) in filters.verify_index()
+
+        # an index built from different filters isn't used
+        filters._CACHE.clear()
+        filters.add_filter(DefaultSpecs.ps_aux, "PID")
+        assert not filters.loads_index(s)
+        assert not filters._CACHE
+    finally:
+        filters._CACHE.clear()
+        filters.FILTERS = old
+
+
+def test_filters_index_dependencies():
+    old = filters.FILTERS
+    filters.FILTERS = defaultdict(set)
+    filters._CACHE.clear()
+    try:
+        class IndexSpecs(SpecSet):
+            thing = RegistryPoint(filterable=True)
+
+        class FirstSpecs(IndexSpecs):
+            thing = simple_file("/etc/thing")
+
+        filters.add_filter(IndexSpecs.thing, "word")
+        s = filters.dumps_index()
+        filters._CACHE.clear()
+        assert filters.loads_index(s)
+
+        # a new datasource would inherit the filters, so the index is stale
+        class SecondSpecs(IndexSpecs):
+            thing = simple_file("/etc/other_thing")
+
+        filters._CACHE.clear()
+        assert not filters.loads_index(s)
+        assert filters.get_filters(SecondSpecs.thing) == set(["word"])
+    finally:
+        filters._CACHE.clear()
+        filters.FILTERS = old
@@ -0,0 +1,150 @@
+# -*- coding: UTF-8 -*-
+import io
+import os
+import pickle
+import re
+
+import pytest
+
+from insights.core import LogFileOutput, blacklist
+from insights.core.context import HostArchiveContext, HostContext
+from insights.core.linebuffer import LineBuffer, MappedLineBuffer, load
+from insights.core.spec_factory import TextFileProvider
+
+CONTENT = b"""
+Mar 27 03:18:33 host kernel: first line
+Mar 27 03:18:34 host sshd[100]: windows line\r
+Mar 27 03:18:35 host sshd[101]: old mac line\rMar 27 03:18:36 host kernel: \xff\xfe invalid utf-8
+
+Mar 27 03:18:37 host kernel: caf\xc3\xa9
+last line without a newline sshd""".lstrip(b"\n")
+
+
+def mapped_context():
+    ctx = HostArchiveContext()
+    ctx.mapped_files = True
+    return ctx
+
+
+def list_context():
+    ctx = HostArchiveContext()
+    ctx.buffered_lines = False
+    return ctx
+
+
+class FakeLog(LogFileOutput):
+    pass
+
+
+FakeLog.keep_scan("sshd_lines", "sshd")
+
+
+@pytest.fixture
+def sample(tmpdir):
+    path = tmpdir / "messages"
+    path.write_binary(CONTENT)
+    return path.strpath
+
+
+def teardown_function(func):
+    blacklist._PATTERN_FILTERS.clear()
+
+
+def read_lines(path):
+    with io.open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        return [l.rstrip("\n") for l in f]
+
+
+def test_line_buffer():
+    lines = ["one", "", "two\nlines", "three"]
+    buf = LineBuffer(lines)
+    assert buf == lines
+    assert len(buf) == 4
+    assert buf[2] == "two\nlines"
+    assert buf[-1] == "three"
+    assert buf[1:] == lines[1:]
+    assert buf[::-2] == lines[::-2]
+    assert list(reversed(buf)) == lines[::-1]
+    assert "two\nlines" in buf and "two" not in buf
+    assert buf.index("three") == 3
+    with pytest.raises(IndexError):
+        buf[4]
+    with pytest.raises(IndexError):
+        buf[-5]
+    assert pickle.loads(pickle.dumps(buf)) == lines
+    assert buf.select(re.compile("t")) == ["two\nlines", "three"]
+    assert buf.select(re.compile("ee|on")) == ["one", "three"]
+    assert LineBuffer() == []
+    assert LineBuffer([""]) == [""]
+    many = [str(i) for i in range(10000)]
+    assert LineBuffer(many) == many
+    assert LineBuffer(many)[4090:4100] == many[4090:4100]
+
+
+def test_mapped_lines(sample, tmpdir):
+    expected = read_lines(sample)
+    mapped = load(sample)
+    assert isinstance(mapped, MappedLineBuffer)
+    assert mapped == expected
+    assert mapped[3] == u"Mar 27 03:18:36 host kernel: \udcff\udcfe invalid utf-8"
+    assert mapped[1:5] == expected[1:5]
+    assert mapped[-1:] == expected[-1:]
+    assert mapped[::2] == expected[::2]
+    assert pickle.loads(pickle.dumps(mapped)) == expected
+
+    for pattern in [u"kernel", u"line|caf\xe9", u"\udcff", u"sshd", u"no such thing"]:
+        regex = re.compile(pattern)
+        assert mapped.select(regex) == [l for l in expected if regex.search(l)]
+
+    read = load(sample, mapped=False)
+    assert type(read) is LineBuffer
+    assert read == expected
+
+    empty = tmpdir / "empty"
+    empty.write_binary(b"")
+    assert load(empty.strpath) == []
+
+
+def test_provider_buffered(sample):
+    root, name = os.path.dirname(sample), os.path.basename(sample)
+    expected = read_lines(sample)
+
+    provider = TextFileProvider(name, root=root, ctx=mapped_context())
+    log = FakeLog(provider)
+    assert isinstance(log.lines, MappedLineBuffer)
+    assert log.lines == expected
+    assert [l["raw_message"] for l in log.sshd_lines] == [l for l in expected if "sshd" in l]
+    assert "old mac line" in log
+    # other consumers of the provider get a list of their own
+    assert isinstance(provider.content, list)
+    assert provider.content == expected
+    assert provider.buffered_content is log.lines
+
+    # files are read instead of mapped by default
+    for ctx in (HostArchiveContext(), HostContext()):
+        log = FakeLog(TextFileProvider(name, root=root, ctx=ctx))
+        assert type(log.lines) is LineBuffer
+        assert log.lines == expected
+
+    log = FakeLog(TextFileProvider(name, root=root, ctx=list_context()))
+    assert isinstance(log.lines, list)
+    assert log.lines == expected
+
+    # content already loaded as a list isn't loaded again
+    provider = TextFileProvider(name, root=root, ctx=HostArchiveContext())
+    assert isinstance(provider.content, list)
+    assert isinstance(FakeLog(provider).lines, list)
+
+
+def test_provider_buffered_filtered(sample):
+    root, name = os.path.dirname(sample), os.path.basename(sample)
+    blacklist.add_pattern("kernel")
+    for ctx in (HostArchiveContext(), HostContext()):
+        ctx.native_filtering = isinstance(ctx, HostContext)
+        provider = TextFileProvider(name, root=root, ctx=ctx)
+        expected = TextFileProvider(name, root=root, ctx=list_context()).content
+        assert type(provider.buffered_content) is LineBuffer
+        assert provider.buffered_content == expected
+        assert isinstance(provider.content, list)
+        assert provider.content == expected
+        assert provider.rc == 0
@@ -236,6 +236,18 @@ def test_messages_log_time_wrap():
     assert len(found) == 15
 
 
+def test_messages_log_one_year():
+    # the whole log is placed in one year, rather than lines more than
+    # eleven months before the sought time being moved to the year after
+    log = FakeMessagesClass(context_wrap("""
+Jan  5 10:00:00 host kernel: first
+Feb  1 10:00:00 host kernel: second
+Apr 10 10:00:00 host kernel: last
+""".strip()))
+    assert list(log.get_after(datetime(2023, 12, 20))) == []
+    assert len(list(log.get_after(datetime(2023, 1, 20)))) == 2
+
+
 HTTPD_ACCESS_LOG = """
 192.168.220.42 - - [14/Feb/2016:03:18:54 -0600] "POST /XMLRPC HTTP/1.1" 200 1381 "-" "rhn.rpclib.py/$Revision$"
 192.168.220.42 - - [14/Feb/2016:03:18:54 -0600] "POST /XMLRPC HTTP/1.1" 200 3282 "-" "rhn.rpclib.py/$Revision$"
@@ -320,3 +332,89 @@ def test_logs_with_milliseconds():
     log = FakeTowerLog(ctx)
     assert len(log.lines) == 4
     assert len(list(log.get_after(datetime(2020, 5, 28, 19, 25, 46, 944)))) == 3
+
+
+def test_messages_get_between():
+    ctx = context_wrap(MESSAGES_ROLLOVER_YEAR, path='/var/log/messages')
+    log = FakeMessagesClass(ctx)
+
+    found = list(log.get_between(datetime(2017, 12, 31, 23, 0, 0), datetime(2018, 1, 1, 0, 11, 45)))
+    assert [l['raw_message'][:15] for l in found] == ['Dec 31 23:03:07'] * 2 + ['Dec 31 23:07:00'] + ['Jan  1 00:00:00'] + ['Jan  1 00:03:09'] * 2
+    found = list(log.get_between(datetime(2018, 1, 1, 0, 0, 0), datetime(2018, 1, 1, 1, 0, 0), ['xinetd', 'START']))
+    assert len(found) == 3
+    assert list(log.get_between(datetime(2018, 1, 1, 1, 0, 0), datetime(2018, 1, 1, 0, 0, 0))) == []
+
+    # the time stamps are only parsed once
+    index = log._timestamp_index
+    assert len(list(log.get_after(datetime(2018, 1, 1, 1, 0, 0)))) == 6
+    assert log._timestamp_index is index
+    assert index.ordered
+
+
+UNORDERED_LOG = """
+2017-03-27 03:39:46 one
+    continued
+2017-03-27 03:20:30 two
+    continued
+2017-03-27 03:45:00 three
+    continued
+2017-03-27 03:10:00 four
+""".strip()
+
+
+def test_unordered_log():
+    log = LogFileOutput(context_wrap(UNORDERED_LOG))
+    found = list(log.get_after(datetime(2017, 3, 27, 3, 30, 0)))
+    assert [l['raw_message'] for l in found] == ['2017-03-27 03:39:46 one', '    continued', '2017-03-27 03:45:00 three', '    continued']
+    assert not log._timestamp_index.ordered
+
+    found = list(log.get_between(datetime(2017, 3, 27, 3, 15, 0), datetime(2017, 3, 27, 3, 40, 0), 'one'))
+    assert [l['raw_message'] for l in found] == ['2017-03-27 03:39:46 one']
+    found = list(log.get_between(datetime(2017, 3, 27, 3, 15, 0), datetime(2017, 3, 27, 3, 40, 0)))
+    assert [l['raw_message'] for l in found] == ['2017-03-27 03:39:46 one', '    continued', '2017-03-27 03:20:30 two', '    continued']
+
+
+class ScannedLog(LogFileOutput):
+    pass
+
+
+ScannedLog.token_scan('has_puppet', 'puppet-master')
+ScannedLog.token_scan('has_pulp_and_error', ['pulp', 'ERROR'])
+ScannedLog.token_scan('has_nothing', ['nothing', 'here'], check=any)
+ScannedLog.keep_scan('rsyslog', 'rsyslogd')
+ScannedLog.keep_scan('rsyslog_first_2', 'rsyslogd', num=2)
+ScannedLog.keep_scan('rsyslog_last_2', 'rsyslogd', num=2, reverse=True)
+ScannedLog.keep_scan('rsyslog_none', 'rsyslogd', num=0)
+ScannedLog.keep_scan('lost_or_drop', ['lost', 'drop'], check=any)
+ScannedLog.keep_scan('overlapping', ['imuxsock', 'sock lost'])
+ScannedLog.keep_scan('everything', '')
+ScannedLog.keep_scan('not_puppet', 'puppet', check=lambda found: not any(found))
+ScannedLog.last_scan('last_file', 'File "')
+ScannedLog.last_scan('last_missing', 'missing')
+ScannedLog.scan('rsyslog_count', lambda log: len(log.rsyslog))
+
+
+def test_token_scanners_single_pass():
+    log = ScannedLog(context_wrap(MESSAGES))
+    for scanner in ScannedLog.scanners[:-1]:
+        assert getattr(log, scanner.result_key) == scanner.search(log), scanner.result_key
+
+    assert log.has_puppet is True
+    assert log.has_nothing is False
+    assert len(log.rsyslog) == len([l for l in log.lines if 'rsyslogd' in l])
+    assert log.rsyslog_last_2 == log.rsyslog[-2:]
+    assert log.rsyslog_none == []
+    assert len(log.overlapping) == len([l for l in log.lines if 'sock lost' in l])
+    assert len(log.everything) == len(log.lines)
+    assert log.last_missing == {}
+    assert log.rsyslog_count == len(log.rsyslog)
+    assert ScannedLog._scan_plan.size == len(ScannedLog.scanners)
+
+
+def test_token_scanner_bad_token():
+    class BadTokenLog(LogFileOutput):
+        pass
+
+    BadTokenLog.keep_scan('bad', [1, 2])
+    with pytest.raises(TypeError):
+        BadTokenLog(context_wrap(MESSAGES))
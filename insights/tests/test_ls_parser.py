@@ -1,5 +1,6 @@
 # -*- coding: UTF-8 -*-
 import six
+from insights.core import ls_parser
 from insights.core.ls_parser import parse
 
 
@@ -312,3 +313,34 @@ def test_rhel8_selinux():
     assert res["date"] == "Apr  8 16:41"
     assert res["name"] == "abcd-efgh-ijkl-mnop"
     assert res["dir"] == "/var/lib/nova/instances"
+
+
+def test_entries_columns():
+    entries = parse(COMPLICATED_FILES.splitlines(), "/tmp")["/tmp"]["entries"]
+    expected = {
+        "type": "b", "perms": "rw-rw----.", "links": 1, "owner": "0", "group": "6",
+        "major": 253, "minor": 10, "date": "Aug  4 16:56", "name": "dm-10", "dir": "/tmp",
+        "raw_entry": "brw-rw----.  1 0 6 253,  10 Aug  4 16:56 dm-10",
+    }
+    assert entries["dm-10"] == expected
+    assert "dm-10" in entries and "missing" not in entries
+    assert entries.get("missing") is None
+    assert list(entries)[:4] == [".", "..", "config-3.10.0-229.14.1.el7.x86_64", "menu.lst"]
+    assert len(entries) == len(dict(entries)) == 13
+    assert dict(entries) == entries
+
+    assert entries["menu.lst"]["link"] == "./grub.conf"
+    assert "link" not in entries["control"]
+    # columns no line has a value for aren't kept
+    assert all(entries.columns[c] is None for c in range(9, 13))
+
+
+def test_entries_list_columns(monkeypatch):
+    # where array has no "q" typecode, integer columns are plain lists
+    expected = dict(parse(COMPLICATED_FILES.splitlines(), "/tmp")["/tmp"]["entries"])
+    monkeypatch.setattr(ls_parser, "_int_column", list)
+    entries = parse(COMPLICATED_FILES.splitlines(), "/tmp")["/tmp"]["entries"]
+    assert isinstance(entries.columns[ls_parser._POS["size"]], list)
+    assert dict(entries) == expected
+    big = parse(["-rw-r--r--. 1 root root 8589934592 Aug  4 16:56 big"], "/tmp")["/tmp"]["entries"]
+    assert big["big"]["size"] == 8589934592
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from insights import ocp
+from insights.core.parse_cache import ParseCache
+
+futures = pytest.importorskip("concurrent.futures")
+
+POD = """
+apiVersion: v1
+kind: Pod
+metadata:
+  name: {name}
+  namespace: {ns}
+"""
+
+FILES = {
+    "namespaces/app/core/pods/web.yaml": POD.format(name="web", ns="app"),
+    "namespaces/app/core/pods/db.yaml": POD.format(name="db", ns="app"),
+    "namespaces/other/core/pods/job.yaml": POD.format(name="job", ns="other"),
+    "namespaces/app/core/services.yaml": "kind: ServiceList\nitems:\n- kind: Service\n  metadata:\n    name: web\n",
+    "cluster-scoped-resources/nodes/n1.json": '{"kind": "Node", "metadata": {"name": "n1"}}',
+    "namespaces/app/pods/web/web.log": "not yaml: [\n",
+    "namespaces/app/broken.yaml": "kind: Pod\nmetadata: [\n",
+}
+
+
+@pytest.fixture
+def must_gather():
+    tmp = tempfile.mkdtemp()
+    for name, content in FILES.items():
+        path = os.path.join(tmp, name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+    yield tmp
+    shutil.rmtree(tmp)
+
+
+def names(conf):
+    return sorted(conf.find("metadata", "name").values)
+
+
+def test_analyze(must_gather):
+    serial = ocp.analyze(must_gather, excludes=["*.log"])
+    assert names(serial) == ["db", "job", "n1", "web", "web"]
+    with futures.ThreadPoolExecutor(2) as pool:
+        parallel = ocp.analyze(must_gather, excludes=["*.log"], pool=pool)
+    assert names(parallel) == names(serial)
+    assert sorted(parallel.where("kind", "Pod").metadata.name.values) == ["db", "job", "web"]
+
+
+def test_analyze_filters(must_gather):
+    conf = ocp.analyze(must_gather, excludes=["*.log"], kinds=["Pod", "Node"])
+    assert names(conf) == ["db", "job", "n1", "web"]
+
+    conf = ocp.analyze(must_gather, excludes=["*.log"], kinds=["Service"])
+    assert names(conf) == ["web"]
+
+    conf = ocp.analyze(must_gather, excludes=["*.log"], namespaces=["app"])
+    assert names(conf) == ["db", "n1", "web", "web"]
+
+
+def test_analyze_cache(must_gather, monkeypatch):
+    tmp = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(tmp, version="test")
+        first = ocp.analyze(must_gather, excludes=["*.log"], cache=cache)
+        assert len([n for n in os.listdir(tmp) if n.endswith(cache.suffix)]) == 5
+
+        # the second run reads everything it can from the cache
+        def fail(*args, **kwargs):
+            raise Exception("parsed again")
+        monkeypatch.setattr(ocp.yaml, "load_all", fail)
+        with futures.ThreadPoolExecutor(2) as pool:
+            second = ocp.analyze(must_gather, excludes=["*.log"], cache=cache, pool=pool)
+        assert names(second) == names(first)
+        web = os.path.join(must_gather, "namespaces", "app", "core", "pods", "web.yaml")
+        assert web in second.sources
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_conf_pool_threshold(must_gather, monkeypatch):
+    pools = []
+
+    class Pool(object):
+        def __init__(self):
+            pools.append(self)
+
+        def __enter__(self):
+            return None
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(ocp, "process_pool", Pool)
+    assert names(ocp.conf(must_gather)) == ["db", "job", "n1", "web", "web"]
+    assert pools == []
+
+    monkeypatch.setattr(ocp, "POOL_MIN_FILES", len(FILES))
+    assert names(ocp.conf(must_gather)) == ["db", "job", "n1", "web", "web"]
+    assert len(pools) == 1
+
+
+def test_process_pool_mp_context(monkeypatch):
+    created = []
+
+    class Pool(object):
+        def __init__(self, workers, **kwargs):
+            created.append(kwargs)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    class OldPython(object):
+        version_info = (3, 6, 15)
+
+    monkeypatch.setattr(futures, "ProcessPoolExecutor", Pool)
+    monkeypatch.setattr(ocp, "sys", OldPython)
+    with ocp.process_pool(2) as pool:
+        assert isinstance(pool, Pool)
+    assert created == [{}]
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+
+from insights import dr
+from insights.core import Parser
+from insights.core.parse_cache import ParseCache
+from insights.core.plugins import datasource, parser
+from insights.core.spec_factory import DatasourceProvider
+
+
+CONTENT = "a=1\nb=2"
+CALLS = []
+
+
+@datasource()
+def one(broker):
+    return DatasourceProvider(CONTENT, "/etc/one.conf")
+
+
+@datasource()
+def many(broker):
+    return [DatasourceProvider(CONTENT, "/etc/one.conf"), DatasourceProvider("c=3", "/etc/two.conf")]
+
+
+class Conf(Parser):
+    def parse_content(self, content):
+        CALLS.append(content)
+        self.data = dict(l.split("=") for l in content)
+
+
+@parser(one)
+class OneConf(Conf):
+    pass
+
+
+@parser(many)
+class ManyConf(Conf):
+    pass
+
+
+def setup_function(func):
+    del CALLS[:]
+
+
+def _run(cache, component):
+    broker = dr.Broker()
+    broker.parse_cache = cache
+    graph = dr.get_dependency_graph(component)
+    return dr.run(graph, broker=broker)
+
+
+def test_parse_cache_hit():
+    tmp = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(tmp, version="test")
+        broker = _run(cache, OneConf)
+        assert broker[OneConf].data == {"a": "1", "b": "2"}
+        assert broker.parse_cache_stats == {"hits": 0, "misses": 1}
+        assert len(cache) == 1
+
+        broker = _run(cache, OneConf)
+        assert broker[OneConf].data == {"a": "1", "b": "2"}
+        assert broker[OneConf].file_path == "/etc/one.conf"
+        assert broker.parse_cache_stats == {"hits": 1, "misses": 0}
+        assert len(CALLS) == 1
+
+        # same content but a different parser isn't a hit
+        broker = _run(cache, ManyConf)
+        assert broker.parse_cache_stats == {"hits": 0, "misses": 2}
+        broker = _run(cache, ManyConf)
+        assert broker.parse_cache_stats == {"hits": 2, "misses": 0}
+        assert [p.data for p in broker[ManyConf]] == [{"a": "1", "b": "2"}, {"c": "3"}]
+        assert len(CALLS) == 3
+
+        # a new version invalidates everything
+        broker = _run(ParseCache(tmp, version="test2"), OneConf)
+        assert broker.parse_cache_stats == {"hits": 0, "misses": 1}
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_parse_cache_eviction():
+    tmp = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(tmp, max_size=1, version="test")
+        cache.put("a", {"x": 1})
+        cache.put("b", {"x": 2})
+        assert len(cache) == 0
+
+        cache = ParseCache(tmp, max_size=1024, version="test")
+        for i in range(3):
+            cache.put(str(i), list(range(100)))
+        os.utime(os.path.join(tmp, "1" + cache.suffix), (0, 0))
+        cache.get("0")
+        cache.put("3", list(range(200)))
+        assert cache.get("1") is None
+        assert cache.get("0") == list(range(100))
+
+        cache.clear()
+        assert len(cache) == 0
+    finally:
+        shutil.rmtree(tmp)
+
+
+def test_parse_cache_not_picklable():
+    tmp = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(tmp, version="test")
+        assert not cache.put("a", lambda: None)
+        assert cache.get("a") is None
+    finally:
+        shutil.rmtree(tmp)
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from insights.core.context import HostArchiveContext, SosArchiveContext
+from insights.core.hydration import create_context
+from insights.core.path_index import IndexedTree, PathIndex, scan
+from insights.core.spec_factory import glob_file, simple_file
+
+
+@pytest.fixture
+def sos_dir():
+    tmp = tempfile.mkdtemp()
+    top = os.path.join(tmp, "sosreport-host")
+    for name in ("sos_commands/general/uname_-a", "etc/hosts", "var/log/messages", "var/log/secure"):
+        path = os.path.join(top, name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(name + "\n")
+    os.makedirs(os.path.join(top, "var", "empty"))
+    os.symlink("hosts", os.path.join(top, "etc", "hosts_link"))
+    os.symlink("/etc/passwd", os.path.join(top, "etc", "passwd"))
+    yield tmp
+    shutil.rmtree(tmp)
+
+
+def test_find():
+    index = PathIndex()
+    index.add_file("a/insights_commands/x")
+    index.add_file("a/b/insights_commands/y")
+    index.add_file("c/insights_commands_not")
+    index.add_file("d/config/featuregate")
+    index.add_link("e/config", "../d/config")
+    assert index.find("insights_commands") == ["a", "a/b"]
+    assert index.find("featuregate") == ["d/config"]
+    assert index.find("config/featuregate") == ["d"]
+    assert index.find("missing") == []
+
+
+def test_scan(sos_dir):
+    tree = IndexedTree(sos_dir, scan(sos_dir))
+    top = os.path.join(sos_dir, "sosreport-host")
+    assert sorted(tree.files()) == sorted(os.path.join(top, p) for p in
+                                          ("sos_commands/general/uname_-a", "etc/hosts",
+                                           "var/log/messages", "var/log/secure"))
+    assert tree.isfile(os.path.join(top, "etc", "hosts_link"))
+    assert not tree.exists(os.path.join(top, "etc", "passwd"))
+    assert tree.isdir(os.path.join(top, "var", "empty"))
+    assert tree.listdir(os.path.join(top, "etc")) == ["hosts", "hosts_link", "passwd"]
+    assert tree.glob(os.path.join(top, "var", "log", "*")) == [os.path.join(top, "var", "log", n)
+                                                              for n in ("messages", "secure")]
+    assert tree.find("sos_commands") == [top]
+
+
+def test_create_context_tree(sos_dir):
+    ctx = create_context(sos_dir)
+    assert isinstance(ctx, SosArchiveContext)
+    assert ctx.root == os.path.join(sos_dir, "sosreport-host")
+    assert ctx.tree is not None and ctx.tree.root == sos_dir
+
+    logs = glob_file("/var/log/*", context=SosArchiveContext)
+    hosts = simple_file("/etc/hosts_link", context=SosArchiveContext)
+    broker = {SosArchiveContext: ctx}
+    assert [p.relative_path for p in logs(broker)] == ["var/log/messages", "var/log/secure"]
+    assert hosts(broker).content == ["etc/hosts"]
+
+    # forcing a context still uses the index to find the root
+    ctx = create_context(sos_dir, context=HostArchiveContext)
+    assert isinstance(ctx, HostArchiveContext)
+    assert ctx.root == os.path.join(sos_dir, "sosreport-host")
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+from mock import patch
+from six import StringIO
+
+from insights.core import dr
+from insights.core.profiler import Profiler
+from insights.util.subproc import call
+
+
+class profiled(dr.ComponentType):
+    pass
+
+
+@profiled()
+def source():
+    return list(range(1000))
+
+
+@profiled(source)
+def command(s):
+    call("true")
+    return len(s)
+
+
+@profiled(command)
+def fails(c):
+    raise Exception("fails")
+
+
+def _run(profiler):
+    broker = dr.Broker()
+    broker.profiler = profiler
+    return dr.run(dr.get_dependency_graph(fails), broker)
+
+
+def test_profiler_records():
+    profiler = Profiler()
+    broker = _run(profiler)
+    assert broker[command] == 1000
+
+    assert set(profiler.profiles) == set([source, command, fails])
+    p = profiler.profiles[command]
+    assert p.calls == 1
+    assert p.wall >= 0 and p.cpu >= 0
+    assert p.child_cpu >= 0
+    assert p.alloc_size == 0
+
+
+def test_profiler_seeded_broker():
+    broker = dr.Broker()
+    broker.profiler = Profiler()
+    assert dr.Broker(broker).profiler is broker.profiler
+
+
+def test_profiler_allocations():
+    profiler = Profiler(trace_allocations=True)
+    try:
+        _run(profiler)
+    finally:
+        profiler.stop()
+    assert profiler.profiles[source].alloc_peak > 0
+    assert not profiler.trace_allocations
+
+
+def test_profiler_process_pool():
+    futures = pytest.importorskip("concurrent.futures")
+    profiler = Profiler()
+    broker = dr.Broker()
+    broker.profiler = profiler
+    with futures.ProcessPoolExecutor(max_workers=2) as pool:
+        broker = dr.run_parallel(dr.get_dependency_graph(fails), broker, pool)
+
+    assert broker[command] == 1000
+    assert set(profiler.profiles) == set([source, command, fails])
+    assert profiler.profiles[command].calls == 1
+    assert profiler.profiles[command].child_cpu >= 0
+
+
+class Unmergeable(object):
+    def profile(self, component):
+        return Profiler().profile(component)
+
+
+def test_profiler_process_pool_unmergeable():
+    futures = pytest.importorskip("concurrent.futures")
+    broker = dr.Broker()
+    broker.profiler = Unmergeable()
+    with patch.object(dr, "log") as log:
+        with futures.ProcessPoolExecutor(max_workers=2) as pool:
+            broker = dr.run_parallel(dr.get_dependency_graph(command), broker, pool)
+
+    assert broker[command] == 1000
+    assert "aren't profiled" in log.warning.call_args[0][0]
+
+
+def test_profiler_merge():
+    profiler = Profiler()
+    profiler.record(command, 0.5, 0.25, alloc_peak=10)
+    other = Profiler()
+    other.record(command, 0.5, 0.25, alloc_peak=5)
+    other.record(source, 1.0, 1.0)
+    profiler.merge(other.profiles)
+    assert profiler.profiles[command].calls == 2
+    assert profiler.profiles[command].wall == 1.0
+    assert profiler.profiles[command].alloc_peak == 10
+    assert profiler.profiles[source].cpu == 1.0
+
+
+@profiled()
+def big():
+    return len(bytearray(8 * 1024 * 1024))
+
+
+@profiled(big)
+def small(b):
+    return list(range(1000))
+
+
+def test_profiler_allocation_peak():
+    pytest.importorskip("tracemalloc")
+    import tracemalloc
+    if not hasattr(tracemalloc, "reset_peak"):
+        pytest.skip("tracemalloc.reset_peak requires Python 3.9+")
+    profiler = Profiler(trace_allocations=True)
+    broker = dr.Broker()
+    broker.profiler = profiler
+    try:
+        dr.run(dr.get_dependency_graph(small), broker)
+    finally:
+        profiler.stop()
+    assert profiler.profiles[big].alloc_peak >= 8 * 1024 * 1024
+    # the peak of the small component doesn't include the big one's
+    assert 0 < profiler.profiles[small].alloc_peak < 1024 * 1024
+
+
+def test_profiler_json():
+    profiler = Profiler()
+    _run(profiler)
+    out = StringIO()
+    profiler.dump_json(out)
+    doc = json.loads(out.getvalue())
+    name = dr.get_name(command)
+    assert doc[name]["calls"] == 1
+    assert doc[name]["type"] == dr.get_name(profiled)
+
+
+def test_profiler_collapsed():
+    profiler = Profiler()
+    profiler.record(command, 0.5, 0.25)
+    lines = profiler.to_collapsed().splitlines()
+    assert lines == ["profiled;insights.tests.test_profiler;command 500000"]
+    assert profiler.to_collapsed(metric="cpu").endswith(" 250000")
+    assert profiler.to_collapsed(metric="child_cpu") == ""
@@ -1,12 +1,15 @@
+import json
 import os
-
+import pytest
 from tempfile import mkdtemp
 from insights import dr
 from insights.core.plugins import component
 from insights.core.serde import (serializer,
                                  deserializer,
                                  Hydration,
+                                 PackedStore,
                                  marshal,
+                                 pack_meta_data,
                                  unmarshal)
 from insights.util import fs
 
@@ -125,3 +128,160 @@ def test_round_trip():
         pass
         if os.path.exists(tmp_path):
             fs.remove(tmp_path)
+
+
+def test_round_trip_packed():
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path, storage="packed")
+
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker.exec_times[thing] = 0.5
+        h.dehydrate(thing, broker)
+        h.close()
+        assert not os.path.exists(h.meta_data)
+        assert os.path.exists(h.pack.path)
+
+        broker = Hydration(tmp_path).hydrate()
+        assert thing in broker
+        assert broker.exec_times[thing] >= 0.5
+        foo = broker[thing]
+        assert foo.a == 1
+        assert foo.b == 2
+    finally:
+        if os.path.exists(tmp_path):
+            fs.remove(tmp_path)
+
+
+def test_packed_store():
+    tmp_path = mkdtemp()
+    try:
+        path = os.path.join(tmp_path, "meta_data.pack")
+        store = PackedStore(path)
+        store.write("a", {"name": "a"})
+        store.write("b", {"name": "b"})
+        store.close()
+
+        store = PackedStore(path)
+        assert store.names() == ["a", "b"]
+        assert store.load("b") == {"name": "b"}
+
+        # appending replaces the offset table
+        store.write("c", {"name": "c"})
+        store.write("a", {"name": "a", "v": 2})
+        store.close()
+        store = PackedStore(path)
+        assert store.names() == ["b", "c", "a"]
+        assert store.load("a") == {"name": "a", "v": 2}
+
+        # without the offset table the records are scanned
+        store.write("d", {"name": "d"})
+        store._writer.flush()
+        store = PackedStore(path)
+        assert "d" in store
+        assert len(store) == 4
+        assert store.load("c") == {"name": "c"}
+    finally:
+        if os.path.exists(tmp_path):
+            fs.remove(tmp_path)
+
+
+def test_pack_meta_data():
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path)
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker.exec_times[thing] = 0.5
+        h.dehydrate(thing, broker)
+
+        path = pack_meta_data(tmp_path)
+        assert not os.path.exists(h.meta_data)
+        assert dr.get_name(thing) in PackedStore(path)
+        assert Hydration(tmp_path).hydrate()[thing].b == 2
+    finally:
+        if os.path.exists(tmp_path):
+            fs.remove(tmp_path)
+
+
+@component(thing)
+def uses_thing(t):
+    return t.b
+
+
+@component()
+def other_thing():
+    return Foo()
+
+
+def test_hydrate_lazy():
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path)
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker.exec_times[thing] = 0.5
+        broker[other_thing] = Foo()
+        h.dehydrate(thing, broker)
+        h.dehydrate(other_thing, broker)
+
+        # corrupt other_thing so it can't be deserialized
+        path = os.path.join(h.meta_data, ".".join([dr.get_name(other_thing), h.ser_name]))
+        with open(path) as f:
+            doc = json.load(f)
+        doc["results"]["type"] = "insights.tests.test_serde.Unknown"
+        with open(path, "w") as f:
+            json.dump(doc, f)
+
+        broker = h.hydrate(lazy=True)
+        assert isinstance(broker.instances[thing], dr.LazyValue)
+        assert isinstance(broker.instances[other_thing], dr.LazyValue)
+
+        broker = dr.run(dr.get_dependency_graph(uses_thing), broker=broker)
+        assert broker[uses_thing] == 2
+        assert broker.instances[thing].a == 1
+        assert broker.exec_times[thing] >= 0.5
+        assert isinstance(broker.instances[other_thing], dr.LazyValue)
+
+        assert other_thing not in broker
+        assert other_thing not in broker.instances
+    finally:
+        if os.path.exists(tmp_path):
+            fs.remove(tmp_path)
+
+
+def _hydrate_with(pool, lazy=False, storage="directory"):
+    tmp_path = mkdtemp()
+    try:
+        h = Hydration(tmp_path, storage=storage)
+        broker = dr.Broker()
+        broker[thing] = Foo()
+        broker.exec_times[thing] = 0.5
+        broker[other_thing] = [Foo(), Foo()]
+        h.dehydrate(thing, broker)
+        h.dehydrate(other_thing, broker)
+        h.close()
+
+        broker = Hydration(tmp_path).hydrate(pool=pool, lazy=lazy)
+        assert broker.exec_times[thing] >= 0.5
+        assert broker[thing].b == 2
+        assert [f.a for f in broker[other_thing]] == [1, 1]
+    finally:
+        if os.path.exists(tmp_path):
+            fs.remove(tmp_path)
+
+
+def test_hydrate_thread_pool():
+    futures = pytest.importorskip("concurrent.futures")
+    with futures.ThreadPoolExecutor(2) as pool:
+        _hydrate_with(pool)
+        _hydrate_with(pool, lazy=True)
+        _hydrate_with(pool, storage="packed")
+
+
+def test_hydrate_process_pool():
+    futures = pytest.importorskip("concurrent.futures")
+    with futures.ProcessPoolExecutor(2) as pool:
+        _hydrate_with(pool)
+        _hydrate_with(pool, storage="packed")
@@ -0,0 +1,127 @@
+# -*- coding: UTF-8 -*-
+import os
+
+import pytest
+
+from insights.core import blacklist, textfilter
+from insights.core.context import HostContext
+from insights.core.spec_factory import TextFileProvider, SAFE_ENV
+
+CONTENT = b"""
+root      1  0.0  /usr/lib/systemd/systemd --switched-root --system
+user    100  0.5  sshd: user@pts/0
+user    101  0.0  -bash\r
+user    102  0.0  ps auxww with a secret.example.com
+nobody  103  1.0  \xff\xfe invalid utf-8 sshd
+caf\xc3\xa9    104  0.0  unicode systemd
+\x0bvertical tab sshd\x1cfile separator
+last line without a newline sshd""".lstrip(b"\n")
+
+CASES = [
+    (["sshd"], [], []),
+    (["sshd", "systemd"], [], []),
+    (["sshd", "systemd"], ["bash", "invalid"], []),
+    ([], ["sshd"], []),
+    ([], [], ["secret.example.com"]),
+    (["user"], [], ["se.ret", "^user", "0$", "x*ample", "pts/0"]),
+    (["user", "root"], ["ps aux"], ["caf", "l*ine"]),
+    (["no such line"], [], []),
+    ([], ["u", "s"], []),
+]
+
+
+class NativeContext(HostContext):
+    native_filtering = True
+
+
+class PipelineContext(HostContext):
+    native_filtering = False
+
+
+@pytest.fixture
+def sample(tmpdir):
+    path = tmpdir / "sample.txt"
+    path.write_binary(CONTENT)
+    return path.strpath
+
+
+def _blacklist(patterns, keywords):
+    for p in patterns:
+        blacklist.add_pattern(p)
+    for k in keywords:
+        blacklist.add_keyword(k)
+
+
+def teardown_function(func):
+    blacklist._PATTERN_FILTERS.clear()
+    blacklist._KEYWORD_FILTERS.clear()
+
+
+@pytest.mark.parametrize("filters,patterns,keywords", CASES)
+def test_matches_pipeline(sample, filters, patterns, keywords):
+    _blacklist(patterns, keywords)
+    tf = textfilter.TextFilter(filters, blacklist.get_disallowed_patterns(), blacklist.get_disallowed_keywords())
+    rc, lines = tf.lines(sample)
+
+    args = []
+    if filters:
+        args.append(["grep", "-F", "\n".join(filters), sample])
+    p = "\n".join(blacklist.get_disallowed_patterns())
+    if p:
+        args.append(["grep", "-v", "-F", p] + ([] if args else [sample]))
+    kws = blacklist.get_disallowed_keywords()
+    if kws:
+        sed = ["sed"]
+        for kw in kws:
+            sed.extend(["-e", "s/%s/keyword/g" % kw.replace("/", "\\/")])
+        args.append(sed + ([] if args else [sample]))
+
+    expected_rc, expected = PipelineContext().shell_out(args, keep_rc=True, env=SAFE_ENV)
+    assert lines == expected
+    assert rc == expected_rc
+
+
+def test_chunk_boundaries(sample, monkeypatch):
+    monkeypatch.setattr(textfilter, "CHUNK_SIZE", 7)
+    rc, lines = textfilter.TextFilter(["sshd"]).lines(sample)
+    monkeypatch.setattr(textfilter, "CHUNK_SIZE", 1 << 20)
+    assert (rc, lines) == textfilter.TextFilter(["sshd"]).lines(sample)
+    assert len(lines) == 6
+
+
+def test_unsupported(tmpdir):
+    with pytest.raises(textfilter.Unsupported):
+        textfilter.TextFilter(keywords=["[abc]"])
+    with pytest.raises(textfilter.Unsupported):
+        textfilter.TextFilter(keywords=["a*"])
+    with pytest.raises(textfilter.Unsupported):
+        textfilter.TextFilter(["-bash"])
+
+    path = tmpdir / "binary"
+    path.write_binary(b"one sshd\n\x00two sshd\n")
+    with pytest.raises(textfilter.Unsupported):
+        textfilter.TextFilter(["sshd"]).lines(path.strpath)
+
+
+def test_provider_native_and_fallback(sample, tmpdir):
+    blacklist.add_pattern("invalid")
+    native = TextFileProvider(os.path.basename(sample), root=os.path.dirname(sample), ctx=NativeContext())
+    pipeline = TextFileProvider(os.path.basename(sample), root=os.path.dirname(sample), ctx=PipelineContext())
+    assert pipeline.create_filter() is None
+    assert native.content == pipeline.content
+    assert native.rc == pipeline.rc == 0
+
+    native_out = tmpdir / "native.out"
+    pipeline_out = tmpdir / "pipeline.out"
+    native.write(native_out.strpath)
+    pipeline.write(pipeline_out.strpath)
+    assert native_out.read_binary() == pipeline_out.read_binary()
+
+    blacklist.add_keyword("[0-9]")
+    native = TextFileProvider(os.path.basename(sample), root=os.path.dirname(sample), ctx=NativeContext())
+    assert native.create_filter() is None
+    assert "keyword" in native.content[0]
+
+
+def test_matcher_cache():
+    assert textfilter.get_matcher([b"a", b"b"]) is textfilter.get_matcher(set([b"b", b"a"]))
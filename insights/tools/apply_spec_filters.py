@@ -34,6 +34,7 @@ for package in sys.argv[2:]:
     dr.load_components(package)
 
 filters.dump()
+filters.dump_index()
 specs = sorted(vars(Specs))
 filters = {}
 for spec in specs: